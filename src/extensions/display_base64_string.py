@@ -2,18 +2,23 @@
 # Created on Jan 2024
 # Copyright (C) European XFEL GmbH Hamburg. All rights reserved.
 #############################################################################
-from qtpy.QtCore import QEvent, QPoint, QRectF, QSize, Qt, Signal, Slot
-from qtpy.QtGui import QBrush, QColor, QPixmap
+from collections import OrderedDict, namedtuple
+
+from qtpy.QtCore import (
+    QBuffer, QByteArray, QEvent, QIODevice, QPoint, QRect, QRectF, QSize, Qt,
+    Signal, Slot)
+from qtpy.QtGui import QBrush, QColor, QImageReader, QPixmap, QTransform
 from qtpy.QtWidgets import (
     QAction, QGraphicsPixmapItem, QGraphicsScene, QGraphicsView, QVBoxLayout,
     QWidget)
-from traits.api import Instance, WeakRef
+from traits.api import Bytes, Instance, Tuple, WeakRef
 
 from karabogui.api import (
     BaseBindingController, StringBinding, get_binding_value, icons,
     register_binding_controller, with_display_type)
 
 from .models.api import Base64ImageModel
+from .utils import SYNC_DECODE_LIMIT, LatestWinsWorker, get_content_digest
 
 try:
     from karabo.common.scenemodel.api import extract_base64image
@@ -35,6 +40,52 @@ class MouseMode(Enum):
     Pointer = 3
 
 
+MAX_TILES = 8
+MIN_LEVEL_SIZE = 256
+
+DecodedImage = namedtuple(
+    "DecodedImage", ["digest", "data", "image", "size", "clip", "target"])
+
+
+def decode_image(value, target=None, clip=None, digest=b""):
+    """Decode a compressed image matched to a target resolution
+
+    The image is read with a `QImageReader`, which lets the image plugins
+    decode only the `clip` region and directly at a reduced resolution. The
+    image is only ever scaled down to fit into `target`.
+
+    This function does not need a `QPixmap` and can be used off the GUI
+    thread.
+
+    :param value: the compressed image bytes or a base64 image string
+    :param target: the `QSize` to fit the image into, or `None`
+    :param clip: the `QRect` region in full resolution pixels, or `None`
+    :param digest: the content digest, passed on to the result
+
+    :returns: a `DecodedImage` with the full resolution `size`
+    """
+    if isinstance(value, str):
+        _, value = extract_base64image(value)
+
+    buffer = QBuffer()
+    buffer.setData(QByteArray(value))
+    buffer.open(QIODevice.ReadOnly)
+    reader = QImageReader(buffer)
+    size = reader.size()
+    region = size if clip is None else clip.size()
+    if clip is not None:
+        reader.setClipRect(clip)
+    if target is not None and region.isValid():
+        scaled = region.scaled(target, Qt.KeepAspectRatio)
+        if scaled.width() < region.width():
+            reader.setScaledSize(scaled)
+    image = reader.read()
+    if not size.isValid():
+        size = image.size()
+
+    return DecodedImage(digest, value, image, size, clip, target)
+
+
 class PixmapView(QGraphicsView):
 
     def __init__(self, parent=None):
@@ -43,8 +94,38 @@ class PixmapView(QGraphicsView):
         self.setScene(self.scene)
         self.pixmap_item = QGraphicsPixmapItem(QPixmap())
         self.scene.addItem(self.pixmap_item)
+        # Detailed region of a down scaled image, drawn on top
+        self.tile_item = QGraphicsPixmapItem(QPixmap(), self.pixmap_item)
         self.fitInView(self.scene.sceneRect())
 
+    def image_rect(self):
+        """Return the full resolution image rect in item coordinates"""
+        rect = QRectF(self.pixmap_item.pixmap().rect())
+        return self.pixmap_item.transform().mapRect(rect)
+
+    def set_level(self, pixmap, size):
+        """Show `pixmap` stretched to the full resolution `size`"""
+        self.pixmap_item.setPixmap(pixmap)
+        transform = QTransform()
+        if not pixmap.isNull():
+            transform.scale(size.width() / pixmap.width(),
+                            size.height() / pixmap.height())
+        self.pixmap_item.setTransform(transform)
+        self.clear_tile()
+
+    def set_tile(self, pixmap, clip):
+        """Show `pixmap` on top of the `clip` region in image pixels"""
+        level = self.pixmap_item.transform()
+        scale_x, scale_y = level.m11(), level.m22()
+        self.tile_item.setPos(clip.x() / scale_x, clip.y() / scale_y)
+        self.tile_item.setTransform(QTransform.fromScale(
+            clip.width() / pixmap.width() / scale_x,
+            clip.height() / pixmap.height() / scale_y))
+        self.tile_item.setPixmap(pixmap)
+
+    def clear_tile(self):
+        self.tile_item.setPixmap(QPixmap())
+
     def setPixmap(self, pixmap):
         self.pixmap_item.setPixmap(pixmap)
         rect = self.scene.sceneRect()
@@ -60,6 +141,7 @@ class PixmapView(QGraphicsView):
 
 class KaraboImagePixMap(QWidget):
     escapeKeyPressed = Signal()
+    viewChanged = Signal()
 
     def __init__(self, parent=None):
         """
@@ -113,6 +195,8 @@ class KaraboImagePixMap(QWidget):
                 self.mouseMoveEvent(event)
             elif event.type() == QEvent.MouseButtonRelease:
                 self.mouseReleaseEvent(event)
+            elif event.type() == QEvent.Resize:
+                self.viewChanged.emit()
         return super().eventFilter(obj, event)
 
     def zoom_out(self):
@@ -125,18 +209,17 @@ class KaraboImagePixMap(QWidget):
         within the view.
 
         """
-        pixmap_rect = self.view.pixmap_item.pixmap().rect()
-        pixmap_rect_f = QRectF(pixmap_rect)
+        pixmap_rect_f = self.view.image_rect()
         self.view.scene.setSceneRect(pixmap_rect_f)
 
         self.view.fitInView(self.view.scene.sceneRect())
 
         if self.mouse_mode == MouseMode.Move:
             if self.zoom_enabled:
-                pixmap_rect = self.view.pixmap_item.pixmap().rect()
-                pixmap_rect_f = QRectF(pixmap_rect)
+                pixmap_rect_f = self.view.image_rect()
                 self.view.scene.setSceneRect(pixmap_rect_f)
             self.move_center()
+        self.viewChanged.emit()
 
     def move_center(self):
         # Center the image in the view
@@ -162,6 +245,7 @@ class KaraboImagePixMap(QWidget):
         # Set the pixmap item to display the cropped pixmap
         self.view.pixmap_item.setPixmap(self.view.pixmap_item.pixmap())
         self.view.fitInView(self.view.scene.sceneRect())
+        self.viewChanged.emit()
 
     def mousePressEvent(self, event):
         """
@@ -244,6 +328,8 @@ class KaraboImagePixMap(QWidget):
             self.last_mouse_pos = None
             if event.button() == Qt.RightButton:
                 self.zoom_out()
+            else:
+                self.viewChanged.emit()
         elif self.mouse_mode == MouseMode.Pointer:
             self.start_pos = event.pos()
             cursor = Qt.ArrowCursor
@@ -320,10 +406,29 @@ class DisplayBase64Image(BaseBindingController):
     model = Instance(Base64ImageModel, args=())
     _scene = WeakRef(QGraphicsScene)
 
+    _decoder = Instance(LatestWinsWorker)
+    # The digest of the latest and the shown content
+    _digest = Bytes()
+    _shown = Bytes()
+
+    # The compressed data, full resolution and down scaled level sizes
+    _data = Bytes()
+    _image_size = Tuple(0, 0)
+    _level_size = Tuple(0, 0)
+    _tiles = Instance(OrderedDict, args=())
+
     def create_widget(self, parent):
         widget = KaraboImagePixMap(parent=parent)
+        widget.viewChanged.connect(self._update_view)
+        self._decoder = LatestWinsWorker(decode_image, parent=widget)
+        self._decoder.resultReady.connect(self._set_image)
         return widget
 
+    def destroy_widget(self):
+        if self._decoder is not None:
+            self._decoder.cancel()
+            self._decoder = None
+
     def value_update(self, proxy):
 
         value = get_binding_value(proxy)
@@ -331,23 +436,99 @@ class DisplayBase64Image(BaseBindingController):
         if value is None:
             return
 
-        _, data = extract_base64image(value)
+        digest = get_content_digest(value)
+        if digest == self._digest:
+            return
+        self._digest = digest
+
+        if len(value) < SYNC_DECODE_LIMIT:
+            # An older background result must not overwrite this image
+            self._decoder.cancel()
+            self._set_image(decode_image(value, digest=digest))
+        else:
+            self._decoder.submit(value, self._target_size(), None, digest)
+
+    # ---------------------------------------------------------------------
+    # Private
+
+    def _target_size(self):
+        viewport = self.widget.view.viewport()
+        size = viewport.size() * viewport.devicePixelRatioF()
+        return size.expandedTo(QSize(MIN_LEVEL_SIZE, MIN_LEVEL_SIZE))
+
+    @Slot()
+    def _update_view(self):
+        """Request a decoding matching the current viewport and zoom"""
+        if not self._data or self._shown != self._digest:
+            return
+
+        target = self._target_size()
+        image_size = QSize(*self._image_size)
+        needed = image_size.scaled(target, Qt.KeepAspectRatio)
+        if min(needed.width(), image_size.width()) > self._level_size[0]:
+            self._decoder.submit(self._data, target, None, self._digest)
+            return
+        if self._level_size == self._image_size:
+            # The full resolution is shown already
+            return
+
+        view = self.widget.view
+        image_rect = QRect(QPoint(0, 0), image_size)
+        scene_rect = view.scene.sceneRect().translated(-view.pixmap_item.pos())
+        clip = scene_rect.toAlignedRect().intersected(image_rect)
+        if clip.isEmpty() or clip == image_rect:
+            view.clear_tile()
+            return
+
+        key = _tile_key(clip, target)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            view.set_tile(tile, clip)
+            return
+        self._decoder.submit(self._data, target, clip, self._digest)
 
-        pixmap = QPixmap()
-        pixmap.loadFromData(data)
+    def _set_image(self, result):
+        if result.digest != self._digest:
+            # A newer image is requested already
+            return
+
+        pixmap = QPixmap.fromImage(result.image)
+        if result.clip is not None:
+            if pixmap.isNull():
+                return
+            self._tiles[_tile_key(result.clip, result.target)] = pixmap
+            while len(self._tiles) > MAX_TILES:
+                self._tiles.popitem(last=False)
+            self.widget.view.set_tile(pixmap, result.clip)
+            return
+
+        image_size = (result.size.width(), result.size.height())
+        if result.digest == self._shown and image_size == self._image_size:
+            # Higher resolution level of the shown image, keep the zoom
+            self._level_size = (pixmap.width(), pixmap.height())
+            self.widget.view.set_level(pixmap, result.size)
+            self._update_view()
+            return
+
+        self._shown = result.digest
+        self._data = result.data
+        self._image_size = image_size
+        self._level_size = (pixmap.width(), pixmap.height())
+        self._tiles.clear()
+
+        self.widget.view.set_level(pixmap, result.size)
         self.widget.zoom_out()
 
         if not pixmap.isNull():
-            self.widget.view.pixmap_item.setPixmap(pixmap)
-
-            pixmap_rect = pixmap.rect()
-            pixmap_rect_f = QRectF(pixmap_rect)
+            pixmap_rect_f = self.widget.view.image_rect()
             self.widget.view.scene.setSceneRect(pixmap_rect_f)
 
             self.widget.view.fitInView(pixmap_rect_f)
 
-        else:
-            self.widget.view.scene.clear()
-            self.widget.view.pixmap_item.setPixmap(QPixmap())
-
         self.widget.view_rect = self.widget.view.scene.sceneRect()
+
+
+def _tile_key(clip, target):
+    return (clip.x(), clip.y(), clip.width(), clip.height(),
+            target.width(), target.height())
@@ -9,6 +9,7 @@ from dataclasses import dataclass
 import numpy as np
 from pyqtgraph import ROI, CrosshairROI, EllipseROI, LabelItem, Point
 from qtpy.QtGui import QPainter, QPainterPath, QPainterPathStroker
+from qtpy.QtWidgets import QAction, QInputDialog
 from traits.api import (
     Bool, Float, Instance, Tuple, Undefined, WeakRef, on_trait_change)
 
@@ -28,10 +29,12 @@ from karabogui.graph.image.api import (
 from .models.api import BeamGraphModel
 from .roi_graph import BaseRoiController
 from .utils import (
-    get_node_value, reflect_angle, rotate_points, value_from_node)
+    LatestWinsWorker, get_node_value, reflect_angle, rotate_points,
+    value_from_node)
 
 FONT_SIZE = get_font_size_from_dpi(8)
 NUMBER_BINDINGS = (IntBinding, FloatBinding)
+MAX_BINNING = 16
 
 
 # --------------------------------------------------------------------------
@@ -290,6 +293,9 @@ class BeamGraph(BaseBindingController):
 
     _timestamp = Instance(Timestamp)
 
+    # Client-side beam estimation
+    _fitter = Instance(LatestWinsWorker)
+
     def create_widget(self, parent):
         # Use a scaled-down image widget
         widget = KaraboImageView(parent=parent)
@@ -304,11 +310,29 @@ class BeamGraph(BaseBindingController):
         # QActions
         widget.add_axes_labels_dialog()
 
+        fit_action = QAction("Estimate beam on client", widget)
+        fit_action.setCheckable(True)
+        fit_action.setChecked(self.model.client_fit)
+        fit_action.toggled.connect(self._toggle_client_fit)
+        self._plot.vb.add_action(fit_action)
+
+        settings_action = QAction("Client estimate settings...", widget)
+        settings_action.triggered.connect(self._configure_client_fit)
+        self._plot.vb.add_action(settings_action, separator=False)
+
+        self._fitter = LatestWinsWorker(estimate_beam_moments, parent=widget)
+        self._fitter.resultReady.connect(self._fit_finished)
+
         # Restore the model information
         widget.restore(build_graph_config(self.model))
 
         return widget
 
+    def destroy_widget(self):
+        if self._fitter is not None:
+            self._fitter.cancel()
+            self._fitter = None
+
     def value_update(self, proxy):
         # Check if node binding exists
         node = get_binding_value(proxy)
@@ -329,6 +353,11 @@ class BeamGraph(BaseBindingController):
         self._update_transform(
             scale=value_from_node(node.transform, key='pixelScale'),
             translate=value_from_node(node.transform, key='pixelTranslate'))
+        if self.model.client_fit:
+            # The ellipse is drawn when the background estimate finished
+            self._request_fit()
+            return
+
         self._update_ellipse(
             center=[value_from_node(node.beamProperties, key='x0'),
                     value_from_node(node.beamProperties, key='y0')],
@@ -375,9 +404,51 @@ class BeamGraph(BaseBindingController):
             widths=widths if is_valid(widths) else (0, 0),
             angle=angle if is_valid(angle) else 0)
 
+    def _request_fit(self):
+        image_node = self._image_node
+        if not image_node.is_valid or self._fitter is None:
+            return
+        self._fitter.submit(image_node.get_data(),
+                            self.model.fit_threshold,
+                            self.model.fit_binning)
+
     # ---------------------------------------------------------------------
     # Slots
 
+    def _fit_finished(self, result):
+        if not self.model.client_fit:
+            return
+        # Map the pixel estimate to the transformed image coordinates
+        scale, translate = self._transform.scale, self._transform.translate
+        center = np.multiply(result["center"], scale) + translate
+        widths = np.multiply(result["widths"], scale)
+        self._update_ellipse(center=tuple(center), widths=tuple(widths),
+                             angle=result["angle"])
+
+    def _toggle_client_fit(self, enabled):
+        self.model.client_fit = enabled
+        if enabled:
+            self._request_fit()
+        elif self._fitter is not None:
+            self._fitter.cancel()
+
+    def _configure_client_fit(self):
+        threshold, ok = QInputDialog.getDouble(
+            self.widget, "Client Estimate",
+            "Background threshold (fraction of peak):",
+            self.model.fit_threshold, 0.0, 0.99, 2)
+        if not ok:
+            return
+        binning, ok = QInputDialog.getInt(
+            self.widget, "Client Estimate",
+            f"Pixel binning (Max: {MAX_BINNING}):",
+            self.model.fit_binning, 1, MAX_BINNING)
+        if not ok:
+            return
+        self.model.trait_set(fit_threshold=threshold, fit_binning=binning)
+        if self.model.client_fit:
+            self._request_fit()
+
     def _change_model(self, content):
         self.model.trait_set(**restore_graph_config(content))
 
@@ -391,6 +462,68 @@ class BeamGraph(BaseBindingController):
             self.widget.disable_aux()
 
 
+def estimate_beam_moments(image, threshold=0.1, binning=1):
+    """Estimate the beam centroid, widths and orientation of an image
+
+    The background is removed by subtracting `threshold` times the dynamic
+    range of the frame and clipping at zero. The frame can be binned
+    by an integer factor beforehand to reduce the cost on large cameras.
+
+    :param image: the 2D (or 3D color) image array
+    :param threshold: the background level as fraction of the range
+    :param binning: the binning factor for both axes
+
+    :returns: dictionary with the `center` and second-moment full `widths`
+              (D4-sigma) in pixels and the `angle` of the major axis in
+              degrees, or `None` if the frame has no signal
+    """
+    frame = np.asarray(image, dtype=np.float64)
+    if frame.ndim == 3:
+        frame = frame.mean(axis=2)
+    if frame.ndim != 2:
+        return None
+
+    binning = max(int(binning), 1)
+    if binning > 1:
+        rows, cols = frame.shape[0] // binning, frame.shape[1] // binning
+        if not rows or not cols:
+            return None
+        frame = frame[:rows * binning, :cols * binning].reshape(
+            rows, binning, cols, binning).sum(axis=(1, 3))
+
+    frame = np.nan_to_num(frame, nan=0.0, posinf=0.0, neginf=0.0)
+    low, high = frame.min(), frame.max()
+    if not high > low:
+        return None
+
+    weights = frame - (low + threshold * (high - low))
+    np.clip(weights, 0, None, out=weights)
+    total = weights.sum()
+    if total <= 0:
+        return None
+
+    # Rows are the y-axis and columns the x-axis, use the pixel centers
+    y = (np.arange(frame.shape[0]) + 0.5) * binning
+    x = (np.arange(frame.shape[1]) + 0.5) * binning
+    proj_x = weights.sum(axis=0)
+    proj_y = weights.sum(axis=1)
+    x0 = proj_x @ x / total
+    y0 = proj_y @ y / total
+    dx, dy = x - x0, y - y0
+    sxx = proj_x @ dx ** 2 / total
+    syy = proj_y @ dy ** 2 / total
+    sxy = dy @ weights @ dx / total
+
+    root = np.sqrt((sxx - syy) ** 2 + 4 * sxy ** 2)
+    major = 2 * np.sqrt(2 * (sxx + syy + root))
+    minor = 2 * np.sqrt(max(2 * (sxx + syy - root), 0))
+    angle = np.degrees(0.5 * np.arctan2(2 * sxy, sxx - syy))
+
+    return {"center": (float(x0), float(y0)),
+            "widths": (float(major), float(minor)),
+            "angle": float(angle)}
+
+
 def is_valid(array):
     if not isinstance(array, Sequence):
         array = [array]
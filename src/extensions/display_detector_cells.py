@@ -2,12 +2,12 @@ from enum import Enum
 
 import numpy as np
 from qtpy.QtCore import Qt
-from qtpy.QtGui import QBrush, QColor, QFont, QPainter, QPen
+from qtpy.QtGui import QBrush, QColor, QFont, QImage, QPainter, QPen, QPixmap
 from qtpy.QtWidgets import (
-    QAction, QDialog, QDialogButtonBox, QFormLayout, QGraphicsRectItem,
-    QGraphicsScene, QGraphicsView, QGridLayout, QHBoxLayout, QInputDialog,
-    QLabel, QPushButton, QSlider, QSpinBox, QVBoxLayout, QWidget)
-from traits.api import Bool, Instance, Int
+    QAction, QDialog, QDialogButtonBox, QFormLayout, QGraphicsPixmapItem,
+    QGraphicsRectItem, QGraphicsScene, QGraphicsView, QGridLayout, QHBoxLayout,
+    QInputDialog, QLabel, QPushButton, QSlider, QSpinBox, QVBoxLayout, QWidget)
+from traits.api import Any, Bool, Instance, Int
 
 from karabo.common.api import State
 from karabogui.binding.api import (
@@ -46,12 +46,27 @@ LEGEND_MIN_WIDTH = OFFSET_H + 21 * STRIDE_H - GAP_H
 NUM_PATTERNS_START = 1
 DEFAULT_NUM_PATTERNS = NUM_PATTERNS_START + 0  # no pattern
 
+# The style code index from which a cell is lit
+LIT_CODE = 2
+# The occupancy colour map goes from dark to lit, the last entry is
+# transparent for the gaps and the unused cells
+HEATMAP_LEVELS = 256
+HEATMAP_LUT = np.zeros((HEATMAP_LEVELS + 1, 4), dtype=np.uint8)
+HEATMAP_LUT[:HEATMAP_LEVELS] = np.linspace(
+    BLUE.getRgb(), ORANGE.getRgb(), HEATMAP_LEVELS).astype(np.uint8)
+
 
 class Location(Enum):
     BOTTOM = 'bottom'
     RIGHT = 'right'
 
 
+class Accumulation(Enum):
+    OFF = 'off'
+    WINDOW = 'window'
+    DECAY = 'decay'
+
+
 class CellStyle(Enum):
     UNUSED = (NOPEN, QBrush(GRAY), None)
     DARK = (NOPEN, QBrush(BLUE), None)
@@ -121,6 +136,16 @@ class DetectorCellsWidget(QWidget):
         self.nfrm = 0
         self.cell_style_codes = np.zeros(self.nfrm, dtype=np.uint16)
 
+        # Lit frames accumulation
+        self.accumulation = Accumulation.OFF
+        self.accumulation_length = 100
+        self.heatmap = None
+        self.occupancy = None
+        self._history = None
+        self._num_trains = 0
+        self._weight = 0.0
+        self._pixel_index = None
+
         grid = QGridLayout(self)
         self.view = QGraphicsView()
         grid.addWidget(self.view)
@@ -194,6 +219,7 @@ class DetectorCellsWidget(QWidget):
 
         self.draw_cells()
         self.draw_legends()
+        self.draw_heatmap()
 
         if update:
             # Store parameters temporarily
@@ -242,6 +268,29 @@ class DetectorCellsWidget(QWidget):
 
             y += STRIDE_V
 
+    def draw_heatmap(self):
+        """Add the occupancy heatmap on top of the cells
+
+        The heatmap is a single pixmap, every pixel is mapped once to the
+        index of its cell. The gaps are mapped to the transparent entry.
+        """
+        ncells = self.nrow * self.ncol
+        height = max(self.nrow * STRIDE_V - GAP_V, 0)
+        width = max(self.ncol * STRIDE_H - GAP_H, 0)
+        ys, xs = np.arange(height), np.arange(width)
+        index = (ys // STRIDE_V)[:, np.newaxis] * self.ncol + xs // STRIDE_H
+        gaps = ((ys % STRIDE_V >= SIDE)[:, np.newaxis]
+                | (xs % STRIDE_H >= SIDE))
+        index[gaps] = ncells
+        self._pixel_index = index
+
+        self.heatmap = QGraphicsPixmapItem()
+        self.heatmap.setPos(OFFSET_H, OFFSET_V)
+        self.heatmap.setZValue(1)
+        self.heatmap.setVisible(False)
+        self.scene.addItem(self.heatmap)
+        self.reset_accumulation()
+
     def draw_legends(self):
         draw_map = {
             Location.BOTTOM: self._draw_legends_bottom,
@@ -327,6 +376,76 @@ class DetectorCellsWidget(QWidget):
         self.ncell_legend.setPlainText(f"USED: {nfrm:3d}")
         self.nlit_legend.setPlainText(f"LIT:  {nlit:3d}")
 
+    def set_accumulation(self, mode, length):
+        self.accumulation = Accumulation(mode)
+        self.accumulation_length = max(int(length), 1)
+        self.reset_accumulation()
+
+    def reset_accumulation(self):
+        ncells = len(self.cells)
+        enabled = self.accumulation is not Accumulation.OFF
+        self.occupancy = np.zeros(ncells) if enabled else None
+        self._history = (
+            np.zeros((self.accumulation_length, ncells), dtype=bool)
+            if self.accumulation is Accumulation.WINDOW else None)
+        self._num_trains = 0
+        self._weight = 0.0
+        if self.heatmap is not None:
+            self.heatmap.setPixmap(QPixmap())
+            self.heatmap.setVisible(enabled)
+
+    def accumulate(self):
+        """Add the current pattern to the per-cell lit frame counter
+
+        The counter either covers a window of the last trains or decays
+        exponentially, the cost per update does not depend on the number of
+        accumulated trains.
+        """
+        if self.occupancy is None:
+            return
+
+        ncells = len(self.cells)
+        nused = min(len(self.cell_style_codes), ncells)
+        lit = np.zeros(ncells, dtype=bool)
+        lit[:nused] = self.cell_style_codes[:nused] >= LIT_CODE
+
+        occupancy = self.occupancy
+        if self.accumulation is Accumulation.WINDOW:
+            length = self.accumulation_length
+            slot = self._num_trains % length
+            if self._num_trains >= length:
+                np.subtract(occupancy, self._history[slot], out=occupancy)
+            self._history[slot] = lit
+            np.add(occupancy, lit, out=occupancy)
+            self._weight = min(self._num_trains + 1, length)
+        else:
+            decay = 1 - 1 / self.accumulation_length
+            np.multiply(occupancy, decay, out=occupancy)
+            np.add(occupancy, lit, out=occupancy)
+            self._weight = self._weight * decay + 1
+        self._num_trains += 1
+
+        self._paint_heatmap(nused)
+
+    @property
+    def occupancy_fraction(self):
+        if self.occupancy is None or not self._weight:
+            return None
+        return self.occupancy / self._weight
+
+    def _paint_heatmap(self, nused):
+        levels = np.full(len(self.cells) + 1, HEATMAP_LEVELS)
+        fraction = self.occupancy_fraction[:nused]
+        levels[:nused] = np.clip(fraction * (HEATMAP_LEVELS - 1) + 0.5,
+                                 0, HEATMAP_LEVELS - 1)
+        rgba = np.ascontiguousarray(HEATMAP_LUT[levels[self._pixel_index]])
+        height, width = rgba.shape[:2]
+        if not height or not width:
+            return
+        image = QImage(rgba.data, width, height, rgba.strides[0],
+                       QImage.Format_RGBA8888)
+        self.heatmap.setPixmap(QPixmap.fromImage(image))
+
     def set_num_patterns(self, value):
         self.npattern_slider.setMinimum(1 if value else 0)
         self.npattern_spinbox.setMinimum(1 if value else 0)
@@ -368,6 +487,8 @@ class BaseDetectorCellsController(BaseBindingController):
         rows, cols = self.model.rows, self.model.columns
         widget = DetectorCellsWidget(rows=rows, cols=cols, parent=parent)
         widget.set_legend_location(self.model.legend_location)
+        widget.set_accumulation(self.model.accumulation,
+                                self.model.accumulation_length)
 
         # Configure shape
         shape_action = QAction("Cells shape", widget)
@@ -379,6 +500,15 @@ class BaseDetectorCellsController(BaseBindingController):
         legend_action.triggered.connect(self._configure_legend_location)
         widget.addAction(legend_action)
 
+        # Configure the lit frames accumulation
+        accumulation_action = QAction("Lit frames accumulation", widget)
+        accumulation_action.triggered.connect(self._configure_accumulation)
+        widget.addAction(accumulation_action)
+
+        reset_action = QAction("Reset accumulation", widget)
+        reset_action.triggered.connect(widget.reset_accumulation)
+        widget.addAction(reset_action)
+
         return widget
 
     def add_proxy(self, proxy):
@@ -418,6 +548,10 @@ class BaseDetectorCellsController(BaseBindingController):
         # 2. Finalize
         self.widget.set_parameters(*self._get_pattern(npulse_per_frame))
 
+        # 3. Accumulate only the new patterns
+        if proxy is self.proxy:
+            self.widget.accumulate()
+
     def _get_cell_style_codes(self, npulse_per_frame, shutter_open):
         litframes = (npulse_per_frame != 0).astype(int)
         return litframes + 1 + int(not shutter_open) * litframes
@@ -455,6 +589,31 @@ class BaseDetectorCellsController(BaseBindingController):
         self.model.legend_location = location
         self.widget.set_legend_location(location)
 
+    def _configure_accumulation(self):
+        modes = [mode.value for mode in Accumulation]
+        index = modes.index(self.model.accumulation)
+
+        mode, ok = QInputDialog.getItem(self.widget,
+                                        "Set lit frames accumulation",
+                                        "Accumulation:",
+                                        modes, index, False)
+        if not ok:
+            return
+
+        length = self.model.accumulation_length
+        if mode != Accumulation.OFF.value:
+            label = ("Window size (trains):"
+                     if mode == Accumulation.WINDOW.value
+                     else "Decay constant (trains):")
+            length, ok = QInputDialog.getInt(self.widget,
+                                             "Set lit frames accumulation",
+                                             label, length, 1, 100000)
+            if not ok:
+                return
+
+        self.model.trait_set(accumulation=mode, accumulation_length=length)
+        self.widget.set_accumulation(mode, length)
+
 
 @register_binding_controller(
     ui_name='Detector Cells Widget',
@@ -510,6 +669,12 @@ class MultipleDetectorCells(BaseDetectorCellsController):
     """
     model = Instance(MultipleDetectorCellsModel, args=())
 
+    # Cached lit frames per pattern, the number of lit patterns per frame
+    # and the timestamp of the decoded array
+    _lit_frames = Instance(np.ndarray)
+    _lit_count = Instance(np.ndarray)
+    _timestamp = Any
+
     def create_widget(self, parent):
         widget = super().create_widget(parent)
         widget.npattern_slider.valueChanged[int].connect(self._update_index)
@@ -517,28 +682,56 @@ class MultipleDetectorCells(BaseDetectorCellsController):
         return widget
 
     def _get_npulse_per_frame(self, node):
-        npulse_per_frame, _ = get_array_data(
+        npulse_per_frame, timestamp = get_array_data(
             node.nPulsePerFrame, default=np.array([[]], dtype=np.uint16))
+        self._update_lit_frames(npulse_per_frame, timestamp)
         return npulse_per_frame
 
     def _get_num_pattern(self, npulse_per_frame):
         return len(npulse_per_frame)
 
     def _get_pattern(self, npulse_per_frame=None):
-        if npulse_per_frame is None:
+        if self._lit_frames is None:
             node = get_binding_value(self.proxy)
-            npulse_per_frame = self._get_npulse_per_frame(node)
+            self._get_npulse_per_frame(node)
+
+        lit_frames = self._lit_frames
+        nframe = lit_frames.shape[1]
+        if not lit_frames.size:
+            litframes = np.zeros(nframe, dtype=bool)
+        elif self._is_union:
+            litframes = self._lit_count > 0
+        else:
+            litframes = lit_frames[min(self._index, len(lit_frames) - 1)]
 
-        nframe = npulse_per_frame.shape[1]
+        nlit = np.count_nonzero(litframes)
+        pattern = self._get_cell_style_codes(litframes, self._shutter_open)
+        return nframe, nlit, pattern
 
-        if npulse_per_frame.size:
-            npulse_per_frame = (npulse_per_frame.sum(axis=0) if self._is_union
-                                else npulse_per_frame[self._index])
+    def _update_lit_frames(self, npulse_per_frame, timestamp):
+        """Cache the lit frames of every pattern and their union
 
-        nlit = np.sum(npulse_per_frame > 0)
-        pattern = self._get_cell_style_codes(
-            npulse_per_frame, self._shutter_open)
-        return nframe, nlit, pattern
+        The patterns are decoded once per timestamp. Only the patterns that
+        differ from the cached ones are accounted in the union counter, so
+        that toggling the union or the index does not sum all the patterns
+        again.
+        """
+        if (self._lit_frames is not None and timestamp is not None
+                and timestamp == self._timestamp):
+            return
+        self._timestamp = timestamp
+
+        lit_frames = np.atleast_2d(npulse_per_frame != 0)
+        cached = self._lit_frames
+        if cached is None or cached.shape != lit_frames.shape:
+            self._lit_count = lit_frames.sum(axis=0, dtype=np.int32)
+        else:
+            changed = np.flatnonzero((cached != lit_frames).any(axis=1))
+            if changed.size:
+                self._lit_count += (
+                    lit_frames[changed].sum(axis=0, dtype=np.int32)
+                    - cached[changed].sum(axis=0, dtype=np.int32))
+        self._lit_frames = lit_frames
 
     def _enable_union(self, enabled):
         self._is_union = enabled
@@ -5,8 +5,8 @@
 #############################################################################
 
 import numpy as np
-from pyqtgraph import InfiniteLine
-from qtpy.QtWidgets import QAction
+from pyqtgraph import InfiniteLine, ScatterPlotItem
+from qtpy.QtWidgets import QAction, QInputDialog
 from traits.api import Instance, Undefined
 
 from karabo.common.scenemodel.api import (
@@ -19,6 +19,118 @@ from karabogui.graph.plots.api import (
     KaraboPlotView, generate_baseline, generate_down_sample, get_view_range)
 
 from .models.api import DynamicDigitizerModel
+from .utils import RingBuffer
+
+ACCUMULATIONS = {
+    "none": "Latest trace",
+    "mean": "Running mean",
+    "exponential": "Exponential average",
+    "envelope": "Min/max envelope",
+}
+MAX_ACCUMULATION = 1000
+
+
+class TraceAccumulator:
+    """Accumulate digitizer traces on the client
+
+    - mean: the mean of the last `length` traces, kept in a ring buffer
+      with a running sum
+    - exponential: the exponential average with a weight of 1 / `length`,
+      non-finite samples are skipped
+    - envelope: the minimum and maximum of every sample of the last
+      `length` traces, next to the latest trace. The extrema are kept
+      running and only recomputed over the window for the samples whose
+      extremum left it
+
+    Every trace is accumulated with vectorised work of the trace length.
+    The accumulation restarts when the trace length changes.
+    """
+
+    def __init__(self, mode="none", length=10):
+        self.mode = mode
+        self.length = max(int(length), 1)
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self._buffer = None
+        self._sum = None
+        self._average = None
+        self._lower = None
+        self._upper = None
+
+    def add(self, samples):
+        """Add a trace
+
+        :returns: the accumulated trace and the lower and upper envelope,
+                  which are None except for the envelope mode
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        if self.mode == "none":
+            return samples, None, None
+        if self._average is not None and self._average.shape != samples.shape:
+            self.clear()
+
+        self.count += 1
+        if self.mode == "mean":
+            if self._buffer is None:
+                self._buffer = RingBuffer(self.length, shape=samples.shape)
+                self._sum = np.zeros_like(samples)
+            evicted = self._buffer.append(samples)
+            self._sum += samples
+            if evicted is not None:
+                self._sum -= evicted
+            if self.count % self.length == 0:
+                # Drop the accumulated rounding error of the running sum
+                self._sum = self._buffer.view().sum(axis=0)
+            self._average = self._sum / len(self._buffer)
+        elif self.mode == "exponential":
+            if self._average is None:
+                self._average = np.full_like(samples, np.nan)
+            # Samples without a finite value yet start at the next one
+            average = self._average
+            finite = np.isfinite(samples)
+            unset = finite & np.isnan(average)
+            average[unset] = samples[unset]
+            update = finite & ~unset
+            average[update] += ((samples[update] - average[update])
+                                / self.length)
+        elif self.mode == "envelope":
+            if self._buffer is None:
+                self._buffer = RingBuffer(self.length, shape=samples.shape)
+            evicted = self._buffer.append(samples)
+            self._average = samples
+            if self._lower is None:
+                self._lower, self._upper = samples.copy(), samples.copy()
+            else:
+                window = self._buffer.view()
+                _update_extremum(self._lower, samples, evicted, window,
+                                 np.fmin)
+                _update_extremum(self._upper, samples, evicted, window,
+                                 np.fmax)
+            return samples, self._lower, self._upper
+
+        return self._average, None, None
+
+
+def _update_extremum(extremum, samples, evicted, window, ufunc):
+    """Update the running extremum of a window of traces in place
+
+    :param ufunc: `np.fmin` or `np.fmax`
+    """
+    stale = (np.flatnonzero(evicted == extremum) if evicted is not None
+             else None)
+    ufunc(extremum, samples, out=extremum)
+    if stale is not None and stale.size:
+        # The evicted trace held the extremum of these samples
+        extremum[stale] = ufunc.reduce(window[:, stale], axis=0)
+
+
+def get_threshold_crossings(x, y, threshold):
+    """Return the x positions where the trace rises above the threshold"""
+    above = y > threshold
+    rising = np.flatnonzero(~above[:-1] & above[1:]) + 1
+    return x[rising], y[rising]
 
 
 @register_binding_controller(
@@ -32,11 +144,20 @@ class DisplayDynamicDigitizer(BaseBindingController):
     model = Instance(DynamicDigitizerModel, args=())
     _plot = Instance(object)
     _threshold = Instance(InfiniteLine)
+    _crossings = Instance(ScatterPlotItem)
+
+    _accumulator = Instance(TraceAccumulator)
+    _lower = Instance(object)
+    _upper = Instance(object)
+    _trace_key = Instance(tuple)
 
     def create_widget(self, parent):
         widget = KaraboPlotView(parent=parent)
         widget.stateChanged.connect(self._change_model)
         self._plot = widget.add_curve_item()
+        envelope_pen = make_pen('s')
+        self._lower = widget.add_curve_item(name="lower", pen=envelope_pen)
+        self._upper = widget.add_curve_item(name="upper", pen=envelope_pen)
         widget.add_cross_target()
         widget.add_roi()
         widget.add_toolbar()
@@ -51,13 +172,30 @@ class DisplayDynamicDigitizer(BaseBindingController):
         self._threshold.setVisible(False)
         plotItem.addItem(self._threshold)
 
+        # The crossings of the threshold by the accumulated trace
+        self._crossings = ScatterPlotItem(size=8, pen=line_pen, brush=None)
+        self._crossings.setVisible(False)
+        plotItem.addItem(self._crossings)
+
         toggle_action = QAction("Show threshold line", widget)
         toggle_action.setCheckable(True)
         toggle_action.setChecked(False)
         toggle_action.toggled.connect(self._threshold.setVisible)
+        toggle_action.toggled.connect(self._crossings.setVisible)
         viewbox = plotItem.vb
         viewbox.add_action(toggle_action, separator=False)
 
+        accumulation_action = QAction("Trace accumulation...", widget)
+        accumulation_action.triggered.connect(self._configure_accumulation)
+        viewbox.add_action(accumulation_action, separator=False)
+
+        reset_action = QAction("Reset accumulation", widget)
+        reset_action.triggered.connect(self._reset_accumulation)
+        viewbox.add_action(reset_action, separator=False)
+
+        self._accumulator = TraceAccumulator(
+            self.model.accumulation, self.model.accumulation_length)
+
         widget.restore(build_graph_config(self.model))
 
         return widget
@@ -72,21 +210,42 @@ class DisplayDynamicDigitizer(BaseBindingController):
 
         # NOTE: With empty data or only inf we clear as NaN will clear as well!
         if not len(samples) or np.isinf(samples).all():
-            self._plot.setData([], [])
+            for curve in (self._plot, self._lower, self._upper):
+                curve.setData([], [])
+            self._crossings.setData([], [])
             return
 
         # Generate the baseline for the x-axis
         offset = node.offset.value
         step = node.step.value
 
+        # The accumulation restarts with a new baseline
+        trace_key = (len(samples), offset, step)
+        if trace_key != self._trace_key:
+            self._trace_key = trace_key
+            self._accumulator.clear()
+        samples, lower, upper = self._accumulator.add(samples)
+
+        x = generate_baseline(samples, offset=offset, step=step)
+        rect = get_view_range(self._plot)
+
         # Threshold might not be there!
         threshold = getattr(node, 'threshold', None)
         if threshold is not None:
             threshold_value = threshold.value
             self._threshold.setPos(threshold_value)
+            self._crossings.setData(*get_threshold_crossings(
+                x, samples, threshold_value))
+        else:
+            self._crossings.setData([], [])
+
+        for curve, values in ((self._lower, lower), (self._upper, upper)):
+            if values is None:
+                curve.setData([], [])
+                continue
+            curve.setData(*generate_down_sample(
+                values, x=x, rect=rect, deviation=True))
 
-        x = generate_baseline(samples, offset=offset, step=step)
-        rect = get_view_range(self._plot)
         x, y = generate_down_sample(samples, x=x, rect=rect, deviation=True)
         self._plot.setData(x, y)
 
@@ -95,3 +254,27 @@ class DisplayDynamicDigitizer(BaseBindingController):
 
     def _change_model(self, content):
         self.model.trait_set(**restore_graph_config(content))
+
+    def _configure_accumulation(self):
+        modes = list(ACCUMULATIONS)
+        labels = list(ACCUMULATIONS.values())
+        label, ok = QInputDialog.getItem(
+            self.widget, "Trace accumulation", "Accumulation:", labels,
+            modes.index(self.model.accumulation), False)
+        if not ok:
+            return
+        mode = modes[labels.index(label)]
+
+        length = self.model.accumulation_length
+        if mode != "none":
+            length, ok = QInputDialog.getInt(
+                self.widget, "Trace accumulation", "Number of traces:",
+                length, 1, MAX_ACCUMULATION)
+            if not ok:
+                return
+
+        self.model.trait_set(accumulation=mode, accumulation_length=length)
+        self._accumulator = TraceAccumulator(mode, length)
+
+    def _reset_accumulation(self):
+        self._accumulator.clear()
@@ -4,13 +4,13 @@
 # Copyright (C) European XFEL GmbH Hamburg. All rights reserved.
 #############################################################################
 
-from itertools import cycle
-
 import numpy as np
-from pyqtgraph import PlotDataItem, mkPen
+from pyqtgraph import (
+    GraphicsObject, ImageItem, PlotDataItem, arrayToQPath, colormap, mkPen)
+from qtpy.QtCore import QRectF
 from qtpy.QtGui import QColor
 from qtpy.QtWidgets import QAction, QInputDialog
-from traits.api import Instance, List, WeakRef
+from traits.api import Instance, WeakRef
 
 from karabo.common.scenemodel.api import (
     build_graph_config, restore_graph_config)
@@ -27,34 +27,235 @@ MAX_CURVES = 20
 START_COLOR = QColor(0, 51, 102)
 STOP_COLOR = QColor(153, 204, 255)
 
+# Density mode
+MAX_X_BINS = 1024
+MIN_Y_BINS = 10
+MAX_Y_BINS = 2000
+# Margin of the y range, relative to the span of the traces
+Y_RANGE_MARGIN = 0.25
+
 
-def get_pen_cycler(start_color, stop_color, num):
-    """Create a color gradient between two colors
+class DensityHistogram:
+    """Accumulate traces in a 2D histogram with exponential decay
+
+    Every sample of a trace is binned by its x position and its value.
+    The histogram is multiplied by `decay` before a trace is added, the cost
+    of an update does not depend on the number of accumulated traces.
+
+    The histogram is reset when the x range or the number of samples
+    changes. When a trace leaves the y range, the range is widened and the
+    accumulated histogram is rebinned into it.
+    """
+
+    def __init__(self, y_bins=200, decay=0.95):
+        self.y_bins = y_bins
+        self.decay = decay
+        self.image = None
+        self.rect = QRectF()
+        self._x_key = None
+        self._x_bins = None
+        self._x_range = None
+        self._y_range = None
+
+    def clear(self):
+        self.image = None
+        self._x_key = None
+        self._y_range = None
+
+    def add(self, x, y):
+        """Add a trace and return the histogram with shape (x, y) bins"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        finite = np.isfinite(y)
+        if not finite.any():
+            return self.image
+        y_min, y_max = y[finite].min(), y[finite].max()
+
+        x_key = (x.size, x[0], x[-1])
+        if x_key != self._x_key:
+            self.clear()
+            self._x_key = x_key
+            self._x_bins = self._bin_x(x)
+        if self._y_range is None:
+            self._y_range = self._margin_range(y_min, y_max)
+        elif y_min < self._y_range[0] or y_max > self._y_range[1]:
+            y_range = self._margin_range(min(y_min, self._y_range[0]),
+                                         max(y_max, self._y_range[1]))
+            if self.image is not None:
+                self.image = self._rebin_y(self.image, self._y_range,
+                                           y_range)
+            self._y_range = y_range
+
+        x_bins = self._x_bins.max() + 1
+        low, high = self._y_range
+        rows = ((y[finite] - low) * (self.y_bins / (high - low))).astype(
+            np.int64)
+        np.clip(rows, 0, self.y_bins - 1, out=rows)
+        counts = np.bincount(self._x_bins[finite] * self.y_bins + rows,
+                             minlength=x_bins * self.y_bins)
+        counts = counts.reshape((x_bins, self.y_bins))
+
+        if self.image is None or self.image.shape != counts.shape:
+            self.image = counts.astype(np.float32)
+        else:
+            self.image *= self.decay
+            self.image += counts
+
+        x_low, x_span = self._x_range
+        self.rect = QRectF(x_low, low, x_span, high - low)
+        return self.image
+
+    def _margin_range(self, y_min, y_max):
+        span = y_max - y_min
+        if span == 0:
+            span = abs(y_max) or 1.0
+        margin = span * Y_RANGE_MARGIN
+        return y_min - margin, y_max + margin
+
+    def _rebin_y(self, image, old_range, new_range):
+        """Move the rows of the image into the bins of a wider y range"""
+        old_low, old_high = old_range
+        new_low, new_high = new_range
+        centers = old_low + (np.arange(self.y_bins) + 0.5) * (
+            (old_high - old_low) / self.y_bins)
+        rows = ((centers - new_low) * (self.y_bins / (new_high - new_low))
+                ).astype(np.int64)
+        np.clip(rows, 0, self.y_bins - 1, out=rows)
+        rebinned = np.zeros_like(image)
+        np.add.at(rebinned.T, rows, image.T)
+        return rebinned
+
+    def _bin_x(self, x):
+        """Return the column of every sample, a sample covers one step"""
+        bins = min(x.size, MAX_X_BINS)
+        low, high = min(x[0], x[-1]), max(x[0], x[-1])
+        span = (high - low) * x.size / max(x.size - 1, 1) or 1.0
+        self._x_range = (low, span)
+        columns = ((x - low) * (bins / span)).astype(np.int64)
+        return np.clip(columns, 0, bins - 1)
+
+
+def get_pen_gradient(start_color, stop_color, num):
+    """Create a list of pens with a color gradient between two colors
 
     :param start_color: An rgb tuple or `QColor` for the start color
     :param stop_color: An rgb tuple or `QColor` for the stop color
     :param num: the number of intermediate colors
-
-    :returns: Full list of rgb colors
     """
+    start = (start_color.getRgb() if isinstance(start_color, QColor)
+             else start_color)
+    stop = (stop_color.getRgb() if isinstance(stop_color, QColor)
+            else stop_color)
+    assert len(start) == len(stop), "Color space must be of same length"
 
-    def _create_gradient(start, stop, n=10):
-        start = start.getRgb() if isinstance(start, QColor) else start
-        stop = stop.getRgb() if isinstance(stop, QColor) else stop
+    colors = np.linspace(start, stop, max(num, 1)).astype(int)
+    return [mkPen(tuple(color)) for color in colors]
 
-        assert len(start) == len(stop), "Color space must be of same length"
-        color_space = len(start)
-        colors = [start]
-        for num in range(1, n):
-            percent = float(num / (n - 1))
-            rgb_color = tuple(int(start[j] + percent * (stop[j] - start[j]))
-                              for j in range(color_space))
-            colors.append(rgb_color)
 
-        return colors
+class TraceHistoryItem(GraphicsObject):
+    """Paint a history of traces in a single item
 
-    colors = _create_gradient(start_color, stop_color, num)
-    return cycle(mkPen(color) for color in colors)
+    The traces are kept in a preallocated (number x length) ring array.
+    Each trace has a pen of the gradient by its age, the path of a trace is
+    only built once unless the view range changes.
+    """
+
+    def __init__(self, pens, parent=None):
+        super().__init__(parent)
+        self.pens = pens
+        self._x = None
+        self._traces = None
+        self._limits = None
+        self._paths = []
+        self._index = 0
+        self._size = 0
+        self._view_range = None
+        self._rect = QRectF()
+
+    @property
+    def capacity(self):
+        return len(self.pens)
+
+    def __len__(self):
+        return self._size
+
+    def set_pens(self, pens):
+        """Set the pens from the oldest to the newest trace"""
+        self.pens = pens
+        self.clear()
+
+    def clear(self):
+        self.prepareGeometryChange()
+        self._x = None
+        self._traces = None
+        self._paths = []
+        self._index = 0
+        self._size = 0
+        self._rect = QRectF()
+        self.update()
+
+    def traces(self):
+        """Return the traces from the oldest to the newest"""
+        if self._traces is None:
+            return np.empty((0, 0))
+        return self._traces[self._rows()]
+
+    def append(self, x, y):
+        """Append a trace, traces without a finite sample are skipped"""
+        if not self.capacity:
+            return
+        y = np.asarray(y, dtype=np.float64)
+        finite = np.isfinite(y)
+        if not finite.any():
+            return
+        if (self._traces is None or self._traces.shape[1] != len(y)
+                or not np.array_equal(self._x, x)):
+            self.clear()
+            self._x = np.array(x, dtype=np.float64)
+            self._traces = np.empty((self.capacity, len(y)))
+            self._limits = np.empty((self.capacity, 2))
+            self._paths = [None] * self.capacity
+
+        row = self._index
+        self._traces[row] = y
+        self._limits[row] = y[finite].min(), y[finite].max()
+        self._paths[row] = None
+        self._index = (row + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+        self.prepareGeometryChange()
+        limits = self._limits[self._rows()]
+        y_min, y_max = limits[:, 0].min(), limits[:, 1].max()
+        x = self._x
+        self._rect = QRectF(x.min(), y_min, x.max() - x.min(), y_max - y_min)
+        self.update()
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        if not self._size:
+            return
+        view_range = get_view_range(self)
+        if view_range != self._view_range:
+            self._view_range = view_range
+            self._paths = [None] * self.capacity
+
+        # The newest trace has the last pen and is painted on top
+        offset = self.capacity - self._size
+        for age, row in enumerate(self._rows()):
+            path = self._paths[row]
+            if path is None:
+                x, y = generate_down_sample(
+                    self._traces[row], x=self._x, rect=view_range,
+                    deviation=True)
+                path = self._paths[row] = arrayToQPath(x, y)
+            painter.setPen(self.pens[offset + age])
+            painter.drawPath(path)
+
+    def _rows(self):
+        return (self._index - self._size + np.arange(self._size)) % (
+            self.capacity)
 
 
 @register_binding_controller(
@@ -66,10 +267,15 @@ class DisplayDynamicGraph(BaseBindingController):
     """The Dynamic display controller for the digitizer"""
     model = Instance(DynamicGraphModel, args=())
 
-    curves = List(WeakRef(PlotDataItem))
+    # The latest trace and the history of the previous traces
+    _curve = WeakRef(PlotDataItem)
+    _history = WeakRef(TraceHistoryItem)
+
+    # Density mode
+    _density = Instance(DensityHistogram)
+    _density_item = WeakRef(ImageItem)
 
-    _pen_cycler = Instance(cycle, allow_none=False)
-    _curve_cycler = Instance(cycle, allow_none=True)
+    _last_trace = Instance(tuple)
 
     # ----------------------------------------------------------------
     # Abstract interface
@@ -90,13 +296,25 @@ class DisplayDynamicGraph(BaseBindingController):
         number_action.triggered.connect(self._configure_number)
         widget.addAction(number_action)
 
+        density_action = QAction("Density Mode", widget)
+        density_action.setCheckable(True)
+        density_action.setChecked(self.model.density)
+        density_action.toggled.connect(self._toggle_density)
+        widget.addAction(density_action)
+
+        density_settings = QAction("Density Settings...", widget)
+        density_settings.triggered.connect(self._configure_density)
+        widget.addAction(density_settings)
+
         widget.restore(build_graph_config(self.model))
+        self._set_density(self.model.density)
 
         return widget
 
     def destroy_widget(self):
-        self._curve_cycler = None
-        self.curves = []
+        self._curve = None
+        self._history = None
+        self._density = None
 
     def value_update(self, proxy):
         y, _ = get_array_data(proxy, default=[])
@@ -106,13 +324,22 @@ class DisplayDynamicGraph(BaseBindingController):
 
         # NOTE: WE cast boolean as int, as numpy method is deprecated
         if y.dtype == np.bool_:
-            y = y.astype(np.int)
+            y = y.astype(np.int32)
 
         model = self.model
         # Generate the baseline for the x-axis
         x = generate_baseline(y, offset=model.offset, step=model.step)
 
-        curve = next(self._curve_cycler)
+        if self._density is not None:
+            self._update_density(x, y)
+            return
+
+        # The previous trace moves to the history
+        curve = self._curve
+        if self._last_trace is not None:
+            self._history.append(*self._last_trace)
+        self._last_trace = (x, y)
+
         rect = get_view_range(curve)
         x, y = generate_down_sample(y, x=x, rect=rect, deviation=True)
         curve.setData(x, y)
@@ -124,20 +351,62 @@ class DisplayDynamicGraph(BaseBindingController):
         """Reset all data on the data curves of the plot item"""
         for plot in self.widget.plotItem.dataItems[:]:
             plot.setData([], [])
+        self._history.clear()
+        self._last_trace = None
+        if self._density is not None:
+            self._density.clear()
+            self._density_item.clear()
+
+    def _update_density(self, x, y):
+        image = self._density.add(x, y)
+        if image is None:
+            return
+        item = self._density_item
+        item.setImage(image, autoLevels=False,
+                      levels=(0, max(float(image.max()), 1.0)))
+        item.setRect(self._density.rect)
+
+    def _set_density(self, enabled):
+        """Switch between the history curves and the density image"""
+        plotItem = self.widget.plotItem
+        if enabled and self._density is None:
+            model = self.model
+            self._density = DensityHistogram(y_bins=model.y_bins,
+                                             decay=model.decay)
+            item = ImageItem()
+            item.setLookupTable(colormap.get("viridis").getLookupTable())
+            item.setZValue(-1)
+            plotItem.addItem(item)
+            self._density_item = item
+        elif not enabled and self._density is not None:
+            self._density = None
+            plotItem.removeItem(self._density_item)
+            self._density_item = None
+
+        for item in (self._curve, self._history):
+            item.setVisible(not enabled)
+        self._curve.setData([], [])
+        self._history.clear()
+        self._last_trace = None
 
     def _create_curves(self, widget):
-        """Clear the widget and create a new cycle and curves"""
+        """Clear the widget and create the latest and history curves"""
         widget.clear()
-        number = self.model.number
-        self._pen_cycler = get_pen_cycler(START_COLOR, STOP_COLOR, number)
-        curves = []
-        for i in range(number):
-            pen = next(self._pen_cycler)
-            plot = widget.add_curve_item(name=f"curve-{i}", pen=pen)
-            curves.append(plot)
-
-        self.curves = curves
-        self._curve_cycler = cycle(self.curves)
+        # The density image has been removed with the curves
+        self._density = None
+        self._density_item = None
+
+        pens = self._get_pens()
+        self._history = TraceHistoryItem(pens[:-1])
+        widget.plotItem.addItem(self._history)
+        # The latest trace stays a data item for the legend, export and the
+        # data toggle of the plot
+        self._curve = widget.add_curve_item(name="curve", pen=pens[-1])
+        self._last_trace = None
+
+    def _get_pens(self):
+        """Return the pens from the oldest to the latest trace"""
+        return get_pen_gradient(STOP_COLOR, START_COLOR, self.model.number)
 
     # ----------------------------------------------------------------
     # Qt Slots
@@ -145,10 +414,36 @@ class DisplayDynamicGraph(BaseBindingController):
     def _change_model(self, content):
         self.model.trait_set(**restore_graph_config(content))
 
+    def _toggle_density(self, enabled):
+        self.model.density = enabled
+        self._set_density(enabled)
+
+    def _configure_density(self):
+        decay, ok = QInputDialog.getDouble(
+            self.widget, "Density Decay",
+            "Decay per trace (0: latest trace only):", self.model.decay,
+            0.0, 0.999, 3)
+        if not ok:
+            return
+        y_bins, ok = QInputDialog.getInt(
+            self.widget, "Density Bins", "Number of y bins:",
+            self.model.y_bins, MIN_Y_BINS, MAX_Y_BINS)
+        if not ok:
+            return
+
+        self.model.trait_set(decay=decay, y_bins=y_bins)
+        if self._density is not None:
+            self._density.decay = decay
+            if y_bins != self._density.y_bins:
+                self._density.y_bins = y_bins
+                self._density.clear()
+
     def _configure_number(self):
         curves, ok = QInputDialog.getInt(
             self.widget, "Number of Curves",
             f"Number (Max: {MAX_CURVES}):", self.model.number, 3, MAX_CURVES)
         if ok:
             self.model.number = curves
-            self._create_curves(self.widget)
+            pens = self._get_pens()
+            self._history.set_pens(pens[:-1])
+            self._curve.setPen(pens[-1])
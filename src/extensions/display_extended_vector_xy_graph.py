@@ -3,7 +3,6 @@
 # Created on November 2021
 # Copyright (C) European XFEL GmbH Hamburg. All rights reserved.
 #############################################################################
-import uuid
 from itertools import cycle
 from weakref import WeakValueDictionary
 
@@ -406,65 +405,51 @@ class BaseTableVectorXYGraph(BaseVectorXYGraph):
             lst.append(hsh)
 
         # Update plot data items
-        self._update_scatters(values=scatters)
-        self._update_lines(values=lines)
+        self._scatters = self._reconcile_items(
+            self._scatters, values=scatters, factory=self._add_scatter_item)
+        self._curves = self._reconcile_items(
+            self._curves, values=lines, factory=self._add_curve_item)
+
+    def _reconcile_items(self, items, *, values, factory):
+        """Update the plot data items keyed by their label in place
+
+        Items are only created for new labels and removed for labels that
+        are gone, the others keep their style and legend entry.
+        Duplicated labels are keyed with a conflict suffix.
+
+        :returns: the new dictionary of items
+        """
+        plotItem = self.widget.plotItem
+        old_items = dict(items)
+        new_items = {}
+        for hsh in values:
+            label = key = hsh['label']
+            while key in new_items:
+                key += CONFLICT_LEGEND_SUFFIX
+            item = old_items.pop(key, None)
+            if item is None:
+                item = factory(name=label)
+            item.setData(hsh['x'], hsh['y'])
+            new_items[key] = item
 
-        # Finalize changes
-        self.refresh_plot()
+        for item in old_items.values():
+            plotItem.removeItem(item)
 
-    def _update_lines(self, *, values):
-        # Resolve number of data items
-        num_items, num_values = len(self._curves), len(values)
-        if num_values > num_items:
-            # Add more data items
-            for _ in range(num_values - num_items):
-                pen = make_pen(next(self._colors))
-                item = self.widget.add_curve_item(pen=pen, connect='all')
-                self._curves[str(uuid.uuid4())] = item
-        elif num_values < num_items:
-            # Remove unused data items
-            data_items = list(self._curves.items())[:num_values]
-            self._curves = {label: item for label, item in data_items}
-
-        # Update data items
-        data_items = {}
-        for hsh, (label, item) in zip(values, self._curves.items()):
-            label = hsh['label']
-            item.setData(hsh['x'], hsh['y'])
-            item.opts["name"] = label
-            data_items[label] = item
-        self._curves = data_items
-
-    def _update_scatters(self, *, values):
-        # Resolve number of data items
-        num_items, num_values = len(self._scatters), len(values)
-        if num_values > num_items:
-            # Add more data items
-            for _ in range(num_values - num_items):
-                self._scatters[str(uuid.uuid4())] = self._add_scatter_item()
-        elif num_values < num_items:
-            # Remove unused data items
-            data_items = list(self._scatters.items())[:num_values]
-            self._scatters = {label: item for label, item in data_items}
-
-        # Update data items
-        data_items = {}
-        for hsh, (label, item) in zip(values, self._scatters.items()):
-            label = hsh['label']
-            item.setData(hsh['x'], hsh['y'])
-            item.opts["name"] = label
-            data_items[label] = item
-        self._scatters = data_items
+        return new_items
 
     def __colors_default(self):
         return cycle(['b', 'r', 'g', 'c', 'p', 'y', 'n', 'w',
                       'o', 's', 'd', 'k'])
 
-    def _add_scatter_item(self):
+    def _add_curve_item(self, name):
+        pen = make_pen(next(self._colors))
+        return self.widget.add_curve_item(name=name, pen=pen, connect='all')
+
+    def _add_scatter_item(self, name):
         color = next(self._colors)
         pen = make_pen(color, alpha=100)
         brush = make_brush(color, alpha=100)
-        item = self.widget.add_scatter_item(pen=pen, cycle=False)
+        item = self.widget.add_scatter_item(name=name, pen=pen, cycle=False)
         item.points_brush = brush
         item.setSize(5)
         return item
@@ -498,17 +483,6 @@ class BaseTableVectorXYGraph(BaseVectorXYGraph):
         self.proxy.edit_value = new_value
         send_property_changes((self.proxy,))
 
-    def refresh_plot(self, restore_curves=True):
-        # Save reference before removing from plot
-        lines = list(self._curves.values())
-        scatters = list(self._scatters.values())
-        # Remove all curves
-        self.widget.plotItem.clearPlots()
-        # Restore specified curves
-        if restore_curves:
-            for item in scatters + lines:
-                self.widget.plotItem.addItem(item)
-
 
 @register_binding_controller(
     ui_name='Table Vector XY Graph (read-only)',
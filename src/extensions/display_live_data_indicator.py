@@ -1,10 +1,15 @@
+from functools import lru_cache
+from heapq import heappop, heappush
+from itertools import count
+from math import ceil
 from pathlib import Path
 from time import time
 
-from qtpy.QtCore import QTimer
-from qtpy.QtSvg import QSvgWidget
-from qtpy.QtWidgets import QAction, QInputDialog, QLabel, QWidget
-from traits.api import Instance
+from qtpy.QtCore import QObject, QRectF, QTimer
+from qtpy.QtGui import QPainter
+from qtpy.QtSvg import QSvgRenderer
+from qtpy.QtWidgets import QAction, QInputDialog, QWidget
+from traits.api import Bool, Instance
 
 from karabogui.api import (
     BaseBinding, BaseBindingController, NodeBinding, PropertyProxy,
@@ -22,6 +27,112 @@ THUMBS_UP = str(Path(PARENT_DIR, "icons/thumbs-up.svg"))
 THUMBS_DOWN = str(Path(PARENT_DIR, "icons/thumbs-down.svg"))
 
 
+@lru_cache(maxsize=None)
+def get_svg_renderer(path: str) -> QSvgRenderer:
+    """Return a renderer shared by all indicators, an icon is parsed once"""
+    return QSvgRenderer(path)
+
+
+class IndicatorWidget(QWidget):
+    """Paint an svg icon with a shared renderer"""
+
+    def __init__(self, path: str, parent: QWidget = None):
+        super().__init__(parent)
+        self._renderer = None
+        self.load(path)
+
+    def load(self, path: str) -> None:
+        self._renderer = get_svg_renderer(path)
+        self.update()
+
+    def sizeHint(self):
+        return self._renderer.defaultSize()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        self._renderer.render(painter, QRectF(self.rect()))
+
+
+class StalenessMonitor(QObject):
+    """Notify the indicators when their data gets stale
+
+    All indicators share a single timer that is armed for the earliest
+    deadline of a heap. An update only moves the deadline of an indicator,
+    the heap is only touched when the entry of an indicator expires.
+    """
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+        self._deadlines = {}
+        self._queued = {}
+        self._heap = []
+        self._counter = count()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._expire)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, indicator, deadline: float) -> None:
+        """Call `indicator.data_stale` once the `deadline` has passed"""
+        self._deadlines[indicator] = deadline
+        queued = self._queued.get(indicator)
+        if queued is None or deadline < queued:
+            self._push(indicator, deadline)
+            self._arm()
+
+    def cancel(self, indicator) -> None:
+        self._deadlines.pop(indicator, None)
+        self._queued.pop(indicator, None)
+
+    def _push(self, indicator, deadline):
+        self._queued[indicator] = deadline
+        heappush(self._heap, (deadline, next(self._counter), indicator))
+
+    def _arm(self):
+        heap = self._heap
+        while heap and self._queued.get(heap[0][2]) != heap[0][0]:
+            # Drop the entries of cancelled or rescheduled indicators
+            heappop(heap)
+        if not heap:
+            self._timer.stop()
+            return
+        delay = max(ceil((heap[0][0] - time()) * 1000), 0)
+        self._timer.start(delay)
+
+    def _expire(self):
+        now = time()
+        heap, stale = self._heap, []
+        while heap and heap[0][0] <= now:
+            deadline, _, indicator = heappop(heap)
+            if self._queued.get(indicator) != deadline:
+                continue
+            del self._queued[indicator]
+            current = self._deadlines.get(indicator)
+            if current is None:
+                continue
+            if current > now:
+                self._push(indicator, current)
+            else:
+                del self._deadlines[indicator]
+                stale.append(indicator)
+        self._arm()
+
+        for indicator in stale:
+            indicator.data_stale()
+
+
+_monitor = None
+
+
+def get_staleness_monitor() -> StalenessMonitor:
+    global _monitor
+    if _monitor is None:
+        _monitor = StalenessMonitor()
+    return _monitor
+
+
 @register_binding_controller(ui_name="Live Data Indicator",
                              klassname="LiveDataIndicator",
                              binding_type=BaseBinding, priority=-30,
@@ -30,12 +141,10 @@ THUMBS_DOWN = str(Path(PARENT_DIR, "icons/thumbs-down.svg"))
 class LiveDataIndicator(BaseBindingController):
 
     model = Instance(LiveDataIndicatorModel, args=())
-    _refresh_timer = Instance(QTimer)
+    _healthy = Bool(False)
 
-    def create_widget(self, parent: QWidget) -> QLabel:
-        widget = QSvgWidget(THUMBS_DOWN, parent=parent)
-        self._refresh_timer = QTimer()
-        self._refresh_timer.timeout.connect(self._check_for_stale_data)
+    def create_widget(self, parent: QWidget) -> IndicatorWidget:
+        widget = IndicatorWidget(THUMBS_DOWN, parent=parent)
 
         update_interval = QAction("Update refresh interval...", widget)
         update_interval.triggered.connect(self._update_refresh_interval)
@@ -43,33 +152,42 @@ class LiveDataIndicator(BaseBindingController):
 
         return widget
 
+    def destroy_widget(self) -> None:
+        get_staleness_monitor().cancel(self)
+
     def value_update(self, proxy: PropertyProxy) -> None:
         if get_binding_value(proxy.binding) is None:
             return
         timestamp = proxy.binding.timestamp.time_sec
         if timestamp is not None:
-            self.update_health_status(healthy=self._is_healthy())
-
-        timeout = self.model.refresh_interval * 1000
-        self._refresh_timer.start(timeout)
+            self._check_health(timestamp)
 
     def clear_widget(self) -> None:
+        get_staleness_monitor().cancel(self)
         self.update_health_status(healthy=False)
-        if self._refresh_timer.isActive():
-            self._refresh_timer.stop()
 
     def update_health_status(self, healthy: bool) -> None:
+        if healthy == self._healthy:
+            return
+        self._healthy = healthy
         icon_path = THUMBS_UP if healthy else THUMBS_DOWN
         self.widget.load(icon_path)
 
-    def _is_healthy(self) -> bool:
-        timestamp = self.proxy.binding.timestamp.time_sec
-        return (time() - timestamp) < self.model.refresh_interval
+    def data_stale(self) -> None:
+        """Called by the staleness monitor once the refresh interval passed
+        """
+        self.update_health_status(healthy=False)
+
+    def _check_health(self, timestamp: float) -> None:
+        deadline = timestamp + self.model.refresh_interval
+        healthy = time() < deadline
+        self.update_health_status(healthy=healthy)
 
-    def _check_for_stale_data(self) -> None:
-        if not self._is_healthy():
-            self.update_health_status(healthy=False)
-            self._refresh_timer.stop()
+        monitor = get_staleness_monitor()
+        if healthy:
+            monitor.schedule(self, deadline)
+        else:
+            monitor.cancel(self)
 
     def _update_refresh_interval(self) -> None:
         value = self.model.refresh_interval
@@ -78,4 +196,6 @@ class LiveDataIndicator(BaseBindingController):
             min=1)
         if ok:
             self.model.trait_set(refresh_interval=interval)
-            self._refresh_timer.setInterval(interval*1000)
+            timestamp = self.proxy.binding.timestamp.time_sec
+            if timestamp is not None:
+                self._check_health(timestamp)
@@ -4,15 +4,18 @@
 import math
 import random
 import re
+from functools import partial
 
-from qtpy.QtCore import QLineF, QPointF, QRectF, QSizeF, Qt, qFuzzyCompare
+from qtpy.QtCore import (
+    QLineF, QPointF, QRectF, QSizeF, Qt, QTimer, qFuzzyCompare)
 from qtpy.QtGui import (
     QColor, QGuiApplication, QPainter, QPainterPath, QPen, QRadialGradient)
 from qtpy.QtWidgets import (
-    QCheckBox, QGraphicsItem, QGraphicsScene, QGraphicsView, QGroupBox,
-    QHBoxLayout, QLineEdit, QPushButton, QStyle, QVBoxLayout, QWidget)
+    QCheckBox, QComboBox, QGraphicsItem, QGraphicsScene, QGraphicsView,
+    QGroupBox, QHBoxLayout, QLineEdit, QPushButton, QStyle, QVBoxLayout,
+    QWidget)
 from traits.api import (
-    Bool, Dict, Float, Instance, Int, List, String, Undefined, WeakRef)
+    Bool, Dict, Float, Instance, Int, List, Set, String, Undefined, WeakRef)
 
 import karabogui.icons as icons
 from karabogui import messagebox
@@ -30,7 +33,8 @@ GROUP_COLORS = {
     "p2p": (QColor("#52b788"), QColor("#6c757d")),
     "daq_sink": (QColor("#ffc8dd"), QColor("#7209b7")),
     "daq_source": (QColor("#bde0fe"), QColor("#7209b7")),
-    "ERROR": (QColor("#ffadad"), QColor("#6c757d"))
+    "ERROR": (QColor("#ffadad"), QColor("#6c757d")),
+    "aggregate": (QColor("#e9c46a"), QColor("#6c757d"))
 }
 
 STATUS_COLOR = {
@@ -41,7 +45,26 @@ STATUS_COLOR = {
     "unclear": QColor("#f4a261")
 }
 
+# The most severe status of aggregated edges wins
+STATUS_SEVERITY = {
+    "passive": 0,
+    "active": 1,
+    "unclear": 2,
+    "output_broken": 3,
+    "input_broken": 3,
+}
+
+# Delay to batch the saving of node positions in the model (ms)
+SAVE_POSITIONS_DELAY = 2000
+
+AGGREGATE_GROUP = "aggregate"
+AGGREGATIONS = ("none", "domain", "prefix", "server")
+
 SHADOW_COLOR = QColor(100, 100, 100, 100)
+
+# Level of detail thresholds for painting the scene
+LOD_GRADIENT = 0.5
+LOD_LABEL = 2.0
 FILTER_ACTIVE_COLOR = "#d8f3dc"
 FILTER_DISABLED_COLOR = "#ced4da"
 
@@ -96,8 +119,19 @@ class Node(QGraphicsItem):
         self.graph = graphWidget
         self.label = label
         self.group = group
+        self.members = []
         self.setToolTip(self.label)
 
+    def set_members(self, members):
+        """Set the device ids aggregated by this node"""
+        if members == self.members:
+            return
+        self.members = members
+        self.prepareGeometryChange()
+        self.node_scale = 1.0 + math.log2(len(members)) / 2 if members else 1.0
+        self.setToolTip(f"{self.label}\n{len(members)} devices, "
+                        "double-click to expand" if members else self.label)
+
     def add_edge(self, edge):
         self.edge_list.append(edge)
         edge.adjust()
@@ -112,10 +146,7 @@ class Node(QGraphicsItem):
 
         xvel = 0
         yvel = 0
-        items = self.scene().items()
-        for node in items:
-            if not isinstance(node, Node):
-                continue  # skip items that are note a Node
+        for node in self.graph.nodes.values():
             vec = self.mapToItem(node, 0, 0)
             dx = vec.x()
             dy = vec.y()
@@ -165,11 +196,19 @@ class Node(QGraphicsItem):
 
     def paint(self, painter, option, widget=None):
         scl = self.node_scale
+        color1, color2 = GROUP_COLORS[self.group]
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        if lod < LOD_GRADIENT:
+            # Zoomed out, a flat circle is enough
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(color1)
+            painter.drawEllipse(-10 * scl, -10 * scl, 20 * scl, 20 * scl)
+            return
+
         painter.setPen(Qt.NoPen)
         painter.setBrush(SHADOW_COLOR)
         painter.drawEllipse(-10 * scl + 3, -10 * scl + 3, 20 * scl, 20 * scl)
         gradient = QRadialGradient(-3 * scl, -3 * scl, 10 * scl)
-        color1, color2 = GROUP_COLORS[self.group]
         pencolor = QColor("black")
 
         if option.state == QStyle.State_Sunken:
@@ -183,6 +222,9 @@ class Node(QGraphicsItem):
         painter.setBrush(gradient)
         painter.setPen(QPen(pencolor, 0))
         painter.drawEllipse(-10 * scl, -10 * scl, 20 * scl, 20 * scl)
+        if lod < LOD_LABEL:
+            # The label would not be readable
+            return
         font = painter.font()
         font.setBold(False)
         font.setPointSize(2)
@@ -193,7 +235,8 @@ class Node(QGraphicsItem):
         if change == QGraphicsItem.ItemPositionHasChanged:
             for edge in self.edge_list:
                 edge.adjust()
-            self.graph.itemMoved()
+            if self.scene() is not None:
+                self.graph.itemMoved()
 
         return super().itemChange(change, value)
 
@@ -234,7 +277,15 @@ class Node(QGraphicsItem):
         This is mostly a copy of the topology method, except that we need
         to request schemas and configurations every time, as we will not
         have necessarily done this for a given node already.
+
+        Double-clicking an aggregate expands it into its members.
         """
+        if self.members:
+            # This node is removed from the scene when expanding
+            expand = self.graph.main_widget.expand_aggregate
+            QTimer.singleShot(0, partial(expand, self.label))
+            return
+
         device_id = str(self.label)
 
         def _config_handler():
@@ -292,7 +343,7 @@ class Node(QGraphicsItem):
         the ALT modifier is pressed.
         """
         modifiers = QGuiApplication.keyboardModifiers()
-        if modifiers & Qt.ShiftModifier:
+        if modifiers & Qt.ShiftModifier and not self.members:
             broadcast_event(KaraboEvent.ShowConfiguration,
                             {'proxy': get_topology().get_device(self.label)})
             event.accept()
@@ -319,10 +370,14 @@ class Edge(QGraphicsItem):
         super().__init__()
         self.setAcceptedMouseButtons(Qt.NoButton)
         self.setAcceptHoverEvents(True)
+        # The edges are painted batched by the `EdgeLayer`
+        self.setFlag(QGraphicsItem.ItemHasNoContents, True)
         self.setZValue(-1.0)
         self.source = source_node
         self.dest = dest_node
         self.status = status
+        # The number of aggregated connections
+        self.count = 1
         self.source.add_edge(self)
         self.dest.add_edge(self)
         self.adjust()
@@ -348,6 +403,11 @@ class Edge(QGraphicsItem):
             self.dest_point = line.p2() - edge_offset
         else:
             self.source_point = self.dest_point = line.p1()
+        self.invalidate_layer()
+
+    def invalidate_layer(self):
+        if self.source is not None and self.source.graph is not None:
+            self.source.graph.edge_layer.invalidate()
 
     def boundingRect(self):
         if self.source is None or self.dest is None:
@@ -360,20 +420,94 @@ class Edge(QGraphicsItem):
 
         return rect
 
+    def line(self):
+        return QLineF(self.source_point, self.dest_point)
+
     def paint(self, painter, option, widget=None):
-        if self.source is None or self.dest is None:
-            return
-        line = QLineF(self.source_point, self.dest_point)
-        if qFuzzyCompare(line.length(), 0):
-            return
+        """The edges are painted by the `EdgeLayer`"""
 
-        color = STATUS_COLOR[self.status]
+    def itemChange(self, change, value):
+        if change == QGraphicsItem.ItemVisibleHasChanged:
+            self.invalidate_layer()
+
+        return super().itemChange(change, value)
 
-        painter.setPen(
-            QPen(color,
-                 5,
-                 Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        painter.drawLine(line)
+
+class EdgeLayer(QGraphicsItem):
+    """
+    Paints all edges of the graph with a single path per status.
+
+    The paths are rebuilt lazily after any edge has been adjusted, changed
+    its visibility or status, or was removed.
+    """
+
+    def __init__(self, graph_widget):
+        super().__init__()
+        self.setAcceptedMouseButtons(Qt.NoButton)
+        self.setZValue(-1.0)
+        self.graph = graph_widget
+        self._paths = None
+        self._counts = []
+        self._rect = QRectF()
+
+    def invalidate(self):
+        if self._paths is not None:
+            self.prepareGeometryChange()
+            self._paths = None
+
+    def _build_paths(self):
+        paths = {}
+        counts = []
+        rect = QRectF()
+        for dest_edges in self.graph.edges.values():
+            for edge in dest_edges.values():
+                if not edge.isVisible():
+                    continue
+                line = edge.line()
+                if qFuzzyCompare(line.length(), 0):
+                    continue
+                path = paths.setdefault(edge.status, QPainterPath())
+                path.moveTo(line.p1())
+                path.lineTo(line.p2())
+                if edge.count > 1:
+                    counts.append((line.center(), str(edge.count)))
+        for path in paths.values():
+            rect = rect.united(path.boundingRect())
+        self._paths = paths
+        self._counts = counts
+        # Account for the pen width
+        self._rect = rect.adjusted(-3, -3, 3, 3)
+
+    def boundingRect(self):
+        if self._paths is None:
+            self._build_paths()
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        if self._paths is None:
+            self._build_paths()
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        painter.setBrush(Qt.NoBrush)
+        for status, path in self._paths.items():
+            color = STATUS_COLOR[status]
+            if lod < LOD_GRADIENT:
+                painter.setPen(QPen(color, 0))
+            else:
+                painter.setPen(
+                    QPen(color,
+                         5,
+                         Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+            painter.drawPath(path)
+
+        if lod < LOD_GRADIENT or not self._counts:
+            return
+        # The number of connections between aggregates
+        font = painter.font()
+        font.setPointSize(4)
+        painter.setFont(font)
+        painter.setPen(QColor("black"))
+        for center, text in self._counts:
+            painter.drawText(center, text)
 
 
 class NetworkX:
@@ -398,7 +532,8 @@ class GraphWidget(QGraphicsView):
         self.scale_factor = 1.0
         self.main_widget = main_widget
         self._scene = QGraphicsScene(parent=self)
-        self._scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        # The index is only used while the layout is not simulated
+        self._scene.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
         self._scene.setSceneRect(-400 * 2, -400 * 2, 800 * 2, 800 * 2)
         self.setScene(self._scene)
         self.setCacheMode(QGraphicsView.CacheBackground)
@@ -412,6 +547,10 @@ class GraphWidget(QGraphicsView):
         self.timer_id = 0
         self.nodes = {}
         self.edges = {}
+        # The nodes moved by the simulation, `None` for all of them
+        self._moving = None
+        self.edge_layer = EdgeLayer(self)
+        self._scene.addItem(self.edge_layer)
 
     def create_graph(self, node_edge_list):
         """
@@ -419,66 +558,125 @@ class GraphWidget(QGraphicsView):
 
         :param node_edge_list: A list of Hashes defining nodes and edges
 
-        Updates will only happen if nodes are not present yet, or if the
-        byte rate of an edge has changed.
-        """
+        The graph is reconciled with the rows by node label and by
+        (origin, destination) for the edges. Only nodes and edges that
+        are not present anymore are removed, and only changed groups and
+        states are restyled. New nodes are placed at the given positions,
+        existing nodes keep their position.
 
-        # first pass is for the nodes themselves
-        nodes = self.nodes
-        edges = self.edges
+        :return: A dictionary of the newly added nodes by their label
+        """
+        groups = {}
+        positions = {}
+        statuses = {}
+        counts = {}
         for row in node_edge_list:
             source = row["originNode"]
             dest = row["destinationNode"]
-            source_type = row["originType"]
-            dest_type = row["destinationType"]
-            status = row["status"]
-            origin_pos = row["originPos"]
-            dest_pos = row["destPos"]
-            if source not in nodes:
-                source_node = Node(self, label=source, group=source_type)
-                self._scene.addItem(source_node)
-                source_node.setPos(*origin_pos)
-                nodes[source] = source_node
-            else:
-                source_node = nodes[source]
-                # daq types have priority
-                if "daq" in source_type:
-                    if source_node.group != "daq_sink":
-                        source_node.group = source_type
-
-            if dest not in nodes:
-                dest_node = Node(self, label=dest, group=dest_type)
-                self._scene.addItem(dest_node)
-                dest_node.setPos(*dest_pos)
-                nodes[dest] = dest_node
-            else:
-                dest_node = nodes[dest]
+            for label, group, pos in ((source, row["originType"],
+                                       row["originPos"]),
+                                      (dest, row["destinationType"],
+                                       row["destPos"])):
+                positions.setdefault(label, pos)
+                if label not in groups:
+                    groups[label] = group
                 # daq types have priority
-                if "daq" in dest_type:
-                    if dest_node.group != "daq_sink":
-                        dest_node.group = dest_type
+                elif "daq" in group and groups[label] != "daq_sink":
+                    groups[label] = group
+            statuses[(source, dest)] = row["status"]
+            counts[(source, dest)] = row.get("count", 1)
 
-            if source not in edges or dest not in edges[source]:
-                edge = Edge(source_node, dest_node, status=status)
+        nodes = self.nodes
+        edges = self.edges
+
+        # Remove the vanished edges and nodes first
+        for source, dest_edges in list(edges.items()):
+            for dest in list(dest_edges):
+                if (source, dest) not in statuses:
+                    self._remove_edge(source, dest)
+        for label in list(nodes):
+            if label not in groups:
+                self._remove_node(label)
+
+        added = {}
+        for label, group in groups.items():
+            node = nodes.get(label)
+            if node is None:
+                node = Node(self, label=label, group=group)
+                # Position before adding to not trigger the simulation
+                node.setPos(*positions[label])
+                self._scene.addItem(node)
+                nodes[label] = node
+                added[label] = node
+            elif node.group != group:
+                node.group = group
+                node.update()
+
+        for (source, dest), status in statuses.items():
+            edge = edges.get(source, {}).get(dest)
+            count = counts[(source, dest)]
+            if edge is None:
+                edge = Edge(nodes[source], nodes[dest], status=status)
+                edge.count = count
                 self._scene.addItem(edge)
-                sedge = edges.setdefault(source, {})
-                sedge[dest] = edge
+                edges.setdefault(source, {})[dest] = edge
+            elif edge.status != status or edge.count != count:
+                edge.status = status
+                edge.count = count
+                self.edge_layer.invalidate()
+
+        return added
+
+    def _remove_edge(self, source, dest):
+        edge = self.edges[source].pop(dest)
+        if not self.edges[source]:
+            del self.edges[source]
+        for node in (edge.source, edge.dest):
+            if node is not None and edge in node.edge_list:
+                node.edge_list.remove(edge)
+        self._scene.removeItem(edge)
+        self.edge_layer.invalidate()
+
+    def _remove_node(self, label):
+        node = self.nodes.pop(label)
+        for edge in node.edge_list[:]:
+            self._remove_edge(edge.source.label, edge.dest.label)
+        if self._moving is not None:
+            self._moving.discard(node)
+        self._scene.removeItem(node)
+
+    def simulate(self, nodes=None):
+        """
+        Start the layout simulation
 
-        self.nodes = nodes
-        self.edges = edges
+        :param nodes: The nodes to move, or `None` to move all nodes. The
+                      other nodes keep their position but exert forces.
+        """
+        self._moving = None if nodes is None else set(nodes)
+        if self.timer_id == 0:
+            self._start_timer()
 
     def itemMoved(self):
         if self.timer_id == 0:
-            self.timer_id = self.startTimer(1000 // 25)
+            self._moving = None
+            self._start_timer()
             self.main_widget.toggle_freeze_button(True)
 
+    def _start_timer(self):
+        # Moving items would rebuild the index on every step
+        self._scene.setItemIndexMethod(QGraphicsScene.NoIndex)
+        self.timer_id = self.startTimer(1000 // 25)
+
+    def _stop_timer(self):
+        if self.timer_id != 0:
+            self.killTimer(self.timer_id)
+        self.timer_id = 0
+        self._moving = None
+        self._scene.setItemIndexMethod(QGraphicsScene.BspTreeIndex)
+
     def timerEvent(self, event):
-        nodes = []
-        items = self.scene().items()
-        for node in items:
-            if not isinstance(node, Node):
-                continue
-            nodes.append(node)
+        nodes = (list(self.nodes.values()) if self._moving is None
+                 else list(self._moving))
 
         for node in nodes:
             node.calculate_forces()
@@ -489,8 +687,7 @@ class GraphWidget(QGraphicsView):
                 items_moved = True
 
         if not items_moved:
-            self.killTimer(self.timer_id)
-            self.timer_id = 0
+            self._stop_timer()
             self.save_node_positions()
 
     def freeze(self, freeze):
@@ -500,22 +697,17 @@ class GraphWidget(QGraphicsView):
         :param freeze: True to freeze motion, False to enable
         """
         if freeze:
-            self.killTimer(self.timer_id)
-            self.timer_id = 0
+            self._stop_timer()
             self.save_node_positions()
         else:
-            if self.timer_id == 0:
-                self.timer_id = self.startTimer(1000 // 25)
+            self.simulate()
 
     def save_node_positions(self):
         """
         Trigger saving node positions in the widgets model
         """
         node_positions = {}
-        items = self.scene().items()
-        for node in items:
-            if not isinstance(node, Node):
-                continue
+        for node in self.nodes.values():
             node_positions[node.label] = [node.pos().x(), node.pos().y()]
         self.main_widget.save_node_positions(node_positions)
 
@@ -536,12 +728,97 @@ class GraphWidget(QGraphicsView):
 
         :param filters: A list of FilterItems
         """
-        for node in self.scene().items():
-            if not isinstance(node, Node):
-                continue
+        for node in self.nodes.values():
             node.apply_filter(filters)
 
 
+def get_aggregate_key(device_id, aggregation):
+    """
+    Return the aggregation key of a device
+
+    :param device_id: The device id
+    :param aggregation: One of `AGGREGATIONS`
+
+    :return: The key or `None` if the device is not aggregated
+    """
+    if aggregation == "domain":
+        parts = device_id.split("/")
+        return parts[0] if len(parts) > 1 else None
+    elif aggregation == "prefix":
+        parts = device_id.split("/")
+        return "/".join(parts[:2]) if len(parts) > 2 else None
+    elif aggregation == "server":
+        attrs = get_topology().get_attributes(f"device.{device_id}")
+        return attrs.get("serverId") if attrs else None
+    return None
+
+
+def aggregate_rows(rows, key_func, expanded=()):
+    """
+    Collapse the devices of the connection rows into aggregates
+
+    Devices sharing a key are represented by one aggregate node, if there is
+    more than one of them and the key is not `expanded`. Connections
+    between aggregates are merged, counted and carry the most severe status.
+    Connections within an aggregate are dropped.
+
+    :param rows: A list of Hashes defining the connections
+    :param key_func: A callable returning the key of a device id or `None`
+    :param expanded: The keys of the aggregates to expand
+
+    :return: A tuple of the rows and a dictionary of the aggregate labels
+        and their member device ids
+    """
+    keys = {}
+    for row in rows:
+        for device_id in (row["originNode"], row["destinationNode"]):
+            if device_id not in keys:
+                keys[device_id] = key_func(device_id)
+
+    members = {}
+    for device_id, key in keys.items():
+        if key is not None and key not in expanded:
+            members.setdefault(f"{key}/*", []).append(device_id)
+    members = {label: device_ids for label, device_ids in members.items()
+               if len(device_ids) > 1}
+    mapping = {device_id: label for label, device_ids in members.items()
+               for device_id in device_ids}
+
+    aggregated = {}
+    for row in rows:
+        source = mapping.get(row["originNode"], row["originNode"])
+        dest = mapping.get(row["destinationNode"], row["destinationNode"])
+        if source == dest:
+            continue
+        status = row["status"]
+        connection = aggregated.get((source, dest))
+        if connection is None:
+            aggregated[(source, dest)] = {
+                "originNode": source,
+                "destinationNode": dest,
+                "originType": (AGGREGATE_GROUP if source in members
+                               else row["originType"]),
+                "destinationType": (AGGREGATE_GROUP if dest in members
+                                    else row["destinationType"]),
+                "status": status,
+                "count": 1}
+            continue
+        connection["count"] += 1
+        if (STATUS_SEVERITY.get(status, 0)
+                > STATUS_SEVERITY.get(connection["status"], 0)):
+            connection["status"] = status
+        # daq types have priority
+        for node_key, type_key in (("originNode", "originType"),
+                                   ("destinationNode", "destinationType")):
+            if row[node_key] in mapping:
+                continue
+            if ("daq" in row[type_key]
+                    and connection[type_key] != "daq_sink"):
+                connection[type_key] = row[type_key]
+
+    return list(aggregated.values()), members
+
+
 class FilterItem(QCheckBox):
     """
     Filter items determine which nodes (and connecting edges) are shown.
@@ -638,6 +915,16 @@ class NetworkX(BaseBindingController):
     filter_ledit = Instance(QLineEdit)
     filter_instances = Instance(QHBoxLayout)
 
+    # The last rows and the expanded aggregates
+    _rows = List()
+    _expanded = Set(String)
+    _members = Dict(String, List(String))
+    # The start positions of the members of an expanded aggregate
+    _anchors = Dict(String, Instance(QPointF))
+    # The pending node positions to save and the throttling timer
+    _positions = Dict()
+    _save_timer = Instance(QTimer)
+
     def create_widget(self, parent):
         widget = QWidget(parent=parent)
         layout = QVBoxLayout()
@@ -654,9 +941,19 @@ class NetworkX(BaseBindingController):
         freeze_btn.clicked.connect(self.on_freeze)
         self.freeze_btn = freeze_btn
         self.frozen = False
+        aggregation_cb = QComboBox()
+        aggregation_cb.setToolTip("Aggregate devices by")
+        aggregation_cb.addItems(AGGREGATIONS)
+        aggregation_cb.setCurrentText(self.model.aggregation)
+        aggregation_cb.currentTextChanged.connect(self.on_aggregation)
+        collapse_btn = QPushButton("Collapse")
+        collapse_btn.setToolTip("Collapse all expanded aggregates")
+        collapse_btn.clicked.connect(self.on_collapse)
         filter_layout.addWidget(self.filter_ledit)
         filter_layout.addWidget(clear_filter_btn)
         filter_layout.addWidget(freeze_btn)
+        filter_layout.addWidget(aggregation_cb)
+        filter_layout.addWidget(collapse_btn)
         layout.addLayout(filter_layout)
 
         self.filter_instances = QHBoxLayout()
@@ -685,64 +982,141 @@ class NetworkX(BaseBindingController):
         self.graphwidget = GraphWidget(self, parent=widget)
         layout.addWidget(self.graphwidget)
         widget.setLayout(layout)
+
+        self._save_timer = QTimer(widget)
+        self._save_timer.setSingleShot(True)
+        self._save_timer.setInterval(SAVE_POSITIONS_DELAY)
+        self._save_timer.timeout.connect(self._save_positions)
         return widget
 
+    def destroy_widget(self):
+        if self._save_timer is not None and self._save_timer.isActive():
+            self._save_timer.stop()
+            self._save_positions()
+
     def value_update(self, proxy):
         value = get_binding_value(proxy)
-        if value is None:
+        if value is None or not self.graphwidget:
             return
 
+        self._rows = list(value)
+        self._update_graph()
+
+    def _update_graph(self):
+        rows = self._rows
+        aggregation = self.model.aggregation
+        members = {}
+        if aggregation != "none":
+            rows, members = aggregate_rows(
+                rows, partial(get_aggregate_key, aggregation=aggregation),
+                expanded=self._expanded)
+        self._members = members
+
         node_edge_list = []
-        any_random_pos = False
         position_dict = {p.device_id: (p.x, p.y)
                          for p in self.model.nodePositions}
-        for row in value:
+        for row in rows:
             origin = row["originNode"]
             dest = row["destinationNode"]
-            if origin not in position_dict:
-                any_random_pos |= True
-
-            if dest not in position_dict:
-                any_random_pos |= True
-
             # in case the node is not saved with its position yet, we generate
-            # a random start position
-            origin_pos = position_dict.get(
-                origin, [(random.random() - 0.5) * 100,
-                         (random.random() - 0.5) * 100])
-            des_pos = position_dict.get(
-                dest, [(random.random() - 0.5) * 100,
-                       (random.random() - 0.5) * 100])
-            row["originPos"] = origin_pos
-            row["destPos"] = des_pos
-            row["originNode"] = origin
-            row["destinationNode"] = dest
+            # a random start position. Existing nodes keep their position.
+            row["originPos"] = self._start_position(origin, position_dict)
+            row["destPos"] = self._start_position(dest, position_dict)
             node_edge_list.append(row)
-        if self.graphwidget:
-            self.graphwidget.create_graph(node_edge_list)
-            self.update_filter()
+        self._anchors = {}
+
+        graph = self.graphwidget
+        added = graph.create_graph(node_edge_list)
+        for label, node in graph.nodes.items():
+            node.set_members(members.get(label, []))
+        self.update_filter()
 
         # sort out if any new nodes (with random positions) were added
-        # if so, we should un-freeze the widget so that forces are applied
-        # and bring it into a new equilibrium.
-        if not any_random_pos:
-            self.graphwidget.freeze(True)
-            self.toggle_freeze_button(True)
-            self.frozen = True
-        # if nothing was added we maintain the existing positions.
-        else:
+        # if so, only these enter the simulation and find their place in
+        # the existing layout.
+        unplaced = [node for label, node in added.items()
+                    if label not in position_dict]
+        if unplaced:
+            graph.simulate(unplaced)
             self.toggle_freeze_button(False)
             self.frozen = False
+        # if nothing was added we maintain the existing positions.
+        elif graph.timer_id == 0:
+            self.toggle_freeze_button(True)
+            self.frozen = True
+
+    def _start_position(self, device_id, position_dict):
+        node = self.graphwidget.nodes.get(device_id)
+        if node is not None:
+            return [node.pos().x(), node.pos().y()]
+        if device_id in position_dict:
+            return position_dict[device_id]
+        anchor = self._anchors.get(device_id)
+        if anchor is not None:
+            # Members of an expanded aggregate start around it
+            return [anchor.x() + (random.random() - 0.5) * 40,
+                    anchor.y() + (random.random() - 0.5) * 40]
+        return [(random.random() - 0.5) * 100, (random.random() - 0.5) * 100]
+
+    def expand_aggregate(self, label):
+        """
+        Expand an aggregate node into its members
+
+        Only the members without a saved position are laid out.
+        """
+        members = self._members.get(label)
+        node = self.graphwidget.nodes.get(label)
+        if not members or node is None:
+            return
+        self._anchors = {device_id: node.pos() for device_id in members}
+        self._expanded.add(label[:-len("/*")])
+        self._update_graph()
+
+    def on_aggregation(self, aggregation):
+        self.model.aggregation = aggregation
+        self._expanded = set()
+        self._update_graph()
+
+    def on_collapse(self):
+        """
+        Collapse all expanded aggregates
+        """
+        if not self._expanded:
+            return
+        self._expanded = set()
+        self._update_graph()
 
     def save_node_positions(self, node_positions):
         """
-        Saves node positions to the model
+        Request to save node positions to the model
+
+        Requests are batched and written to the model after a delay.
         """
-        position_list = []
-        for device_id, (x, y) in node_positions.items():
-            traits = {'device_id': device_id, 'x': x, 'y': y}
-            position_list.append(NodePosition(**traits))
-        self.model.nodePositions = position_list
+        self._positions.update(node_positions)
+        if not self._save_timer.isActive():
+            self._save_timer.start()
+
+    def _save_positions(self):
+        if not self._positions:
+            return
+        # Positions of the nodes not shown, e.g. aggregated, are kept as
+        # long as their devices are still part of the topology
+        known = {f"{key}/*" for key in self._expanded}
+        known.update(self.graphwidget.nodes if self.graphwidget else ())
+        for row in self._rows:
+            known.add(row["originNode"])
+            known.add(row["destinationNode"])
+        saved = {p.device_id: (p.x, p.y) for p in self.model.nodePositions}
+        positions = {device_id: position for device_id, position
+                     in saved.items() if not self._rows or device_id in known}
+        positions.update({device_id: (x, y) for device_id, (x, y)
+                          in self._positions.items()})
+        self._positions = {}
+        if positions == saved:
+            return
+        self.model.nodePositions = [
+            NodePosition(device_id=device_id, x=x, y=y)
+            for device_id, (x, y) in positions.items()]
 
     def on_freeze(self):
         """
@@ -23,6 +23,22 @@ def deg_to_cart(theta, radius):
     return pos_x, pos_y
 
 
+def get_radial_lines(outer_x, outer_y):
+    """Return the path of the radial lines from the origin to the outer points
+
+    The lines are drawn as a single item, every second segment of the path
+    is skipped with the returned `connect` array.
+    """
+    num = len(outer_x)
+    x = np.zeros(2 * num)
+    y = np.zeros(2 * num)
+    x[1::2] = outer_x
+    y[1::2] = outer_y
+    connect = np.zeros(2 * num, dtype=np.int32)
+    connect[::2] = 1
+    return x, y, connect
+
+
 @register_binding_controller(
     ui_name='Polar Plot Widget',
     klassname='PolarPlot',
@@ -33,13 +49,19 @@ class DisplayPolarPlot(BaseBindingController):
     model = Instance(PolarPlotModel, args=())
     _scatter_plot = Instance(object)
     _fit_curve = WeakRef(PlotDataItem)
-    _curves = List(WeakRef(PlotDataItem))
-    _text_items = List(WeakRef(TextItem))
+    _radial_lines = WeakRef(PlotDataItem)
+    # A pool of angle labels, unused labels are hidden
+    _text_items = List(Instance(TextItem))
+    # The angles of the radial lines and labels drawn
+    _theta = Instance(np.ndarray)
 
     def create_widget(self, parent):
         widget = KaraboPlotView(parent=parent)
 
         self._scatter_plot = widget.add_scatter_item()
+        self._scatter_plot.setSymbol("s")
+        self._scatter_plot.setPen("w")
+        self._scatter_plot.setBrush((255, 0, 0))
 
         number_action = QAction("Number of Ellipses", widget)
         number_action.triggered.connect(self._configure_number)
@@ -52,6 +74,7 @@ class DisplayPolarPlot(BaseBindingController):
         widget.plotItem.addLine(x=0, pen={'color': 'k'})
         widget.plotItem.addLine(y=0, pen={'color': 'k'})
 
+        self._radial_lines = widget.add_curve_item(name="radial")
         self._fit_curve = widget.add_curve_item(name="fit", pen=make_pen("r"))
 
         return widget
@@ -67,55 +90,43 @@ class DisplayPolarPlot(BaseBindingController):
 
         # Verify the length of both arrays
         min_size = min(len(theta), len(radius))
-        theta = theta[:min_size]
-        radius = radius[:min_size]
+        theta = np.asarray(theta[:min_size])
+        radius = np.asarray(radius[:min_size])
 
-        pos_x, pos_y = deg_to_cart(theta, radius)
-        r = [self.model.max_ellipses_radius] * len(theta)
-        outer_ellipse_x, outer_ellipse_y = deg_to_cart(theta, r)
-
-        if (self._scatter_plot.points() is None or
-                len(pos_x) != len(self._scatter_plot.points())):
+        if self._theta is None or len(theta) != len(self._theta):
             self._plot_ellipses()
+        if self._theta is None or not np.array_equal(theta, self._theta):
+            self._plot_angles(theta)
 
-            for curve in self._curves:
-                self.widget.plotItem.removeItem(curve)
-
-            self._curves = []
-            self._text_items = []
-            for idx, theta in enumerate(theta):
-                curve = self.widget.add_curve_item(name=f"{theta}°")
-                curve.setData([0, outer_ellipse_x[idx]],
-                              [0, outer_ellipse_y[idx]])
-                self._curves.append(curve)
-
-                text_item = TextItem(f"{theta}°")
-                self.widget.plotItem.addItem(text_item)
-                text_item.setPos(outer_ellipse_x[idx], outer_ellipse_y[idx])
-                self._text_items.append(text_item)
-
-            self._scatter_plot.clear()
-            points = [{"pos": [x, y]} for x, y in zip(pos_x, pos_y)]
-            self._scatter_plot.addPoints(points, symbol="s", pen=(255, 0, 0),
-                                         symbolPen='w',
-                                         symbolBrush=(255, 0, 0))
-
-        else:
-            self._scatter_plot.setData(pos_x, pos_y)
-
-            for idx in range(len(self._curves)):
-                x = [0, outer_ellipse_x[idx]]
-                y = [0, outer_ellipse_y[idx]]
-                self._curves[idx].setData(x, y)
-                self._text_items[idx].setPos(outer_ellipse_x[idx],
-                                             outer_ellipse_y[idx])
-                self._text_items[idx].setText(f"{theta[idx]}°")
-
-            if fit_theta is not None and fit_radius is not None:
-                min_size = min(len(fit_theta), len(fit_radius))
-                fit_x, fit_y = deg_to_cart(fit_theta[:min_size],
-                                           fit_radius[:min_size])
-                self._fit_curve.setData(fit_x, fit_y)
+        pos_x, pos_y = deg_to_cart(theta, radius)
+        self._scatter_plot.setData(pos_x, pos_y)
+
+        if fit_theta is not None and fit_radius is not None:
+            min_size = min(len(fit_theta), len(fit_radius))
+            fit_x, fit_y = deg_to_cart(fit_theta[:min_size],
+                                       fit_radius[:min_size])
+            self._fit_curve.setData(fit_x, fit_y)
+
+    def _plot_angles(self, theta):
+        """Draw the radial lines and the labels of the angles `theta`"""
+        self._theta = theta.copy()
+        outer_x, outer_y = deg_to_cart(theta, self.model.max_ellipses_radius)
+        x, y, connect = get_radial_lines(outer_x, outer_y)
+        self._radial_lines.setData(x, y, connect=connect)
+
+        plotItem = self.widget.plotItem
+        while len(self._text_items) < len(theta):
+            text_item = TextItem()
+            plotItem.addItem(text_item)
+            self._text_items.append(text_item)
+
+        for idx, text_item in enumerate(self._text_items):
+            if idx >= len(theta):
+                text_item.setVisible(False)
+                continue
+            text_item.setText(f"{theta[idx]}°")
+            text_item.setPos(outer_x[idx], outer_y[idx])
+            text_item.setVisible(True)
 
     def _get_value(self, proxy, prop):
         if hasattr(proxy, prop):
@@ -157,3 +168,5 @@ class DisplayPolarPlot(BaseBindingController):
         if ok:
             self.model.max_ellipses_radius = max_radius
             self._plot_ellipses()
+            if self._theta is not None:
+                self._plot_angles(self._theta)
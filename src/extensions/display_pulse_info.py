@@ -1,10 +1,14 @@
-from functools import reduce
+from collections import OrderedDict
 
 import numpy as np
 from qtpy.QtCore import QRectF, Qt
-from qtpy.QtGui import QBrush, QColor, QFont, QPainter, QPen
-from qtpy.QtWidgets import QGraphicsScene, QGraphicsView, QGridLayout, QWidget
-from traits.api import Array, HasStrictTraits, Instance, Tuple, on_trait_change
+from qtpy.QtGui import (
+    QBrush, QColor, QFont, QImage, QPainter, QPen, QPixmap, QTransform)
+from qtpy.QtWidgets import (
+    QAction, QGraphicsItem, QGraphicsPixmapItem, QGraphicsScene, QGraphicsView,
+    QGridLayout, QWidget)
+from traits.api import (
+    Array, Bytes, Event, HasStrictTraits, Instance, Tuple, on_trait_change)
 
 from karabogui.binding.api import WidgetNodeBinding, get_binding_value
 from karabogui.controllers.api import (
@@ -13,12 +17,12 @@ from karabogui.fonts import get_font_size_from_dpi
 from karabogui.util import generateObjectName
 
 from .models.api import DynamicPulseIdMapModel, PulseIdMapModel
+from .utils import get_content_digest
 
 GRAY = QColor(178, 178, 178, 60)
 YELLOW = QColor(255, 194, 10, 200)
 BLUE = QColor(12, 123, 220)
 
-BRUSH_EMPTY = QBrush(GRAY)
 BRUSH_FEL = QBrush(YELLOW)
 BRUSH_PPL = QBrush(BLUE)
 
@@ -27,6 +31,275 @@ PEN_EMPTY = QPen(Qt.transparent)
 
 PPL_SIZE = 4  # circle size in pixels
 
+# Pulse matrix geometry
+OFFSET_H = 40
+OFFSET_V = 30
+GAP_H = 1
+GAP_V = 5
+SIDE = 12
+STRIDE_H = SIDE + GAP_H
+STRIDE_V = SIDE + GAP_V
+
+# Bitmask of the pulse codes
+FEL_CODE = 1
+PPL_CODE = 2
+DET_CODE = 4
+
+NUM_PULSES = 2700
+PULSE_DTYPE = np.dtype([("fel", np.bool_), ("ppl", np.bool_),
+                        ("det", np.bool_)])
+
+# Number of pulse pattern grids to keep and the grid size used for
+# patterns with a single pulse
+GRID_CACHE_SIZE = 16
+DEFAULT_GRID_SIZE = 10
+
+# Pulse history: number of recorded trains and of trains shown in the
+# waterfall, which has a fixed height in pixels
+HISTORY_SIZE = 3000
+WATERFALL_TRAINS = 200
+WATERFALL_HEIGHT = 100
+
+
+def _blend(color, other, ratio):
+    return np.round((1 - ratio) * color + ratio * other)
+
+
+def _create_waterfall_lut():
+    """Create the RGBA color of every pulse code"""
+    gray, yellow, blue = (np.array(color.getRgb(), dtype=np.float64)
+                          for color in (GRAY, YELLOW, BLUE))
+    gray[3] = yellow[3] = 255
+    lut = np.zeros((8, 4), dtype=np.uint8)
+    for code in range(8):
+        color = yellow if code & FEL_CODE else gray
+        if code & DET_CODE:
+            color = _blend(color, blue, 0.5)
+        if code & PPL_CODE:
+            color = _blend(color, blue, 0.25)
+        lut[code] = color
+    return lut
+
+
+WATERFALL_LUT = _create_waterfall_lut()
+
+# The parts of a pulse cell in the pulse matrix image, which is rendered with
+# `MATRIX_SCALE` pixels per scene unit
+CELL_FILL, CELL_BORDER, CELL_DOT, CELL_GAP = range(4)
+MATRIX_SCALE = 2
+
+
+def _create_matrix_lut():
+    """Create the ARGB color of every part of a cell for every pulse code"""
+    lut = np.zeros((8, 4), dtype=np.uint32)
+    for code in range(8):
+        fill = (YELLOW if code & FEL_CODE else GRAY).rgba()
+        lut[code, CELL_FILL] = fill
+        lut[code, CELL_BORDER] = BLUE.rgba() if code & DET_CODE else fill
+        lut[code, CELL_DOT] = BLUE.rgba() if code & PPL_CODE else fill
+    return lut
+
+
+def _create_cell_stencil():
+    """Return the cell part of every pixel of a cell and its gaps"""
+    side = SIDE * MATRIX_SCALE
+    border = PEN_DET.width() // 2 * MATRIX_SCALE
+    stencil = np.full((STRIDE_V * MATRIX_SCALE, STRIDE_H * MATRIX_SCALE),
+                      CELL_GAP, dtype=np.intp)
+    stencil[:side, :side] = CELL_BORDER
+    stencil[border:side - border, border:side - border] = CELL_FILL
+    y, x = np.ogrid[:side, :side]
+    center = (side - 1) / 2
+    dot = (x - center) ** 2 + (y - center) ** 2 <= (
+        PPL_SIZE * MATRIX_SCALE / 2) ** 2
+    stencil[:side, :side][dot] = CELL_DOT
+    return stencil
+
+
+MATRIX_LUT = _create_matrix_lut()
+CELL_STENCIL = _create_cell_stencil()
+
+
+class PulseMatrixItem(QGraphicsItem):
+    """Paint a grid of pulses in a single item
+
+    Every cell of the `grid` holds a pulse id. The pulses are styled by a
+    code array with one bitmask (`FEL_CODE`, `PPL_CODE` and `DET_CODE`)
+    per pulse. The cells are rendered into an image at once when the codes
+    change, by looking up the color of every cell part of a pulse code.
+    The tooltip is only computed for the pulse under the cursor.
+    """
+
+    def __init__(self, tooltip=None, parent=None):
+        super().__init__(parent)
+        self.setAcceptHoverEvents(True)
+        self.grid = np.empty((0, 0), dtype=np.int64)
+        self.codes = np.zeros(NUM_PULSES, dtype=np.uint8)
+        self._tooltip = tooltip
+        self._rect = QRectF()
+        # The rendered cells and the pixels backing the image
+        self.image = QImage()
+        self._pixels = None
+
+    def set_grid(self, grid):
+        grid = np.asarray(grid, dtype=np.int64)
+        if grid.shape != self.grid.shape:
+            self.prepareGeometryChange()
+            rows, cols = grid.shape
+            self._rect = QRectF(OFFSET_H, OFFSET_V, cols * STRIDE_H,
+                                rows * STRIDE_V)
+        self.grid = grid
+        self.set_codes(self.codes)
+
+    def set_codes(self, codes):
+        self.codes = codes
+        pulses = self.grid.ravel()
+        valid = (pulses >= 0) & (pulses < codes.size)
+        cell_codes = np.zeros(pulses.size, dtype=np.uint8)
+        cell_codes[valid] = codes[pulses[valid]]
+
+        # Look up the colors of the cell parts and tile the cells
+        rows, cols = self.grid.shape
+        height, width = CELL_STENCIL.shape
+        cells = MATRIX_LUT[cell_codes][:, CELL_STENCIL]
+        self._pixels = np.ascontiguousarray(
+            cells.reshape((rows, cols, height, width)).transpose(0, 2, 1, 3)
+            .reshape((rows * height, cols * width)))
+        self.image = QImage(self._pixels.data, cols * width, rows * height,
+                            self._pixels.strides[0], QImage.Format_ARGB32)
+        self.update()
+
+    def pulse_at(self, pos):
+        """Return the pulse id of the cell at the item position or None"""
+        rows, cols = self.grid.shape
+        x, y = pos.x() - OFFSET_H, pos.y() - OFFSET_V
+        col, row = int(x // STRIDE_H), int(y // STRIDE_V)
+        if not (0 <= col < cols and 0 <= row < rows):
+            return None
+        if x - col * STRIDE_H > SIDE or y - row * STRIDE_V > SIDE:
+            return None
+        return int(self.grid[row, col])
+
+    def boundingRect(self):
+        return self._rect
+
+    def paint(self, painter, option, widget=None):
+        if not self.image.isNull():
+            painter.drawImage(self._rect, self.image)
+
+    def hoverMoveEvent(self, event):
+        pulse = self.pulse_at(event.pos())
+        tooltip = ""
+        if pulse is not None and self._tooltip is not None:
+            tooltip = self._tooltip(pulse)
+        self.setToolTip(tooltip)
+        super().hoverMoveEvent(event)
+
+
+class PulseHistory:
+    """Ring buffer of the pulse codes of the recent trains
+
+    The number of trains containing FEL, PPL and DET pulses is counted per
+    pulse slot when a train enters and leaves the buffer, the cost of an
+    update does not depend on the size of the history.
+    """
+    codes_bits = np.array([FEL_CODE, PPL_CODE, DET_CODE], dtype=np.uint8)
+
+    def __init__(self, size=HISTORY_SIZE, num_pulses=NUM_PULSES):
+        self.codes = np.zeros((size, num_pulses), dtype=np.uint8)
+        self.counts = np.zeros((len(self.codes_bits), num_pulses),
+                               dtype=np.int32)
+        self.index = 0
+        self.filled = 0
+
+    @property
+    def size(self):
+        return len(self.codes)
+
+    def clear(self):
+        self.codes[:] = 0
+        self.counts[:] = 0
+        self.index = 0
+        self.filled = 0
+
+    def add(self, codes):
+        slot = self.index
+        if self.filled == self.size:
+            self.counts -= self._bits(self.codes[slot])
+        self.codes[slot] = codes
+        self.counts += self._bits(codes)
+        self.index = (slot + 1) % self.size
+        self.filled = min(self.filled + 1, self.size)
+
+    def latest(self, count):
+        """Return the codes of the latest `count` trains, newest first"""
+        count = min(count, self.filled)
+        rows = (self.index - 1 - np.arange(count)) % self.size
+        return self.codes[rows]
+
+    def fill_rates(self):
+        """Return the fraction of trains with FEL, PPL and DET per pulse"""
+        return self.counts / max(self.filled, 1)
+
+    def _bits(self, codes):
+        return (codes & self.codes_bits[:, np.newaxis]) != 0
+
+
+class PulseWaterfallItem(QGraphicsPixmapItem):
+    """Show the pulse codes of the latest trains as a single image
+
+    The pulses are binned to the given `width` in pixels, the latest train
+    is drawn on top.
+    """
+
+    def __init__(self, history=None, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.start, self.stop, self.width = 0, NUM_PULSES, NUM_PULSES
+
+    def set_range(self, start, stop, width):
+        self.start = int(np.clip(start, 0, NUM_PULSES))
+        self.stop = int(np.clip(stop, self.start, NUM_PULSES))
+        self.width = max(int(width), 1)
+        self.refresh()
+
+    def refresh(self):
+        if self.history is None:
+            self.setPixmap(QPixmap())
+            return
+
+        codes = self.history.latest(WATERFALL_TRAINS)[:, self.start:self.stop]
+        if not codes.size:
+            self.setPixmap(QPixmap())
+            return
+
+        # Combine the pulses of a bin
+        binning = -(-codes.shape[1] // self.width)
+        edges = np.arange(0, codes.shape[1], binning)
+        codes = np.bitwise_or.reduceat(codes, edges, axis=1)
+
+        rgba = np.ascontiguousarray(WATERFALL_LUT[codes])
+        height, width = codes.shape
+        image = QImage(rgba.data, width, height, rgba.strides[0],
+                       QImage.Format_RGBA8888)
+        self.setPixmap(QPixmap.fromImage(image))
+        self.setTransform(QTransform.fromScale(
+            self.width / width, WATERFALL_HEIGHT / WATERFALL_TRAINS))
+
+
+def get_pulse_codes(fel, ppl, det):
+    """Combine the boolean pulse patterns into an array of pulse codes"""
+    return (fel * FEL_CODE | ppl * PPL_CODE | det * DET_CODE).astype(np.uint8)
+
+
+def get_fill_rate_tooltip(history, pulse):
+    """Return the tooltip lines with the fill rates of a pulse slot"""
+    if history is None or not history.filled or not 0 <= pulse < NUM_PULSES:
+        return []
+    fel, ppl, det = history.fill_rates()[:, pulse]
+    return [f'Fill rate over {history.filled} trains:',
+            f'FEL {fel:.1%} PPL {ppl:.1%} DET {det:.1%}']
+
 
 class PulseIdMapWidget(QWidget):
     """Show a matrix representing the internal XFEL pulses
@@ -39,7 +312,9 @@ class PulseIdMapWidget(QWidget):
         self.setMinimumSize(500, 500)  # min-size of the widget
         self.columns = 100  # num of columns in grid
         self.rows = 27  # num of rows in grid
-        self.pulses = []
+        self.pulses = None
+        self.waterfall = None
+        self.history = None
         # Pulses positions
         self.fel = np.zeros(2700, dtype=np.bool_)
         self.ppl = np.zeros(2700, dtype=np.bool_)
@@ -71,32 +346,24 @@ class PulseIdMapWidget(QWidget):
         return ellipse
 
     def draw_matrix(self):
-        offset_h, offset_v, gap_h, gap_v, side = 40, 30, 1, 5, 12
+        offset_h, offset_v, gap_h, gap_v, side = (
+            OFFSET_H, OFFSET_V, GAP_H, GAP_V, SIDE)
         rect = QRectF(0, 0, side, side)
         for row in range(self.rows):
             self.add_text(f'{row * 100}'.rjust(4, ' '),
                           (0, offset_v + row * (side + gap_v) - side/4))
 
-            for col in range(self.columns):
-                ref_h = offset_h + col * (side + gap_h)
-                ref_v = offset_v + row * (side + gap_v)
-
-                # add labels
-                if col % 20 == 0:
-                    self.add_text(f'{col}', (ref_h - side / 2, 0))
-                    self.add_text('❘', (ref_h - side / 4,
-                                        offset_v / 2 - side / 2))
-
-                # background representing fel/no-fel
-                fel = self.scene.addRect(rect.translated(ref_h, ref_v),
-                                         PEN_EMPTY,
-                                         BRUSH_EMPTY)
-                fel.setToolTip(f'Pulse {row * self.columns + col}'
-                               '\nFEL: False\nPPL: False\nDET: False')
-                # center dot: ppl/no-ppl
-                ppl = self.add_ppl(ref_h + side / 2 - PPL_SIZE / 2,
-                                   ref_v + side / 2 - PPL_SIZE / 2)
-                self.pulses.append((fel, ppl))
+        for col in range(0, self.columns, 20):
+            ref_h = offset_h + col * (side + gap_h)
+            self.add_text(f'{col}', (ref_h - side / 2, 0))
+            self.add_text('❘', (ref_h - side / 4, offset_v / 2 - side / 2))
+
+        # All pulses are painted by a single item
+        self.pulses = PulseMatrixItem(tooltip=self.pulse_tooltip)
+        self.pulses.set_grid(
+            np.arange(self.rows * self.columns).reshape(
+                (self.rows, self.columns)))
+        self.scene.addItem(self.pulses)
 
         # add legend
         h, v = offset_h, offset_v + (self.rows + gap_h) * (side + gap_v)
@@ -111,31 +378,40 @@ class PulseIdMapWidget(QWidget):
                      visible=True)
         self.add_text('PPL', (h + 260, v - side/4))
 
+        # add the history of the pulses below the legend
+        self.waterfall = PulseWaterfallItem(self.history)
+        self.waterfall.setPos(h, v + 2 * (side + gap_v))
+        self.waterfall.setVisible(self.history is not None)
+        self.waterfall.set_range(0, NUM_PULSES, self.columns * STRIDE_H)
+        self.scene.addItem(self.waterfall)
+
+    def pulse_tooltip(self, pulse):
+        tooltip = [f'Pulse {pulse}',
+                   f'FEL: {self.fel[pulse]}',
+                   f'PPL: {self.ppl[pulse]}',
+                   f'DET: {self.det[pulse]}']
+        tooltip.extend(get_fill_rate_tooltip(self.history, pulse))
+        return '\n'.join(tooltip)
+
+    def show_history(self, enabled):
+        self.history = PulseHistory() if enabled else None
+        self.waterfall.history = self.history
+        self.waterfall.setVisible(enabled)
+        self.waterfall.refresh()
+
+    def add_history(self):
+        if self.history is None:
+            return
+        self.history.add(self.pulses.codes)
+        self.waterfall.refresh()
+
     def set_parameter(self, fel, ppl, det):
         fel = fel if (fel.size == 2700) else np.zeros(2700, dtype=np.bool_)
         ppl = ppl if (ppl.size == 2700) else np.zeros(2700, dtype=np.bool_)
         det = det if (det.size == 2700) else np.zeros(2700, dtype=np.bool_)
-
-        fel_diff = np.where(fel != self.fel)[0]
-        ppl_diff = np.where(ppl != self.ppl)[0]
-        det_diff = np.where(det != self.det)[0]
         self.fel, self.ppl, self.det = fel, ppl, det
 
-        for idx in sorted(set(fel_diff).union(ppl_diff, det_diff)):
-            w_fel, w_ppl = self.pulses[idx]
-
-            w_fel.setBrush(BRUSH_FEL if fel[idx] else BRUSH_EMPTY)
-            w_fel.setPen(PEN_DET if det[idx] else PEN_EMPTY)
-            w_ppl.setVisible(bool(ppl[idx]))
-
-            w_fel.setToolTip(
-                f'Pulse {idx}'
-                f'\nFEL: {fel[idx]}'
-                f'\nPPL: {ppl[idx]}'
-                f'\nDET: {det[idx]}'
-            )
-
-        self.update()
+        self.pulses.set_codes(get_pulse_codes(fel, ppl, det))
 
 
 @register_binding_controller(
@@ -153,26 +429,64 @@ class PulseIdMap(BaseBindingController):
     fel, ppl or det has light/frame for a specified pulse.
     """
     model = Instance(PulseIdMapModel, args=())
+    # The timestamps of the last shown patterns
+    _timestamps = Tuple
 
     def create_widget(self, parent):
         widget = PulseIdMapWidget(parent)
+        widget.addAction(_create_history_action(widget))
         return widget
 
     def value_update(self, proxy):
         node = get_binding_value(proxy)
         if node is None:
             return
+        timestamps = get_pattern_timestamps(node)
+        if None not in timestamps and timestamps == self._timestamps:
+            return
+        self._timestamps = timestamps
 
+        pattern = decode_pulse_pattern(node)
         self.widget.set_parameter(
-            node.fel.value,
-            node.ppl.value,
-            node.det.value
+            pattern["fel"],
+            pattern["ppl"],
+            pattern["det"]
         )
+        self.widget.add_history()
+
+
+def _create_history_action(widget):
+    action = QAction("Show pulse history", widget)
+    action.setCheckable(True)
+    action.toggled.connect(widget.show_history)
+    return action
 
 
 # -----------------------------------------------------------------------------
 
-NUM_PULSES = 2700
+
+def decode_pulse_pattern(node):
+    """Read the FEL, PPL and detector patterns of a node at once
+
+    The patterns are padded or cut to `NUM_PULSES`.
+
+    :returns: a structured array with a boolean field per pattern
+    """
+    pattern = np.zeros(NUM_PULSES, dtype=PULSE_DTYPE)
+    for name in PULSE_DTYPE.names:
+        value = get_binding_value(getattr(node, name), default=[])
+        value = np.asarray(value, dtype=np.bool_)[:NUM_PULSES]
+        pattern[name][:value.size] = value
+    return pattern
+
+
+def get_pattern_timestamps(node):
+    """Return the timestamps of the FEL, PPL and detector patterns
+
+    Equal timestamps identify the same train, a `None` timestamp is unknown.
+    """
+    return tuple(getattr(node, name).timestamp
+                 for name in PULSE_DTYPE.names)
 
 
 class PulsePattern(HasStrictTraits):
@@ -184,39 +498,52 @@ class PulsePattern(HasStrictTraits):
     ppl_index = Array
     det_index = Array
 
-    fel_diff = Array
-    ppl_diff = Array
-    det_diff = Array
-    diff = Array
-
     grid_specs = Tuple(0, 0, 0)  # min, max, width
     grid = Array
+    # Fired when the pattern of a new train differs from the previous one
+    pattern_updated = Event
+
+    # The timestamps of the decoded patterns and the digest of the pattern
+    _timestamps = Tuple
+    _digest = Bytes
+    # The grid specs of the recent patterns, keyed by their digest
+    _grid_cache = Instance(OrderedDict, args=())
 
     def set_node(self, node):
+        """Set the patterns of a node
+
+        :returns: True for a new train, False if the timestamps of the
+            patterns did not change
+        """
+        # Decode the patterns once per timestamp
+        timestamps = get_pattern_timestamps(node)
+        if None not in timestamps and timestamps == self._timestamps:
+            return False
+        self._timestamps = timestamps
+
+        pattern = decode_pulse_pattern(node)
+        digest = get_content_digest(pattern.tobytes())
+        if digest == self._digest:
+            return True
+        self._digest = digest
+
         # Get values
-        self.fel = get_binding_value(node.fel, default=[])
-        self.ppl = get_binding_value(node.ppl, default=[])
-        self.det = get_binding_value(node.fel, default=[])
+        self.fel = pattern["fel"]
+        self.ppl = pattern["ppl"]
+        self.det = pattern["det"]
 
         # Recalculate grid
-        self.grid_specs = self._calc_grid_specs()
-
-        # Update diff for external updates
-        diff = reduce(np.union1d,
-                      (self.fel_diff, self.ppl_diff, self.det_diff))
-        if diff.size:
-            self.diff = diff
+        self.grid_specs = self._get_grid_specs(digest)
+        self.pattern_updated = True
+        return True
 
-    def _fel_changed(self, old, new):
-        self.fel_diff = np.where(old != new)[0]
+    def _fel_changed(self, new):
         self.fel_index = self._calc_index(new)
 
-    def _ppl_changed(self, old, new):
-        self.ppl_diff = np.where(old != new)[0]
+    def _ppl_changed(self, new):
         self.ppl_index = self._calc_index(new)
 
-    def _det_changed(self, old, new):
-        self.det_diff = np.where(old != new)[0]
+    def _det_changed(self, new):
         self.det_index = self._calc_index(new)
 
     def _grid_specs_changed(self, specs):
@@ -224,28 +551,45 @@ class PulsePattern(HasStrictTraits):
         self.grid = np.arange(min_value, max_value).reshape((-1, grid_size))
 
     def _calc_index(self, pattern):
-        return np.argwhere(pattern).squeeze()
+        return np.flatnonzero(pattern)
+
+    def _get_grid_specs(self, digest):
+        cache = self._grid_cache
+        specs = cache.get(digest)
+        if specs is None:
+            specs = self._calc_grid_specs()
+            cache[digest] = specs
+            if len(cache) > GRID_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(digest)
+        return specs
 
     def _calc_grid_specs(self):
         def round_down(value, nearest=10):
             return round(value / nearest) * nearest
 
+        indices = [index for index in (self.fel_index, self.ppl_index,
+                                       self.det_index) if index.size]
+        if not indices:
+            return self.grid_specs
+
         # Get grid count
-        diff = np.hstack((np.diff(self.fel_index),
-                          np.diff(self.ppl_index),
-                          np.diff(self.det_index)))
-        values, counts = np.unique(diff, return_counts=True)
-        grid_size = values[counts.argmax()]
+        diff = np.hstack([np.diff(index) for index in indices])
+        if diff.size:
+            values, counts = np.unique(diff, return_counts=True)
+            grid_size = int(values[counts.argmax()])
+        else:
+            grid_size = self.grid_specs[2] or DEFAULT_GRID_SIZE
 
         # Get min and max values
-        min_value = round_down(self.fel_index[0],
-                               nearest=grid_size) - grid_size
-        max_value = max(self.fel_index[-1],
-                        self.ppl_index[-1],
-                        self.det_index[-1])
+        first = (self.fel_index[0] if self.fel_index.size
+                 else min(index[0] for index in indices))
+        min_value = max(round_down(first, nearest=grid_size) - grid_size, 0)
+        max_value = max(index[-1] for index in indices)
         max_value = round_down(max_value, nearest=grid_size) + grid_size
 
-        return min_value, max_value, grid_size
+        return min_value, int(max_value), grid_size
 
 
 class DynamicPulseIdMapWidget(QWidget):
@@ -258,10 +602,17 @@ class DynamicPulseIdMapWidget(QWidget):
         super().__init__(parent)
         self.setMinimumSize(500, 500)  # min-size of the widget
         # Graphics items
-        self.pulses = []
+        self.pulses = None
+        self.waterfall = None
+        self.history = None
+        self.row_labels = []
         self.fel_legend = None
         self.ppl_legend = None
         self.det_legend = None
+        # Pulse indices of the current pattern
+        self.fel = np.zeros(0, dtype=np.int64)
+        self.ppl = np.zeros(0, dtype=np.int64)
+        self.det = np.zeros(0, dtype=np.int64)
 
         grid = QGridLayout(self)
         self.view = QGraphicsView()
@@ -278,7 +629,9 @@ class DynamicPulseIdMapWidget(QWidget):
         self.draw_matrix(grid=np.empty(shape=(0, 0)))
 
     def clear(self):
-        self.pulses = [None] * NUM_PULSES
+        self.pulses = None
+        self.waterfall = None
+        self.row_labels = []
         self.fel_legend = None
         self.ppl_legend = None
         self.det_legend = None
@@ -301,36 +654,35 @@ class DynamicPulseIdMapWidget(QWidget):
         return ellipse
 
     def draw_matrix(self, grid):
+        if self.pulses is not None and self.pulses.grid.shape == grid.shape:
+            # Same geometry, only the pulse ids are shifted
+            for label, row in zip(self.row_labels, grid):
+                label.setPlainText(f'{row[0]}'.rjust(4, ' '))
+            self.pulses.set_grid(grid)
+            self._set_waterfall_range(grid)
+            return
+
         # Clear items from scene
         self.clear()
         rows, cols = grid.shape
 
-        offset_h, offset_v, gap_h, gap_v, side = 40, 30, 1, 5, 12
+        offset_h, offset_v, gap_h, gap_v, side = (
+            OFFSET_H, OFFSET_V, GAP_H, GAP_V, SIDE)
         rect = QRectF(0, 0, side, side)
         for row in range(rows):
-            self.add_text(f'{grid[row][0]}'.rjust(4, ' '),
-                          (0, offset_v + row * (side + gap_v) - side/4))
+            self.row_labels.append(self.add_text(
+                f'{grid[row][0]}'.rjust(4, ' '),
+                (0, offset_v + row * (side + gap_v) - side/4)))
 
-            for col in range(cols):
-                ref_h = offset_h + col * (side + gap_h)
-                ref_v = offset_v + row * (side + gap_v)
-                pulse_num = grid[row][col]
-
-                # add labels
-                if col % 10 == 0:
-                    self.add_text(f'{col}', (ref_h - side / 2, 0))
-                    self.add_text('❘', (ref_h - side / 4,
-                                        offset_v / 2 - side / 2))
-
-                # background representing fel/no-fel
-                fel = self.scene.addRect(rect.translated(ref_h, ref_v),
-                                         PEN_EMPTY,
-                                         BRUSH_EMPTY)
-                fel.setToolTip(f'Pulse {pulse_num}')
-                # center dot: ppl/no-ppl
-                ppl = self.add_ppl(ref_h + side / 2 - PPL_SIZE / 2,
-                                   ref_v + side / 2 - PPL_SIZE / 2)
-                self.pulses[pulse_num] = (fel, ppl)
+        for col in range(0, cols, 10):
+            ref_h = offset_h + col * (side + gap_h)
+            self.add_text(f'{col}', (ref_h - side / 2, 0))
+            self.add_text('❘', (ref_h - side / 4, offset_v / 2 - side / 2))
+
+        # All pulses are painted by a single item
+        self.pulses = PulseMatrixItem(tooltip=self.pulse_tooltip)
+        self.pulses.set_grid(grid)
+        self.scene.addItem(self.pulses)
 
         # add legend
         h, v = offset_h, offset_v + (rows + gap_h) * (side + gap_v)
@@ -347,53 +699,65 @@ class DynamicPulseIdMapWidget(QWidget):
         self.add_text('PPL', (h + 260, legend_pos))
 
         horz_pos, gap = h + 400, side + gap_v
-        self.fel_legend = self.add_text("FEL: 0",
+        self.fel_legend = self.add_text(f"FEL: {self.fel.size}",
                                         (horz_pos, legend_pos))
-        self.ppl_legend = self.add_text("PPL: 0",
+        self.ppl_legend = self.add_text(f"PPL: {self.ppl.size}",
                                         (horz_pos, legend_pos + gap))
-        self.det_legend = self.add_text("DET: 0",
+        self.det_legend = self.add_text(f"DET: {self.det.size}",
                                         (horz_pos, legend_pos + gap * 2))
 
-    def set_parameter(self, *, fel, ppl, det, diff=None):
-        if diff is None:
-            diff = np.arange(NUM_PULSES)
-        for idx in diff:
-            rect_items = self.pulses[idx]
-            if rect_items is None:
-                continue
-
-            w_fel, w_ppl = rect_items
-            tooltip = [f'Pulse {idx}']
-
-            # Update FEL
-            brush = BRUSH_EMPTY
-            fel_idx, = np.nonzero(fel == idx)
-            if fel_idx.size:
-                brush = BRUSH_FEL
-                tooltip.append(f'FEL: #{fel_idx[0] + 1}')
-            w_fel.setBrush(brush)
-
-            # Update PPL
-            ppl_idx, = np.nonzero(ppl == idx)
-            visible = bool(ppl_idx.size)
-            if visible:
-                tooltip.append(f'PPL: #{ppl_idx[0] + 1}')
-            w_ppl.setVisible(visible)
-
-            # Update DET
-            pen = PEN_EMPTY
-            det_idx, = np.nonzero(det == idx)
-            if det_idx.size:
-                pen = PEN_DET
-                tooltip.append(f'DET: #{det_idx[0] + 1}')
-            w_fel.setPen(pen)
-
-            w_fel.setToolTip('\n'.join(tooltip))
-
-        self.fel_legend.setPlainText(f"FEL: {fel.size}")
-        self.ppl_legend.setPlainText(f"PPL: {ppl.size}")
-        self.det_legend.setPlainText(f"DET: {det.size}")
-        self.update()
+        # add the history of the pulses below the legend
+        self.waterfall = PulseWaterfallItem(self.history)
+        self.waterfall.setPos(h, v + 4 * gap)
+        self.waterfall.setVisible(self.history is not None)
+        self._set_waterfall_range(grid)
+        self.scene.addItem(self.waterfall)
+
+    def _set_waterfall_range(self, grid):
+        start, stop = (grid.min(), grid.max() + 1) if grid.size else (0, 0)
+        self.waterfall.set_range(start, stop, grid.shape[1] * STRIDE_H)
+
+    def pulse_tooltip(self, pulse):
+        tooltip = [f'Pulse {pulse}']
+        for name, indices in (('FEL', self.fel), ('PPL', self.ppl),
+                              ('DET', self.det)):
+            index, = np.nonzero(indices == pulse)
+            if index.size:
+                tooltip.append(f'{name}: #{index[0] + 1}')
+        tooltip.extend(get_fill_rate_tooltip(self.history, pulse))
+        return '\n'.join(tooltip)
+
+    def show_history(self, enabled):
+        self.history = PulseHistory() if enabled else None
+        self.waterfall.history = self.history
+        self.waterfall.setVisible(enabled)
+        self.waterfall.refresh()
+
+    def add_history(self):
+        if self.history is None:
+            return
+        self.history.add(self.pulses.codes)
+        self.waterfall.refresh()
+
+    def set_parameter(self, *, fel, ppl, det):
+        """Set the pulse indices of the current pattern
+
+        The codes of all pulses are recomputed at once.
+        """
+        self.fel, self.ppl, self.det = (
+            np.atleast_1d(indices).astype(np.int64)
+            for indices in (fel, ppl, det))
+
+        codes = np.zeros(NUM_PULSES, dtype=np.uint8)
+        for indices, code in ((self.fel, FEL_CODE), (self.ppl, PPL_CODE),
+                              (self.det, DET_CODE)):
+            indices = indices[(indices >= 0) & (indices < NUM_PULSES)]
+            codes[indices] |= code
+        self.pulses.set_codes(codes)
+
+        self.fel_legend.setPlainText(f"FEL: {self.fel.size}")
+        self.ppl_legend.setPlainText(f"PPL: {self.ppl.size}")
+        self.det_legend.setPlainText(f"DET: {self.det.size}")
 
 
 @register_binding_controller(
@@ -415,19 +779,21 @@ class DynamicPulseIdMap(BaseBindingController):
 
     def create_widget(self, parent):
         widget = DynamicPulseIdMapWidget(parent)
+        widget.addAction(_create_history_action(widget))
         return widget
 
     def value_update(self, proxy):
         node = get_binding_value(proxy)
         if node is None:
             return
-        self._pulse_pattern.set_node(node)
+        if self._pulse_pattern.set_node(node):
+            self.widget.add_history()
 
     @on_trait_change("_pulse_pattern.grid")
     def _update_grid(self, grid):
         self.widget.draw_matrix(grid)
 
-    @on_trait_change("_pulse_pattern.diff")
+    @on_trait_change("_pulse_pattern.pattern_updated")
     def _update_pattern(self):
         if self.widget is None:
             return
@@ -435,5 +801,4 @@ class DynamicPulseIdMap(BaseBindingController):
         pattern = self._pulse_pattern
         self.widget.set_parameter(fel=pattern.fel_index,
                                   ppl=pattern.ppl_index,
-                                  det=pattern.det_index,
-                                  diff=pattern.diff)
+                                  det=pattern.det_index)
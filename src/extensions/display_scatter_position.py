@@ -4,9 +4,6 @@
 # Copyright (C) European XFEL GmbH Hamburg. All rights reserved.
 #############################################################################
 
-from collections import deque
-
-import numpy as np
 from pyqtgraph import ROI, EllipseROI
 from qtpy.QtGui import QColor
 from qtpy.QtWidgets import QAction, QInputDialog
@@ -21,9 +18,10 @@ from karabogui.graph.common.api import create_tool_button, make_pen
 from karabogui.graph.plots.api import KaraboPlotView
 
 from .models.api import ScatterPositionModel
+from .utils import RingBuffer, RollingStatistics
 
 BUTTON_SIZE = (52, 32)
-MAX_NUM_POINTS = 1000
+MAX_NUM_POINTS = 100000
 
 MIN_POINT_SIZE = 0.1
 MAX_POINT_SIZE = 10.0
@@ -53,8 +51,12 @@ class Ellipse(EllipseROI):
 class DisplayScatterPosition(BaseBindingController):
     model = Instance(ScatterPositionModel, args=())
 
-    _x_values = Instance(deque)
-    _y_values = Instance(deque)
+    # The x and y positions and their running mean and standard deviation,
+    # each axis is a contiguous buffer handed to the plot
+    _x_positions = Instance(RingBuffer)
+    _y_positions = Instance(RingBuffer)
+    _x_statistics = Instance(RollingStatistics)
+    _y_statistics = Instance(RollingStatistics)
 
     _plot = Instance(object)
     _ellipse = Instance(object)
@@ -77,9 +79,7 @@ class DisplayScatterPosition(BaseBindingController):
             toolbar.add_button(button=_btn_reset)
         widget.stateChanged.connect(self._change_model)
 
-        model = self.model
-        self._x_values = deque(maxlen=model.maxlen)
-        self._y_values = deque(maxlen=model.maxlen)
+        self._create_buffer(self.model.maxlen)
 
         self._plot = widget.add_scatter_item()
 
@@ -110,12 +110,20 @@ class DisplayScatterPosition(BaseBindingController):
         pos_x = proxy.value.posX.value
         pos_y = proxy.value.posY.value
 
-        self._x_values.append(pos_x)
-        self._y_values.append(pos_y)
-        pos = (float(np.mean(self._x_values)), float(np.mean(self._y_values)))
-        size = (float(np.std(self._x_values)), float(np.std(self._y_values)))
+        x_statistics, y_statistics = self._x_statistics, self._y_statistics
+        x_statistics.append(pos_x)
+        y_statistics.append(pos_y)
+        pos = (float(x_statistics.mean), float(y_statistics.mean))
+        size = (float(x_statistics.std), float(y_statistics.std))
         self._ellipse.setValue(pos, size)
-        self._plot.setData(self._x_values, self._y_values)
+        self._plot.setData(self._x_positions.view(),
+                           self._y_positions.view())
+
+    def _create_buffer(self, maxlen):
+        self._x_positions = RingBuffer(maxlen)
+        self._y_positions = RingBuffer(maxlen)
+        self._x_statistics = RollingStatistics(self._x_positions)
+        self._y_statistics = RollingStatistics(self._y_positions)
 
     # ----------------------------------------------------------------
     # Qt Slots
@@ -124,8 +132,10 @@ class DisplayScatterPosition(BaseBindingController):
         self.model.trait_set(**content)
 
     def _reset_plot(self):
-        self._x_values.clear()
-        self._y_values.clear()
+        for buffer in (self._x_positions, self._y_positions):
+            buffer.clear()
+        for statistics in (self._x_statistics, self._y_statistics):
+            statistics.clear()
         self._plot.clear()
 
     def _configure_deque(self):
@@ -133,11 +143,7 @@ class DisplayScatterPosition(BaseBindingController):
                                          'Maxlen:', self.model.maxlen, 5,
                                          MAX_NUM_POINTS)
         if ok:
-            self._last_x_value = None
-            self._x_values, self._y_values = None, None
-            self._x_values = deque(maxlen=maxlen)
-            self._y_values = deque(maxlen=maxlen)
-
+            self._create_buffer(maxlen)
             self.model.maxlen = maxlen
 
     def _configure_point_size(self):
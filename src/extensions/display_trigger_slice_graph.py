@@ -1,11 +1,12 @@
 import enum
 
+import numpy as np
 import pyqtgraph as pg
 from pyqtgraph.graphicsItems.LegendItem import ItemSample
-from qtpy.QtCore import Qt
+from qtpy.QtCore import QLineF, QRectF, Qt
 from qtpy.QtGui import QPen
 from qtpy.QtWidgets import QGraphicsItem
-from traits.api import Instance, List, WeakRef
+from traits.api import Instance, WeakRef
 
 from karabo.common.scenemodel.api import build_model_config
 from karabogui.api import (
@@ -23,9 +24,17 @@ class Painter(enum.Enum):
     FEL_BRUSH = make_brush("b", alpha=REGION_ALPHA)
     PPL_BRUSH = make_brush("o", alpha=REGION_ALPHA)
     BOTH_BRUSH = make_brush("g", alpha=REGION_ALPHA)
+    HOVER_BRUSH = make_brush("r", alpha=REGION_ALPHA)
     SEPARATOR_PEN = make_pen("r", alpha=REGION_ALPHA * 2)
 
 
+FEL_CODE = 1
+PPL_CODE = 2
+BOTH_CODE = FEL_CODE | PPL_CODE
+TRIGGER_LABELS = {0: "PPL", FEL_CODE: "FEL", PPL_CODE: "PPL",
+                  BOTH_CODE: "both"}
+
+
 class ColorBox(ItemSample):
     """The color box in the legend that shows the curve pen color"""
 
@@ -40,6 +49,131 @@ class ColorBox(ItemSample):
         painter.drawRect(0, 0, 10, 14)
 
 
+class TriggerRegionItem(pg.GraphicsObject):
+    """Paint all trigger regions in a single item
+
+    The regions are given by `start` and `stop` arrays and span the full
+    height of the view. They are classified by numpy into FEL, PPL and both
+    and every class is painted with a single call. The rectangles and
+    separators are built once per update with a unit height and scaled to
+    the view when painted. Only the region under the cursor is looked up for
+    the highlight and the tooltip.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAcceptHoverEvents(True)
+        self.starts = np.zeros(0)
+        self.stops = np.zeros(0)
+        self.codes = np.zeros(0, dtype=np.uint8)
+        self._hovered = None
+        self._hover_rects = []
+        # The brushes and rectangles of the region classes and the separators
+        self._region_rects = []
+        self._separators = []
+
+    def __len__(self):
+        return self.starts.size
+
+    def set_regions(self, starts, stops, fels, ppls):
+        num = min(len(starts), len(stops), len(fels), len(ppls))
+        self.prepareGeometryChange()
+        self.starts = np.asarray(starts[:num], dtype=np.float64)
+        self.stops = np.asarray(stops[:num], dtype=np.float64)
+        self.codes = (np.asarray(fels[:num], dtype=bool) * FEL_CODE
+                      | np.asarray(ppls[:num], dtype=bool) * PPL_CODE)
+        self.codes = self.codes.astype(np.uint8)
+
+        codes = self.codes
+        self._region_rects = []
+        for brush, mask in (
+                (Painter.BOTH_BRUSH, codes == BOTH_CODE),
+                (Painter.FEL_BRUSH, codes == FEL_CODE),
+                (Painter.PPL_BRUSH, (codes & FEL_CODE) == 0)):
+            rects = self._rects(np.flatnonzero(mask))
+            if rects:
+                self._region_rects.append((brush.value, rects))
+        self._separators = [
+            QLineF(x, 0, x, 1)
+            for x in np.concatenate((self.starts, self.stops)).tolist()]
+
+        if self._hovered is not None and self._hovered >= num:
+            self._hovered = None
+        self._hover_rects = ([] if self._hovered is None
+                             else self._rects([self._hovered]))
+        self.update()
+
+    def region_at(self, x):
+        """Return the index of the region containing `x` or None"""
+        indices = np.flatnonzero((self.starts <= x) & (x <= self.stops))
+        if not indices.size:
+            return None
+        return int(indices[-1])
+
+    def region_tooltip(self, index):
+        return (f"Trigger {index}: {self.starts[index]:g} - "
+                f"{self.stops[index]:g} ({TRIGGER_LABELS[self.codes[index]]})")
+
+    def boundingRect(self):
+        if not len(self):
+            return QRectF()
+        view = self.viewRect()
+        if view is None:
+            return QRectF()
+        left = min(self.starts.min(), self.stops.min())
+        right = max(self.starts.max(), self.stops.max())
+        return QRectF(left, view.top(), right - left, view.height())
+
+    def dataBounds(self, axis, frac=1.0, orthoRange=None):
+        # The regions span the view height and only bound the x-axis
+        if axis != 0 or not len(self):
+            return None
+        return (min(self.starts.min(), self.stops.min()),
+                max(self.starts.max(), self.stops.max()))
+
+    def viewRangeChanged(self):
+        self.prepareGeometryChange()
+        super().viewRangeChanged()
+
+    def _rects(self, indices):
+        """Return the rectangles of the regions with a unit height"""
+        starts, stops = self.starts[indices], self.stops[indices]
+        return [QRectF(start, 0, stop - start, 1)
+                for start, stop in zip(starts.tolist(), stops.tolist())]
+
+    def paint(self, painter, option, widget=None):
+        if not len(self):
+            return
+        view = self.viewRect()
+        if view is None:
+            return
+        painter.save()
+        # Stretch the unit height to the view, the separator pen is cosmetic
+        painter.translate(0, view.top())
+        painter.scale(1, view.height())
+        painter.setPen(Qt.NoPen)
+        for brush, rects in self._region_rects:
+            painter.setBrush(brush)
+            painter.drawRects(rects)
+
+        if self._hover_rects:
+            painter.setBrush(Painter.HOVER_BRUSH.value)
+            painter.drawRects(self._hover_rects)
+
+        painter.setPen(Painter.SEPARATOR_PEN.value)
+        painter.drawLines(self._separators)
+        painter.restore()
+
+    def hoverEvent(self, event):
+        index = None if event.isExit() else self.region_at(event.pos().x())
+        if index == self._hovered:
+            return
+        self._hovered = index
+        self._hover_rects = [] if index is None else self._rects([index])
+        self.setToolTip("" if index is None else self.region_tooltip(index))
+        self.update()
+
+
 @register_binding_controller(
     ui_name="Trigger Slice Graph",
     klassname="TriggerSliceGraph",
@@ -53,7 +187,7 @@ class TriggerSliceGraph(BaseBindingController):
 
     _curve_item = WeakRef(QGraphicsItem)
 
-    _trigger_regions = List(WeakRef(QGraphicsItem))
+    _trigger_item = WeakRef(TriggerRegionItem)
     _widget = WeakRef(KaraboPlotView)
 
     def create_widget(self, parent):
@@ -74,17 +208,15 @@ class TriggerSliceGraph(BaseBindingController):
         # Create curve item
         self._curve_item = self._widget.add_curve_item(pen=get_default_pen())
 
+        # Create the trigger regions
+        self._trigger_item = TriggerRegionItem()
+        self._widget.plotItem.addItem(self._trigger_item)
+
         # Finalize
         self._widget.restore(build_model_config(self.model))
 
         return self._widget
 
-    def _add_trigger_region(self):
-        item = pg.LinearRegionItem(pen=Painter.SEPARATOR_PEN.value,
-                                   movable=False)
-        self._widget.plotItem.addItem(item)
-        self._trigger_regions.append(item)
-
     def value_update(self, proxy):
         binding = get_binding_value(proxy)
         if binding is None:
@@ -107,26 +239,7 @@ class TriggerSliceGraph(BaseBindingController):
 
         if any(thing is None for thing in (starts, stops, fels, ppls)):
             return
-        diff = len(starts) - len(self._trigger_regions)
-        if diff > 0:
-            for _ in range(diff):
-                self._add_trigger_region()
-        elif diff < 0:
-            to_remove = self._trigger_regions[diff:]
-            for region in to_remove:
-                self._widget.plotItem.removeItem(region)
-            self._trigger_regions = self._trigger_regions[:diff]
-
-        for region, start, stop, fel, ppl in zip(
-            self._trigger_regions, starts, stops, fels, ppls
-        ):
-            if fel and ppl:
-                region.setBrush(Painter.BOTH_BRUSH.value)
-            elif fel:
-                region.setBrush(Painter.FEL_BRUSH.value)
-            else:
-                region.setBrush(Painter.PPL_BRUSH.value)
-            region.setRegion((start, stop))
+        self._trigger_item.set_regions(starts, stops, fels, ppls)
 
     # ----------------------------------------------------------------
     # Qt Slots
@@ -23,6 +23,33 @@ from .display_extended_vector_xy_graph import BaseVectorXYGraph
 from .models.plots import UncertaintyGraphModel
 from .utils import get_array_data, get_node_value
 
+MAX_BAND_BINS = 2000
+
+
+def get_band_envelope(x, low, high, x_range=None, num_bins=MAX_BAND_BINS):
+    """Reduce a band to a min/max envelope of at most `num_bins` points
+
+    For a sorted `x` only the samples in the visible `x_range` and their
+    neighbours are considered. The samples are split into bins of equal
+    count, the envelope takes the minimum of `low` and the maximum of
+    `high` of every bin, non-finite values are ignored.
+
+    :returns: the x, low and high arrays of the envelope
+    """
+    size = min(len(x), len(low), len(high))
+    start, stop = 0, size
+    if x_range is not None and size > 1 and np.all(np.diff(x[:size]) >= 0):
+        start = max(np.searchsorted(x[:size], x_range[0], "right") - 1, 0)
+        stop = min(np.searchsorted(x[:size], x_range[1], "left") + 1, size)
+    x, low, high = x[start:stop], low[start:stop], high[start:stop]
+    if len(x) <= num_bins:
+        return x, low, high
+
+    indices = np.linspace(0, len(x), num_bins, endpoint=False).astype(int)
+    centers = (indices + np.append(indices[1:], len(x)) - 1) // 2
+    return (x[centers], np.fmin.reduceat(low, indices),
+            np.fmax.reduceat(high, indices))
+
 
 def _is_vector_number_binding(binding):
     """Don't allow plotting of boolean vectors"""
@@ -36,7 +63,12 @@ def _is_uncertainty_band(binding):
 
 
 class VectorFillGraphPlot(QGraphicsPathItem):
-    """Creates a vector fill graph item with considering a non-zero low."""
+    """Creates a vector fill graph item with considering a non-zero low.
+
+    The path is built from a min/max envelope of the band in the view range
+    with about one point per screen pixel. It is rebuilt when the view
+    range or size changes, the data bounds always span the full band.
+    """
 
     def __init__(self, viewbox=None, brush=None, pen=None):
         super(VectorFillGraphPlot, self).__init__()
@@ -49,6 +81,10 @@ class VectorFillGraphPlot(QGraphicsPathItem):
         self._baseline = np.array([])
         self._low = np.array([])
         self._high = np.array([])
+        self._bounds = (None, None)
+
+        viewbox.sigXRangeChanged.connect(self._updatePath)
+        viewbox.sigResized.connect(self._updatePath)
 
     @property
     def curves(self):
@@ -59,9 +95,25 @@ class VectorFillGraphPlot(QGraphicsPathItem):
         return [(baseline, self._low[:size]), (baseline, self._high[:size])]
 
     def refresh(self):
+        self._updateBounds()
         self._updatePath()
         self._viewBox().itemBoundsChanged(self)
 
+    def dataBounds(self, axis, frac=1.0, orthoRange=None):
+        return self._bounds[axis]
+
+    def _updateBounds(self):
+        (x, low), (_, high) = self.curves
+        with np.errstate(invalid="ignore"):
+            finite = np.isfinite(x) & np.isfinite(low) & np.isfinite(high)
+        if not finite.any():
+            self._bounds = (None, None)
+            return
+        x, low, high = x[finite], low[finite], high[finite]
+        self._bounds = ((x.min(), x.max()),
+                        (min(low.min(), high.min()),
+                         max(low.max(), high.max())))
+
     def setBaseline(self, baseline):
         self._baseline = np.array(baseline)
         self.refresh()
@@ -73,12 +125,16 @@ class VectorFillGraphPlot(QGraphicsPathItem):
             self._high = np.array(high)
         self.refresh()
 
-    def _updatePath(self):
-        curves = self.curves
-        if curves is None:
+    def _updatePath(self, *args):
+        (x, low), (_, high) = self.curves
+        viewbox = self._viewBox()
+        if viewbox is None:
             return
+        num_bins = int(min(max(viewbox.width(), 1), MAX_BAND_BINS))
+        x, low, high = get_band_envelope(
+            x, low, high, x_range=viewbox.viewRange()[0], num_bins=num_bins)
 
-        paths = [pg.arrayToQPath(x, y) for x, y in curves]
+        paths = [pg.arrayToQPath(x, low), pg.arrayToQPath(x, high)]
         transform = QTransform()
         sub_path_base = paths[0].toSubpathPolygons(transform)
         sub_path_data = paths[1].toReversed().toSubpathPolygons(transform)
@@ -7,8 +7,8 @@ import numpy as np
 import pyqtgraph as pg
 from qtpy.QtCore import Qt
 from qtpy.QtGui import QBrush, QColor, QPalette, QPen
-from qtpy.QtWidgets import QGraphicsItem
-from traits.api import Instance, WeakRef
+from qtpy.QtWidgets import QAction, QGraphicsItem, QInputDialog
+from traits.api import Any, Instance, WeakRef
 
 from extensions.models.plots import XasGraphModel
 from extensions.utils import get_array_data, get_node_value
@@ -48,6 +48,58 @@ def add_auxplots(widget, orientation='top', row=1, col=0, shown_axes=None):
     return aux_plotItem
 
 
+MAX_BINS = 100000
+RAW_ENERGY = 'rawEnergy'
+RAW_INTENSITY = 'rawIntensity'
+
+
+def bin_samples(energy, intensity, bin_width):
+    """Bin the (energy, intensity) samples into bins of `bin_width`
+
+    The bins are aligned to multiples of the bin width, their number is
+    limited to `MAX_BINS` by widening the bins. Samples with non-finite
+    values are ignored.
+
+    :returns: the centers, the mean and standard deviation of the
+              intensity and the counts of the bins with samples
+    """
+    energy = np.asarray(energy, dtype=np.float64)
+    intensity = np.asarray(intensity, dtype=np.float64)
+    size = min(energy.size, intensity.size)
+    energy, intensity = energy[:size], intensity[:size]
+    finite = np.isfinite(energy) & np.isfinite(intensity)
+    if not finite.all():
+        energy, intensity = energy[finite], intensity[finite]
+    if not energy.size or not bin_width > 0:
+        empty = np.array([])
+        return empty, empty, empty, empty
+
+    low, high = energy.min(), energy.max()
+    bin_width = max(bin_width, (high - low) / MAX_BINS)
+    start = np.floor(low / bin_width) * bin_width
+    num_bins = int((high - start) // bin_width) + 1
+    # The bins are uniform, the bin index is computed directly instead of
+    # searching the edges, which is an order of magnitude faster
+    indices = ((energy - start) / bin_width).astype(np.intp)
+    # Rounding might put the highest samples beyond the last bin
+    np.clip(indices, 0, num_bins - 1, out=indices)
+
+    counts = np.bincount(indices, minlength=num_bins)
+    # Subtract the overall mean to keep the variance precise
+    offset = intensity.mean()
+    shifted = intensity - offset
+    sums = np.bincount(indices, weights=shifted, minlength=num_bins)
+    squares = np.bincount(indices, weights=shifted * shifted,
+                          minlength=num_bins)
+
+    filled = counts > 0
+    counts, sums, squares = counts[filled], sums[filled], squares[filled]
+    mean = sums / counts
+    std = np.sqrt(np.maximum(squares / counts - mean * mean, 0))
+    centers = start + (np.flatnonzero(filled) + 0.5) * bin_width
+    return centers, mean + offset, std, counts
+
+
 GREY_BRUSH = QBrush(QColor(192, 192, 192, 70))
 NO_PEN = QPen(QColor(0, 0, 0, 0))
 NO_PEN.setStyle(Qt.NoPen)
@@ -59,6 +111,9 @@ class BaseXasGraph(BaseBindingController):
     std_plot = WeakRef(QGraphicsItem)
     counts_plot = WeakRef(QGraphicsItem)
 
+    # The raw (energy, intensity) samples that are binned on the client
+    _raw_samples = Any
+
     def create_widget(self, parent):
         widget = KaraboPlotView(parent=parent)
         widget.add_cross_target()
@@ -90,6 +145,10 @@ class BaseXasGraph(BaseBindingController):
         aux_plotItem.addItem(counts_plot)
         self.counts_plot = counts_plot
 
+        bin_width_action = QAction("Bin width...", widget)
+        bin_width_action.triggered.connect(self._configure_bin_width)
+        widget.plotItem.vb.add_action(bin_width_action)
+
         # Finalize
         widget.restore(build_model_config(self.model))
         return widget
@@ -98,6 +157,16 @@ class BaseXasGraph(BaseBindingController):
         if proxy.value is None:
             return
 
+        energy, _ = get_array_data(get_node_value(proxy, key=RAW_ENERGY),
+                                   default=[])
+        intensity, _ = get_array_data(
+            get_node_value(proxy, key=RAW_INTENSITY), default=[])
+        if len(energy) and len(intensity):
+            self.set_raw_samples(energy, intensity)
+            return
+        # Pre-binned data is not rebinned with a changed bin width
+        self._raw_samples = None
+
         x, _ = get_array_data(get_node_value(proxy, key='bins'),
                               default=[])
 
@@ -111,7 +180,16 @@ class BaseXasGraph(BaseBindingController):
                 x = x[valid_index]
                 y = y[valid_index]
 
-            self._plot_data(plot, x=x, y=y)
+            self._plot_values(plot, x=x, y=y)
+
+    def set_raw_samples(self, energy, intensity):
+        """Bin the raw samples on the client and plot the bins
+
+        The mean intensity, its standard deviation and the counts of the
+        bins are shown in the intensity, std and counts plots.
+        """
+        self._raw_samples = (energy, intensity)
+        self._rebin()
 
     @property
     def plots(self):
@@ -124,14 +202,31 @@ class BaseXasGraph(BaseBindingController):
     def _change_model(self, content):
         self.model.trait_set(**content)
 
-    def _plot_data(self, plot, *, x, y):
+    def _configure_bin_width(self):
+        bin_width, ok = QInputDialog.getDouble(
+            self.widget, "Bin width", "Bin width:", self.model.bin_width,
+            1e-9, 1e9, 6)
+        if ok:
+            self.model.bin_width = bin_width
+            self._rebin()
+
+    def _rebin(self):
+        if self._raw_samples is None:
+            return
+        x, mean, std, counts = bin_samples(*self._raw_samples,
+                                           bin_width=self.model.bin_width)
+        self._plot_values(self.intensity_plot, x=x, y=mean)
+        self._plot_values(self.std_plot, x=x, y=std)
+        self._plot_values(self.counts_plot, x=x, y=counts)
+
+    def _plot_values(self, plot, *, x, y):
         if not len(y) or len(x) != len(y):
             plot.setData([], [])
             return
 
         rect = get_view_range(plot)
         x, y = generate_down_sample(y, x=x, rect=rect, deviation=True)
-        if isinstance(plot, VectorBarGraphPlot):
+        if isinstance(plot, VectorBarGraphPlot) and len(x) > 1:
             plot.opts['width'] = 0.8 * (x[1] - x[0])
         plot.setData(x, y)
 
@@ -155,5 +250,12 @@ class DisplayXasGraph(BaseXasGraph):
        The incident intensity values
     counts : list, np.ndarray
        The values containing the counts per (binned) x-value
+    rawEnergy : list, np.ndarray (optional)
+       The energy of the unbinned samples
+    rawIntensity : list, np.ndarray (optional)
+       The intensity of the unbinned samples
+
+    If raw samples are given, they are binned on the client with the bin
+    width of the model instead of plotting the binned values.
     """
     model = Instance(XasGraphModel, args=())
@@ -15,6 +15,7 @@ class AggregatorNode(Configurable):
     outputStd = Node(VectorOutput)
     outputIo = Node(VectorOutput)
     outputCounts = Node(VectorOutput)
+    outputRaw = Node(VectorOutput)
 
 
 class Object(Configurable):
@@ -55,6 +56,20 @@ class TestXasGraph(GuiTestCase):
             np.testing.assert_array_equal(act_x, exp_x)
             np.testing.assert_array_equal(act_y, exp_y)
 
+    def test_raw_samples(self):
+        energy = np.array([7000.1, 7000.4, 7002.2])
+        intensity = np.array([1.0, 3.0, 5.0])
+        self.update_proxy(outputRaw=(energy, intensity))
+
+        controller = self.controller
+        x, y = controller.intensity_plot.getData()
+        np.testing.assert_array_equal(x, [7000.5, 7002.5])
+        np.testing.assert_allclose(y, [2.0, 5.0])
+        x, y = controller.std_plot.getData()
+        np.testing.assert_allclose(y, [1.0, 0.0])
+        x, y = controller.counts_plot.getData()
+        np.testing.assert_array_equal(y, [2, 1])
+
     # ---------------------------------------------------------------------
     # Helpers
 
@@ -12,11 +12,11 @@ from karabogui.binding.api import (
     NDArrayBinding, VectorNumberBinding, WidgetNodeBinding)
 from karabogui.controllers.api import (
     register_binding_controller, with_display_type)
-from karabogui.graph.plots.api import (
-    VectorBarGraphPlot, generate_down_sample, get_view_range)
 
 from .utils import PlotData
 
+RAW_OUTPUT = 'outputRaw'
+
 
 @register_binding_controller(
     ui_name='Metro XAS Graph',
@@ -26,6 +26,9 @@ from .utils import PlotData
     priority=0, can_show_nothing=False)
 class MetroXasGraph(BaseXasGraph):
     """The controller for the XAS graph display from a Metro output
+
+    If the node has an `outputRaw` output with the unbinned energy `x` and
+    intensity `y0`, the samples are binned on the client.
     """
     model = Instance(MetroXasGraphModel, args=())
     _std_plot = Instance(PlotData, args=())
@@ -44,12 +47,27 @@ class MetroXasGraph(BaseXasGraph):
         plots = (self._std_plot, self._intensity_plot, self._counts_plot)
         for plot in plots:
             excluded = [ex.path for ex in set(plots) - {plot}]
+            excluded.append(RAW_OUTPUT)
             plot.path = guess_path(proxy,
                                    klass=(NDArrayBinding, VectorNumberBinding),
                                    excluded=excluded,
                                    output=True)
 
     def value_update(self, proxy):
+        if proxy.value is None:
+            return
+        raw = get_node_value(proxy, key=RAW_OUTPUT)
+        if raw is not None:
+            energy, _ = get_array_data(get_node_value(raw, key='x'),
+                                       default=[])
+            intensity, _ = get_array_data(get_node_value(raw, key='y0'),
+                                          default=[])
+            if len(energy) and len(intensity):
+                self.set_raw_samples(energy, intensity)
+                return
+        # Pre-binned data is not rebinned with a changed bin width
+        self._raw_samples = None
+
         for plot in (self._std_plot, self._intensity_plot, self._counts_plot):
             self._plot_data(plot, proxy)
 
@@ -62,12 +80,4 @@ class MetroXasGraph(BaseXasGraph):
         prop = get_node_value(proxy, key=plot.path)
         x, _ = get_array_data(get_node_value(prop, key='x'), default=[])
         y, _ = get_array_data(get_node_value(prop, key='y0'), default=[])
-        if not len(y) or len(x) != len(y):
-            plot.item.setData([], [])
-            return
-
-        rect = get_view_range(plot.item)
-        x, y = generate_down_sample(y, x=x, rect=rect, deviation=True)
-        if isinstance(plot.item, VectorBarGraphPlot):
-            plot.item.opts['width'] = 0.8 * (x[1] - x[0])
-        plot.item.setData(x, y)
+        self._plot_values(plot.item, x=x, y=y)
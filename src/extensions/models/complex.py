@@ -1,6 +1,6 @@
 from xml.etree.ElementTree import SubElement
 
-from traits.api import Int, String
+from traits.api import Enum, Int, String
 
 from karabo.common.scenemodel.bases import BaseEditWidget, BaseWidgetObjectData
 from karabo.common.scenemodel.const import NS_KARABO, WIDGET_ELEMENT_TAG
@@ -28,6 +28,10 @@ class DetectorCellsModel(BaseWidgetObjectData):
     rows = Int(11)
     columns = Int(32)
     legend_location = String('bottom')
+    # Accumulate the lit frames over trains: 'off', 'window' or 'decay'
+    accumulation = Enum("off", "window", "decay")
+    # The window size or the decay constant in number of trains
+    accumulation_length = Int(100)
 
 
 class MultipleDetectorCellsModel(DetectorCellsModel):
@@ -74,6 +78,9 @@ def _base_detector_cells_reader(element, model):
     traits["columns"] = int(element.get(NS_KARABO + "columns", "32"))
     traits["legend_location"] = element.get(NS_KARABO + "legend_location",
                                             "bottom")
+    traits["accumulation"] = element.get(NS_KARABO + "accumulation", "off")
+    traits["accumulation_length"] = int(
+        element.get(NS_KARABO + "accumulation_length", "100"))
     return model(**traits)
 
 
@@ -94,6 +101,9 @@ def _base_detector_cells_writer(model, parent, name):
     element.set(NS_KARABO + "rows", str(model.rows))
     element.set(NS_KARABO + "columns", str(model.columns))
     element.set(NS_KARABO + "legend_location", model.legend_location)
+    element.set(NS_KARABO + "accumulation", model.accumulation)
+    element.set(NS_KARABO + "accumulation_length",
+                str(model.accumulation_length))
 
 
 @register_scene_writer(DetectorCellsModel)
@@ -1,6 +1,6 @@
 from xml.etree.ElementTree import SubElement
 
-from traits.api import Bool, Int, List, String
+from traits.api import Bool, Float, Int, List, String
 
 from karabo.common.scenemodel.bases import BaseWidgetObjectData
 from karabo.common.scenemodel.const import NS_KARABO, WIDGET_ELEMENT_TAG
@@ -39,6 +39,9 @@ class TableRoiGraphModel(ImageGraphModel):
 class BeamGraphModel(ImageGraphModel):
     """ A model for the beam graph """
     show_scale = Bool(False)
+    client_fit = Bool(False)
+    fit_threshold = Float(0.1)
+    fit_binning = Int(1)
 
 
 class TickedImageGraphModel(ImageGraphModel):
@@ -128,6 +131,11 @@ def _table_roi_graph_writer(model, parent):
 @register_scene_reader("BeamGraph")
 def _beam_graph_reader(element):
     traits = read_base_karabo_image_model(element)
+    client_fit = element.get(NS_KARABO + "client_fit", "0")
+    traits["client_fit"] = bool(int(client_fit))
+    traits["fit_threshold"] = float(
+        element.get(NS_KARABO + "fit_threshold", 0.1))
+    traits["fit_binning"] = int(element.get(NS_KARABO + "fit_binning", 1))
     return BeamGraphModel(**traits)
 
 
@@ -136,6 +144,9 @@ def _beam_graph_writer(model, parent):
     element = SubElement(parent, WIDGET_ELEMENT_TAG)
     write_base_widget_data(model, element, "BeamGraph")
     write_base_karabo_image_model(model, element)
+    element.set(NS_KARABO + "client_fit", str(int(model.client_fit)))
+    element.set(NS_KARABO + "fit_threshold", str(model.fit_threshold))
+    element.set(NS_KARABO + "fit_binning", str(model.fit_binning))
     return element
 
 
@@ -1,10 +1,10 @@
 from xml.etree.ElementTree import SubElement
 
-from traits.trait_types import Bool, String
+from traits.trait_types import Bool, Float, String
 
 from extensions.models.images import RoiGraphModel
 from extensions.models.utils import read_base_plot, write_base_plot
-from karabo.common.scenemodel.const import WIDGET_ELEMENT_TAG
+from karabo.common.scenemodel.const import NS_KARABO, WIDGET_ELEMENT_TAG
 from karabo.common.scenemodel.io_utils import write_base_widget_data
 from karabo.common.scenemodel.registry import (
     register_scene_reader, register_scene_writer)
@@ -37,6 +37,7 @@ class MetroXasGraphModel(BasePlotModel):
     x_label = String('Energy')
     x_units = String('eV')
     y_label = String('XAS')
+    bin_width = Float(1.0)
 
 
 @register_scene_reader('MetroSecAxisGraph')
@@ -80,6 +81,7 @@ def _metro_zone_plate_writer(model, parent):
 @register_scene_reader('MetroXasGraph')
 def _metro_xas_graph_reader(element):
     traits = read_base_plot(element)
+    traits['bin_width'] = float(element.get(NS_KARABO + 'bin_width', 1.0))
     return MetroXasGraphModel(**traits)
 
 
@@ -87,3 +89,4 @@ def _metro_xas_graph_reader(element):
 def _metro_xas_graph_writer(model, parent):
     element = SubElement(parent, WIDGET_ELEMENT_TAG)
     write_base_plot(model, element, 'MetroXasGraph')
+    element.set(NS_KARABO + 'bin_width', str(model.bin_width))
@@ -1,6 +1,9 @@
+import sys
+from array import array
+from base64 import b64decode, b64encode
 from xml.etree.ElementTree import SubElement
 
-from traits.api import Bool, Float, Instance, List, String
+from traits.api import Bool, Enum, Float, Instance, List, String
 
 from karabo.common.savable import BaseSavableModel
 from karabo.common.scenemodel.api import BaseWidgetObjectData
@@ -25,9 +28,21 @@ class FilterInstance(BaseSavableModel):
 class NetworkXModel(BaseWidgetObjectData):
     nodePositions = List(Instance(NodePosition))
     filterInstances = List(Instance(FilterInstance))
+    aggregation = Enum("none", "domain", "prefix", "server")
 
 
 def read_node_positions(element):
+    """Read the node positions of a NetworkX element
+
+    The positions are stored as a name table and a base64 encoded array of
+    little-endian doubles (x, y) per node. The previous format with a
+    `nodePosition` element per node is still read.
+    """
+    names = element.get(NS_KARABO + "nodeNames")
+    if names is not None:
+        return _read_packed_positions(
+            names, element.get(NS_KARABO + "nodeCoords", ""))
+
     positions = []
 
     for child_elem in element:
@@ -49,12 +64,35 @@ def read_node_positions(element):
     return positions
 
 
+def _read_packed_positions(names, coords):
+    names = names.split(",") if names else []
+    values = array("d")
+    values.frombytes(b64decode(coords))
+    if sys.byteorder == "big":
+        values.byteswap()
+    if len(values) != 2 * len(names):
+        return []
+
+    return [NodePosition(device_id=device_id, x=values[2 * i],
+                         y=values[2 * i + 1])
+            for i, device_id in enumerate(names) if device_id]
+
+
 def write_node_positions(model, element):
-    for node_position in model.nodePositions:
-        node_element = SubElement(element, NS_KARABO + "nodePosition")
-        for attribute in node_position.class_visible_traits():
-            node_element.set(attribute,
-                             str(getattr(node_position, attribute)))
+    positions = model.nodePositions
+    if not positions:
+        return
+
+    values = array("d")
+    for node_position in positions:
+        values.append(node_position.x)
+        values.append(node_position.y)
+    if sys.byteorder == "big":
+        values.byteswap()
+    element.set(NS_KARABO + "nodeNames",
+                ",".join(p.device_id for p in positions))
+    element.set(NS_KARABO + "nodeCoords",
+                b64encode(values.tobytes()).decode("ascii"))
 
 
 def read_filter_instances(element):
@@ -91,6 +129,7 @@ def _networkx_reader(element):
     traits = read_base_widget_data(element)
     traits["nodePositions"] = read_node_positions(element)
     traits["filterInstances"] = read_filter_instances(element)
+    traits["aggregation"] = element.get(NS_KARABO + "aggregation", "none")
     return NetworkXModel(**traits)
 
 
@@ -100,4 +139,5 @@ def _networkx_writer(model, parent):
     write_base_widget_data(model, element, "NetworkX")
     write_node_positions(model, element)
     write_filter_instances(model, element)
+    element.set(NS_KARABO + "aggregation", model.aggregation)
     return element
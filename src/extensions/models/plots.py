@@ -21,6 +21,9 @@ class DynamicDigitizerModel(BasePlotModel):
     """ A model for the dynamic digitizer"""
     roi_items = List(Instance(BaseROIData))
     roi_tool = Int(0)
+    # Client side accumulation of the traces
+    accumulation = Enum("none", "mean", "exponential", "envelope")
+    accumulation_length = Int(10)
 
 
 class DynamicGraphModel(BasePlotModel):
@@ -33,6 +36,10 @@ class DynamicGraphModel(BasePlotModel):
     x_grid = Bool(True)
     y_grid = Bool(True)
     number = Int(10)
+    # Density mode: the traces are accumulated in a decaying histogram
+    density = Bool(False)
+    decay = Float(0.95)
+    y_bins = Int(200)
 
 
 class ExtendedVectorXYGraph(BasePlotModel):
@@ -80,6 +87,7 @@ class XasGraphModel(BasePlotModel):
     """ A model for the metro XAS graph """
     x_label = String("Bins")
     y_label = String("XAS")
+    bin_width = Float(1.0)
 
 
 class PeakIntegrationGraphModel(BasePlotModel):
@@ -124,6 +132,10 @@ def _dynamic_digitizer_reader(element):
     # roi information
     traits["roi_items"] = read_roi_info(element)
     traits["roi_tool"] = int(element.get(NS_KARABO + "roi_tool", 0))
+    # Accumulation
+    traits["accumulation"] = element.get(NS_KARABO + "accumulation", "none")
+    traits["accumulation_length"] = int(
+        element.get(NS_KARABO + "accumulation_length", 10))
 
     return DynamicDigitizerModel(**traits)
 
@@ -135,6 +147,10 @@ def _dynamic_digitizer_writer(model, parent):
     # roi information
     write_roi_info(model, element)
     element.set(NS_KARABO + "roi_tool", str(model.roi_tool))
+    # Accumulation
+    element.set(NS_KARABO + "accumulation", model.accumulation)
+    element.set(NS_KARABO + "accumulation_length",
+                str(model.accumulation_length))
 
     return element
 
@@ -146,6 +162,10 @@ def _dynamic_graph_reader(element):
     traits["roi_tool"] = int(element.get(NS_KARABO + "roi_tool", 0))
     # Number of curves
     traits["number"] = int(element.get(NS_KARABO + "number", 10))
+    # Density mode
+    traits["density"] = element.get(NS_KARABO + "density", "") == "true"
+    traits["decay"] = float(element.get(NS_KARABO + "decay", 0.95))
+    traits["y_bins"] = int(element.get(NS_KARABO + "y_bins", 200))
 
     return DynamicGraphModel(**traits)
 
@@ -158,6 +178,10 @@ def _dynamic_graph_writer(model, parent):
     element.set(NS_KARABO + "roi_tool", str(model.roi_tool))
     # Number of curves
     element.set(NS_KARABO + "number", str(model.number))
+    # Density mode
+    element.set(NS_KARABO + "density", str(model.density).lower())
+    element.set(NS_KARABO + "decay", str(model.decay))
+    element.set(NS_KARABO + "y_bins", str(model.y_bins))
 
     return element
 
@@ -253,6 +277,7 @@ def _two_axis_graph_writer(model, parent):
 @register_scene_reader("XasGraph")
 def _xas_graph_reader(element):
     traits = read_base_plot(element)
+    traits["bin_width"] = float(element.get(NS_KARABO + "bin_width", 1.0))
     return XasGraphModel(**traits)
 
 
@@ -260,6 +285,7 @@ def _xas_graph_reader(element):
 def _xas_graph_writer(model, parent):
     element = SubElement(parent, WIDGET_ELEMENT_TAG)
     write_base_plot(model, element, "XasGraph")
+    element.set(NS_KARABO + "bin_width", str(model.bin_width))
 
 
 @register_scene_reader("PeakIntegrationGraph")
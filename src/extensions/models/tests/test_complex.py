@@ -36,9 +36,13 @@ def test_detector_cells_widget(model_cls):
     traits['rows'] = 40
     traits['columns'] = 20
     traits['legend_location'] = 'right'
+    traits['accumulation'] = 'decay'
+    traits['accumulation_length'] = 50
     model = model_cls(**traits)
 
     read_model = single_model_round_trip(model)
     assert read_model.rows == 40
     assert read_model.columns == 20
     assert read_model.legend_location == 'right'
+    assert read_model.accumulation == 'decay'
+    assert read_model.accumulation_length == 50
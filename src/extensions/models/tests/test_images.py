@@ -34,3 +34,16 @@ def test_image_graph_model():
     read_model = single_model_round_trip(model)
     _assert_geometry_traits(read_model)
     assert read_model.colormap == "plasma"
+
+
+def test_beam_graph_model():
+    traits = _geometry_traits()
+    traits["client_fit"] = True
+    traits["fit_threshold"] = 0.25
+    traits["fit_binning"] = 2
+    model = api.BeamGraphModel(**traits)
+    read_model = single_model_round_trip(model)
+    _assert_geometry_traits(read_model)
+    assert read_model.client_fit
+    assert read_model.fit_threshold == 0.25
+    assert read_model.fit_binning == 2
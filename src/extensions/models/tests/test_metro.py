@@ -13,9 +13,11 @@ def test_metro_zone_plate_model():
 
 def test_metro_xas_graph_model():
     traits = _geometry_traits()
+    traits['bin_width'] = 0.25
     model = api.MetroXasGraphModel(**traits)
     read_model = single_model_round_trip(model)
     _assert_geometry_traits(read_model)
+    assert read_model.bin_width == 0.25
 
 
 def test_metro_secaxis_graph_model():
@@ -49,20 +49,39 @@ def test_scatter_position_model():
     assert read_model.psize == 1.3
 
 
+def test_dynamic_digitizer_model():
+    traits = _geometry_traits()
+    traits["accumulation"] = "envelope"
+    traits["accumulation_length"] = 25
+    model = api.DynamicDigitizerModel(**traits)
+    read_model = single_model_round_trip(model)
+    _assert_geometry_traits(read_model)
+    assert read_model.accumulation == "envelope"
+    assert read_model.accumulation_length == 25
+
+
 def test_dynamic_graph():
     traits = _geometry_traits()
     traits["number"] = 30
+    traits["density"] = True
+    traits["decay"] = 0.5
+    traits["y_bins"] = 100
     model = api.DynamicGraphModel(**traits)
     read_model = single_model_round_trip(model)
     _assert_geometry_traits(read_model)
     assert model.number == 30
+    assert read_model.density
+    assert read_model.decay == 0.5
+    assert read_model.y_bins == 100
 
 
 def test_xas_graph_model():
     traits = _geometry_traits()
+    traits["bin_width"] = 0.25
     model = api.XasGraphModel(**traits)
     read_model = single_model_round_trip(model)
     _assert_geometry_traits(read_model)
+    assert read_model.bin_width == 0.25
 
 
 def test_table_vector_xy_model():
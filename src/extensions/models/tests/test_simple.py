@@ -1,6 +1,10 @@
+from xml.etree.ElementTree import Element, SubElement
+
+from karabo.common.scenemodel.const import NS_KARABO
 from karabo.common.scenemodel.tests.utils import single_model_round_trip
 
 from .. import api
+from ..networkx import read_node_positions, write_node_positions
 from ..simple import _SIMPLE_WIDGET_MODELS
 from .utils import _assert_geometry_traits, _geometry_traits
 
@@ -40,6 +44,30 @@ def test_editable_datetime():
     assert model.time_format == "%H:%M"
 
 
+def test_networkx_node_positions():
+    # The previous format with one element per node is still read
+    element = Element("widget")
+    for i in range(3):
+        child = SubElement(element, NS_KARABO + "nodePosition")
+        child.set("device_id", f"foo{i}")
+        child.set("x", str(i + 0.5))
+        child.set("y", str(-i))
+    positions = read_node_positions(element)
+    assert [p.device_id for p in positions] == ["foo0", "foo1", "foo2"]
+    assert [p.x for p in positions] == [0.5, 1.5, 2.5]
+    assert [p.y for p in positions] == [0, -1, -2]
+
+    # The compact format uses two attributes
+    model = api.NetworkXModel(nodePositions=positions)
+    element = Element("widget")
+    write_node_positions(model, element)
+    assert len(element) == 0
+    assert element.get(NS_KARABO + "nodeNames") == "foo0,foo1,foo2"
+    read = read_node_positions(element)
+    assert [(p.device_id, p.x, p.y) for p in read] == [
+        (p.device_id, p.x, p.y) for p in positions]
+
+
 def test_networkx_model():
     traits = _geometry_traits()
     positions = []
@@ -52,9 +80,11 @@ def test_networkx_model():
                                           is_active=(i % 2 == 0)))
     traits["nodePositions"] = positions
     traits["filterInstances"] = filters
+    traits["aggregation"] = "domain"
     model = api.NetworkXModel(**traits)
     read_model = single_model_round_trip(model)
     _assert_geometry_traits(read_model)
+    assert read_model.aggregation == "domain"
 
     for i in range(10):
         msg = f"Node position does not match for {i}"
@@ -62,6 +92,11 @@ def test_networkx_model():
         assert model.nodePositions[i].x == positions[i].x, msg
         assert model.nodePositions[i].y == positions[i].y, msg
 
+        msg = f"Read node position does not match for {i}"
+        assert read_model.nodePositions[i].device_id == f"foo{i}", msg
+        assert read_model.nodePositions[i].x == i, msg
+        assert read_model.nodePositions[i].y == -i, msg
+
         msg = f"Filter does not match for {i}"
         assert model.filterInstances[i].filter_text == filters[
             i].filter_text, msg  # noqa
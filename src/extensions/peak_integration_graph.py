@@ -10,11 +10,11 @@ import pyqtgraph as pg
 from pyqtgraph.graphicsItems.LegendItem import ItemSample
 from qtpy.QtCore import Qt
 from qtpy.QtGui import QPen
-from qtpy.QtWidgets import QGraphicsItem
+from qtpy.QtWidgets import QAction, QGraphicsItem, QSplitter
 from traits.api import Array, Bool, Instance, List, WeakRef, on_trait_change
 
 from extensions.models.plots import PeakIntegrationGraphModel
-from extensions.utils import value_from_node
+from extensions.utils import RingBuffer, value_from_node
 from karabo.common.scenemodel.api import build_model_config
 from karabogui.binding.api import (
     NDArrayBinding, PropertyProxy, WidgetNodeBinding, get_binding_value)
@@ -32,6 +32,8 @@ DEFAULT_REGION_SETTINGS = dict(
     pen=QPen(Qt.NoPen),
     hoverPen=QPen(Qt.NoPen))
 REGION_ALPHA = 80
+TREND_LENGTH = 1000
+TREND_COLORS = ('r', 'b', 'g', 'o', 'p', 'c')
 
 
 class ColorBox(ItemSample):
@@ -48,6 +50,57 @@ class ColorBox(ItemSample):
         painter.drawRect(0, 0, 10, 14)
 
 
+def get_window_sums(trace, starts, stops):
+    """Return the sums of the `trace` in the windows [start, stop)
+
+    The trace is summed once with `np.add.reduceat` between the sorted and
+    unique window edges, the window sums are the differences of the
+    cumulative sums at their edges. Windows may overlap and are clipped to
+    the trace.
+    """
+    size = len(trace)
+    starts = np.clip(starts, 0, size)
+    stops = np.clip(np.maximum(stops, starts), 0, size)
+    edges = np.unique(np.concatenate(([0], starts, stops)))
+    inner = edges[edges < size]
+    if not inner.size:
+        return np.zeros(len(starts))
+    segments = np.add.reduceat(trace, inner, dtype=np.float64)
+    cumulative = np.concatenate(([0.], np.cumsum(segments)))
+    return (cumulative[np.searchsorted(edges, stops)]
+            - cumulative[np.searchsorted(edges, starts)])
+
+
+def get_peak_integrals(trace, positions, widths, baseline):
+    """Return the baseline corrected integral of every peak
+
+    The peak and baseline windows are given relative to the peak positions
+    and include both limits. The mean of the trace in the baseline window
+    is subtracted from every sample of the peak window.
+    """
+    positions = np.asarray(positions, dtype=np.int64)
+    num = positions.size
+    if len(widths) < 2:
+        return np.full(num, np.nan)
+    peak_starts = positions + int(widths[0])
+    peak_stops = positions + int(widths[1]) + 1
+    starts, stops = peak_starts, peak_stops
+    if len(baseline) >= 2:
+        starts = np.concatenate((starts, positions + int(baseline[0])))
+        stops = np.concatenate((stops, positions + int(baseline[1]) + 1))
+    sums = get_window_sums(trace, starts, stops)
+
+    size = len(trace)
+    counts = (np.clip(stops, 0, size) - np.clip(starts, 0, size)).clip(0)
+    integrals = sums[:num]
+    if len(baseline) >= 2:
+        base_counts = counts[num:]
+        base_means = np.divide(sums[num:], base_counts,
+                               out=np.zeros(num), where=base_counts > 0)
+        integrals = integrals - base_means * counts[:num]
+    return integrals
+
+
 @register_binding_controller(
     ui_name='Peak Integration Graph',
     klassname='PeakIntegrationGraph',
@@ -66,6 +119,12 @@ class DisplayPeakIntegrationGraph(BaseBindingController):
 
     _peak_item = WeakRef(QGraphicsItem)
 
+    # Integral trend
+    _trend_view = WeakRef(KaraboPlotView)
+    _trend_items = List(WeakRef(QGraphicsItem))
+    _trend = Instance(RingBuffer)
+    _integrals = Array()
+
     # Properties
     _peak_positions = Array()
     _peak_widths = Array()
@@ -79,7 +138,8 @@ class DisplayPeakIntegrationGraph(BaseBindingController):
     # Controller methods
 
     def create_widget(self, parent):
-        widget = KaraboPlotView(parent=parent)
+        splitter = QSplitter(Qt.Vertical, parent)
+        widget = KaraboPlotView(parent=splitter)
         widget.stateChanged.connect(self._change_model)
         widget.add_cross_target()
         widget.enable_export()
@@ -121,10 +181,33 @@ class DisplayPeakIntegrationGraph(BaseBindingController):
         # Create curve item
         self._curve_item = widget.add_curve_item(pen=get_default_pen())
 
+        # Create the trend of the peak integrals
+        trend_view = KaraboPlotView(parent=splitter)
+        trend_view.add_legend(visible=True)
+        for index in range(NUM_PEAKS):
+            pen = make_pen(TREND_COLORS[index % len(TREND_COLORS)])
+            item = trend_view.add_curve_item(
+                name=f"Peak {index}", pen=pen, connect="finite")
+            self._trend_items.append(item)
+        trend_view.setVisible(False)
+        self._trend_view = trend_view
+        self._trend = RingBuffer(TREND_LENGTH, shape=(NUM_PEAKS,))
+
+        trend_action = QAction("Show integral trend", widget)
+        trend_action.setCheckable(True)
+        trend_action.toggled.connect(self._show_trend)
+        widget.plotItem.vb.add_action(trend_action)
+
+        reset_action = QAction("Reset integral trend", widget)
+        reset_action.triggered.connect(self._reset_trend)
+        widget.plotItem.vb.add_action(reset_action, separator=False)
+
         # Finalize
         widget.restore(build_model_config(self.model))
 
-        return widget
+        splitter.addWidget(widget)
+        splitter.addWidget(trend_view)
+        return splitter
 
     def binding_update(self, proxy):
         self.value_update(proxy)
@@ -185,6 +268,8 @@ class DisplayPeakIntegrationGraph(BaseBindingController):
             self._peak_item.setData(self._peak_positions,
                                     value[self._peak_positions])
 
+            self._update_integrals(value)
+
     # ----------------------------------------------------------------
     # Properties
 
@@ -209,6 +294,14 @@ class DisplayPeakIntegrationGraph(BaseBindingController):
     def _change_model(self, content):
         self.model.trait_set(**content)
 
+    def _show_trend(self, visible):
+        self._trend_view.setVisible(visible)
+        self._plot_trend()
+
+    def _reset_trend(self):
+        self._trend.clear()
+        self._plot_trend()
+
     # ----------------------------------------------------------------
     # Inner methods
 
@@ -236,6 +329,25 @@ class DisplayPeakIntegrationGraph(BaseBindingController):
         data = self._curve_item.xData
         self._show_peak_regions(data is not None and len(data))
 
+    def _update_integrals(self, trace):
+        """Integrate the peaks of the trace and append them to the trend"""
+        self._integrals = get_peak_integrals(
+            trace, self._peak_positions, self._peak_widths,
+            self._peak_baseline)
+        integrals = np.full(NUM_PEAKS, np.nan)
+        num = min(NUM_PEAKS, self._integrals.size)
+        integrals[:num] = self._integrals[:num]
+        self._trend.append(integrals)
+        self._plot_trend()
+
+    def _plot_trend(self):
+        if self._trend_view.isHidden():
+            return
+        trend = self._trend.view()
+        x = np.arange(len(trend))
+        for index, item in enumerate(self._trend_items):
+            item.setData(x, trend[:, index])
+
     def _show_peak_regions(self, visible=True):
         for item in self.region_items:
             item.setVisible(visible)
@@ -11,6 +11,7 @@ from karabogui.controllers.api import (
 from karabogui.request import send_property_changes
 
 from .models.api import PointAndClickModel
+from .utils import SYNC_DECODE_LIMIT, LatestWinsWorker
 
 
 class CrossesWidget(QWidget):
@@ -41,6 +42,17 @@ class CrossesWidget(QWidget):
     offset_x = offset_y = 0
     scale_x = scale_y = 1
 
+    def set_image(self, image):
+        """Set a decoded `QImage` and keep the zoom for equal sizes"""
+        keep_zoom = (self.image is not None and self.scaled is not None
+                     and image.size() == self.image.size())
+        self.image = image
+        if keep_zoom:
+            self.scale()
+        else:
+            self.scaled = None
+        self.update()
+
     def scale(self):
         self.scaled = self.image.copy(
             self.offset_x / self.scale_x, self.offset_y / self.scale_y,
@@ -48,7 +60,7 @@ class CrossesWidget(QWidget):
             ).scaled(self.width(), self.height())
 
     def paintEvent(self, event):
-        if self.image is None:
+        if self.image is None or self.image.isNull():
             return
 
         if self.scaled is None or self.scaled.width() != self.width() \
@@ -86,6 +98,8 @@ class CrossesWidget(QWidget):
         event.accept()
 
     def wheelEvent(self, event):
+        if self.image is None or self.image.isNull():
+            return
         factor = exp(event.angleDelta().y() / 300)
         self.scale_x = max(factor * self.scale_x,
                            self.width() / self.image.width())
@@ -124,11 +138,20 @@ class PointAndClick(BaseBindingController):
     proxy_y = Instance(PropertyProxy)
     image = Bytes
 
+    _decoder = Instance(LatestWinsWorker)
+
     def create_widget(self, parent):
         widget = CrossesWidget(parent)
         widget.crossMoved.connect(self.cross_moved)
+        self._decoder = LatestWinsWorker(QImage.fromData, parent=widget)
+        self._decoder.resultReady.connect(widget.set_image)
         return widget
 
+    def destroy_widget(self):
+        if self._decoder is not None:
+            self._decoder.cancel()
+            self._decoder = None
+
     def value_update(self, proxy):
         if proxy.value is None:
             return
@@ -142,9 +165,14 @@ class PointAndClick(BaseBindingController):
         self.widget.update()
 
     def _image_changed(self, image):
-        if image is not None:
-            self.widget.image = QImage.fromData(image)
-            self.widget.update()
+        # Note: Traits only notifies if the image content changed
+        if image is None or self.widget is None:
+            return
+        if len(image) < SYNC_DECODE_LIMIT:
+            self._decoder.cancel()
+            self.widget.set_image(QImage.fromData(image))
+        else:
+            self._decoder.submit(image)
 
     def set_read_only(self, readonly):
         self.widget.readonly = readonly
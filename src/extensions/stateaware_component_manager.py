@@ -3,15 +3,15 @@
 # Created on May 11, 2021
 # Copyright (C) European XFEL GmbH Hamburg. All rights reserved.
 #############################################################################
-from collections import OrderedDict
+from collections import Counter, OrderedDict
 from functools import partial
 
-from qtpy.QtCore import QModelIndex, Qt, QTimer
+from qtpy.QtCore import QModelIndex, Qt, QTimer, Signal
 from qtpy.QtGui import QStandardItem, QStandardItemModel
 from qtpy.QtWidgets import (
     QAbstractItemView, QAction, QHBoxLayout, QHeaderView, QLabel, QSizePolicy,
     QToolBar, QToolButton, QTreeView, QVBoxLayout, QWidget)
-from traits.api import Bool, Dict, Instance, List, String, WeakRef
+from traits.api import Any, Bool, Dict, Instance, Int, List, String, WeakRef
 
 from karabo.common.states import State
 from karabo.native import Hash
@@ -85,6 +85,15 @@ APPLY_UPDATES_LABEL = "Accept External Updates"
 REJECT_UPDATES_LABEL = "Reject External Updates"
 
 
+# The status is polled while changes are applied. The interval is doubled
+# while the status does not change, up to the maximum interval.
+MIN_POLL_INTERVAL = 2000
+MAX_POLL_INTERVAL = 30000
+
+# The node of a group item and the counted check state of a device item
+NODE_ROLE = Qt.UserRole + 1
+CHECKED_ROLE = Qt.UserRole + 2
+
 NODE_CLASS_NAME = '_StateAwareComponentManager'
 _is_compatible = with_display_type('WidgetNode|StateAwareComponentManagerView')
 
@@ -96,6 +105,95 @@ def find_column_index(clabel):
     return None
 
 
+def get_status_symbol(entry):
+    """Return the symbol, color and tooltip context of a status entry
+
+    The symbol is None if the entry cannot be interpreted.
+    """
+    symbol, color, context = None, None, None
+    # nothing to do for init except update the status
+    if entry == "INIT":
+        symbol, color = STATUS_SYMBOL["INIT"]
+        return symbol, color, context
+
+    typ, detail = entry.split(":", 1)
+    if typ == "OK":
+        symbol, color = STATUS_SYMBOL.get(detail.upper(), ("?", "red"))
+    elif typ == "ERR":
+        symbol, color = STATUS_SYMBOL["ERROR"]
+        context = detail
+    elif typ == "DONE":
+        symbol, color = STATUS_SYMBOL["DONE"]
+        symbol += f" {detail}"  # is a state
+    elif typ == "FAILED":
+        symbol, color = STATUS_SYMBOL["ERROR"]
+        state, context = detail.split(":", 1)
+        context = context.split("exception=")[-1]
+        symbol += f" {state}"
+    return symbol, color, context
+
+
+class GroupCounter:
+    """Count the check states and status colors of the devices of a group
+
+    The counters are updated with the change of a single device, the check
+    state and the status color of the group are derived from the counters
+    without visiting the devices.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self.checked = {"device": 0, "do_final": 0}
+        self.colors = Counter()
+
+    def add(self, device_checked, do_final_checked):
+        self.size += 1
+        self.checked["device"] += device_checked
+        self.checked["do_final"] += do_final_checked
+
+    def set_checked(self, which, checked):
+        """Count the change of the check state of a single device"""
+        self.checked[which] += 1 if checked else -1
+
+    def set_all_checked(self, which, checked):
+        self.checked[which] = self.size if checked else 0
+
+    def check_state(self, which):
+        checked = self.checked[which]
+        if checked == self.size:
+            return Qt.Checked
+        elif checked:
+            return Qt.PartiallyChecked
+        return Qt.Unchecked
+
+    def set_color(self, old, new):
+        """Count the change of the status color of a single device"""
+        if old is not None:
+            self.colors[old] -= 1
+        if new is not None:
+            self.colors[new] += 1
+
+    def color(self):
+        """Return the most important status color of the devices or None"""
+        for _, color in reversed(STATUS_SYMBOL.values()):
+            if self.colors[color] > 0:
+                return color
+        return None
+
+
+class ComponentManagerWidget(QWidget):
+    """The widget notifies when it is shown or hidden"""
+    visibilityChanged = Signal(bool)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.visibilityChanged.emit(True)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.visibilityChanged.emit(False)
+
+
 @register_binding_controller(ui_name='State Aware Component Manager View',
                              can_edit=True,
                              klassname='StateAwareComponentManager',
@@ -118,12 +216,23 @@ class StateAwareComponentManager(BaseBindingController):
     _item_model = WeakRef(QStandardItemModel)
     _overlay = WeakRef(QLabel)
     _selection_proxy = Instance(PropertyProxy)
+    # The status items of the devices and groups
     _device_refs = Dict(String, WeakRef(QStandardItem))
+    # The group of every device and the first item of every group
+    _device_groups = Dict(String, String)
+    _group_items = Dict(String, WeakRef(QStandardItem))
+    # The counters of every group and the status color of every device
+    _group_counters = Dict(String, Instance(GroupCounter))
+    _device_colors = Dict(String, Any)
     _previous_status = Dict(String, String)
+    _status_revision = Any
     _timer = Instance(QTimer)
+    _polling = Bool(False)
+    _poll_interval = Int(MIN_POLL_INTERVAL)
 
     def create_widget(self, parent):
-        widget = QWidget(parent=parent)
+        widget = ComponentManagerWidget(parent=parent)
+        widget.visibilityChanged.connect(self._visibility_changed)
         layout = QVBoxLayout(widget)
         header_layout = QHBoxLayout()
         self._treeview = QTreeView(parent=widget)
@@ -179,50 +288,33 @@ class StateAwareComponentManager(BaseBindingController):
         self._selection_proxy = PropertyProxy(root_proxy=root_proxy,
                                               path='selectionList.devices')
 
-        # request status once:
-        self._request_status()
-        # and setup the timer we trigger when configuration happens
-        self._timer = QTimer(parent)
-        self._timer.setInterval(2000)
+        # setup the timer we trigger when configuration happens
+        self._timer = QTimer(widget)
+        self._timer.setSingleShot(True)
         self._timer.timeout.connect(self._request_status)
+        # and request status once:
+        self._request_status()
 
         return widget
 
     def _update_check_state_all(self, state):
         # update all check boxes to the same state
         for i in range(self._item_model.rowCount(QModelIndex())):
-            group = self._item_model.item(i)
-            for j in range(group.rowCount()):
-                item = group.child(j)
-                item.setCheckState(state)
+            self._set_group_checked(self._item_model.item(i), "device",
+                                    state == Qt.Checked)
 
     def tool_bar_action(self, action):
-
-        if action.text() == SELECT_ALL_LABEL:
-            self._update_check_state_all(Qt.Checked)
-        elif action.text() == SELECT_NONE_LABEL:
-            self._update_check_state_all(Qt.Unchecked)
-        elif action.text() == SELECT_BY_STATE_LABEL:
-            # first deselect all
-            self._update_check_state_all(Qt.Unchecked)
-            # now select those where the pre state transition is keep
-            for i in range(self._item_model.rowCount(QModelIndex())):
-                group = self._item_model.item(i)
-                pre_state = self._item_model.item(i, 2)
-                pre_text = pre_state.text()
-                if pre_text == "keep" or pre_text == "undefined":
-                    for j in range(group.rowCount()):
-                        item = group.child(j)
-                        item.setCheckState(Qt.Checked)
-        elif action.text() == SELECT_INVERT_LABEL:
-            # invert our selection
-            for i in range(self._item_model.rowCount(QModelIndex())):
-                group = self._item_model.item(i)
-                for j in range(group.rowCount()):
-                    item = group.child(j)
-                    state = item.checkState()
-                    item.setCheckState(Qt.Checked if state == Qt.Unchecked
-                                       else Qt.Unchecked)
+        if action.text() in (SELECT_ALL_LABEL, SELECT_NONE_LABEL,
+                             SELECT_BY_STATE_LABEL, SELECT_INVERT_LABEL):
+            # the selection is changed and sent at once, unless the
+            # selection is locked while changes are applied
+            locked, self._is_updating = self._is_updating, True
+            try:
+                self._select_devices(action.text())
+            finally:
+                self._is_updating = locked
+            if not locked:
+                self._send_selection()
 
         elif action.text() == APPLY_UPDATES_LABEL:
             # applies updates from the device
@@ -240,6 +332,42 @@ class StateAwareComponentManager(BaseBindingController):
             self._selection_proxy.edit_value = self._build_value()
             send_property_changes([self._selection_proxy])
 
+    def _send_selection(self):
+        if self.proxy.binding is None:
+            return
+        try:
+            self._is_editing = True
+            self._selection_proxy.edit_value = self._build_value()
+            send_property_changes([self._selection_proxy])
+        finally:
+            self._is_editing = False
+
+    def _select_devices(self, label):
+        if label == SELECT_ALL_LABEL:
+            self._update_check_state_all(Qt.Checked)
+        elif label == SELECT_NONE_LABEL:
+            self._update_check_state_all(Qt.Unchecked)
+        elif label == SELECT_BY_STATE_LABEL:
+            # select those where the pre state transition is keep
+            for i in range(self._item_model.rowCount(QModelIndex())):
+                pre_text = self._item_model.item(i, 2).text()
+                checked = pre_text == "keep" or pre_text == "undefined"
+                self._set_group_checked(self._item_model.item(i), "device",
+                                        checked)
+        elif label == SELECT_INVERT_LABEL:
+            # invert our selection
+            for i in range(self._item_model.rowCount(QModelIndex())):
+                group = self._item_model.item(i)
+                node = group.data(NODE_ROLE)
+                counter = self._group_counters.get(node)
+                for j in range(group.rowCount()):
+                    item = group.child(j)
+                    state = item.checkState()
+                    item.setCheckState(Qt.Checked if state == Qt.Unchecked
+                                       else Qt.Unchecked)
+                    self._count_check_state(item, "device", counter)
+                self._update_group_check_state(node, "device")
+
     def on_device_list(self, group_item, remote, fin_action,
                        fin_action_select, success, reply):
         """
@@ -256,19 +384,33 @@ class StateAwareComponentManager(BaseBindingController):
         devices = entry.get("devices", None)
         if not devices:
             return
+        # the reply of a group replaced by a later value update is dropped
+        if self._group_items.get(node) is not group_item:
+            return
 
         self._treeview.setUpdatesEnabled(False)
-        self._is_updating = True
-
+        is_updating, self._is_updating = self._is_updating, True
+
+        # the devices of the group are listed and counted from scratch
+        for device_id in [device_id for device_id, group
+                          in self._device_groups.items() if group == node]:
+            del self._device_refs[device_id]
+            del self._device_groups[device_id]
+            self._device_colors.pop(device_id, None)
+        group_item.removeRows(0, group_item.rowCount())
+        counter = self._group_counters[node] = GroupCounter()
+        selected_devices = set(self._selected_devices)
         row, column = 0, 0
 
         for device in devices:
             device_item = QStandardItem(device["deviceId"])
             device_item.setEditable(False)
             device_item.setCheckable(True)
-            if device["deviceId"] in self._selected_devices:
+            device_checked = device["deviceId"] in selected_devices
+            if device_checked:
                 if device_item.checkState() != Qt.Checked:
                     device_item.setCheckState(Qt.Checked)
+            device_item.setData(device_checked, CHECKED_ROLE)
             group_item.setChild(row, column, device_item)
             column += 1
 
@@ -292,6 +434,8 @@ class StateAwareComponentManager(BaseBindingController):
             do_final_action_itm = QStandardItem("")  # no text on this item
             do_final_action_itm.setCheckable(True)
             do_final_action_itm.setCheckState(fin_action)
+            do_final_action_itm.setData(fin_action == Qt.Checked,
+                                        CHECKED_ROLE)
             do_final_action_itm.setEnabled(fin_action_select)
             group_item.setChild(row, find_column_index("do_final_action"),
                                 do_final_action_itm)
@@ -301,14 +445,24 @@ class StateAwareComponentManager(BaseBindingController):
                                 status_item)
 
             # add to the references
-            self._device_refs[device["deviceId"]] = status_item
+            device_id = device["deviceId"]
+            self._device_refs[device_id] = status_item
+            self._device_groups[device_id] = node
+            self._device_colors[device_id] = None
+            counter.add(device_checked, fin_action == Qt.Checked)
+            # the status might have been received before the devices
+            entry = self._previous_status.get(device_id)
+            if entry is not None:
+                self._set_device_status(device_id, entry)
             row, column = row + 1, 0
 
+        self._update_group_status(node)
+
         # since we reapplied check marks as part of the update
         # re-evaluate the tri-states here. Only children could have been
         # changed, so we do not look at the top-level items.
-        self._evaluate_tristates(False, which="device")
-        self._is_updating = False
+        self._update_group_check_state(node, "device")
+        self._is_updating = is_updating
         self._treeview.setUpdatesEnabled(True)
 
     def on_diff(self, device_item, btn, success, reply):
@@ -354,80 +508,135 @@ class StateAwareComponentManager(BaseBindingController):
     def on_status(self, success, reply):
         """
         Callback for a status request
+
+        Only the devices with a changed status are updated via the device
+        index, followed by the status of their groups.
+        """
+        changed = self._status_changed(success, reply)
+        if changed:
+            self._poll_interval = MIN_POLL_INTERVAL
+        else:
+            self._poll_interval = min(2 * self._poll_interval,
+                                      MAX_POLL_INTERVAL)
+        self._schedule_poll()
+
+    def _status_changed(self, success, reply):
+        """Apply the changes of a status reply
+
+        :returns: True if the status of any device changed
         """
         if not success:
-            return
+            return False
 
         payload = reply.get("payload", None)
         if not payload:
-            return
+            return False
+
+        # A status revision, if provided, tells that nothing changed
+        revision = payload.get("revision", None)
+        if revision is not None and revision == self._status_revision:
+            return False
+        self._status_revision = revision
 
         status = payload.get("status", None)
         if not status:
+            return False
+
+        # The reply might hold all devices or only the changed ones
+        changed = False
+        changed_groups = set()
+        previous_status = self._previous_status
+        for deviceId, entry, _ in status.iterall():
+            if previous_status.get(deviceId) == entry:
+                continue
+            # we keep track of status request so we only update changes
+            previous_status[deviceId] = entry
+            changed = True
+            if self._set_device_status(deviceId, entry):
+                changed_groups.add(self._device_groups.get(deviceId))
+
+        # now sort out the status of the affected groups
+        for node in changed_groups:
+            self._update_group_status(node)
+        if changed_groups:
+            # resize that status field is large enough
+            self._treeview.resizeColumnToContents(find_column_index("status"))
+
+        return changed
+
+    def _set_device_status(self, device_id, entry):
+        """Show a status entry on the status item of a device
+
+        The status color is counted for the group of the device.
+
+        :returns: True if the device is known and the entry could be
+                  interpreted
+        """
+        sitem = self._device_refs.get(device_id, None)
+        if sitem is None:
+            return False
+        symbol, color, context = get_status_symbol(entry)
+        if not symbol:
+            return False
+        sitem.setText(symbol)
+        sitem.setBackground(color)
+        if context is not None:
+            sitem.setToolTip(context)
+        else:
+            sitem.setToolTip("status")
+
+        counter = self._group_counters.get(self._device_groups.get(device_id))
+        if counter is not None:
+            counter.set_color(self._device_colors.get(device_id), color)
+        self._device_colors[device_id] = color
+        return True
+
+    def _update_group_status(self, node):
+        """Set the group status color to the most important device color"""
+        counter = self._group_counters.get(node)
+        set_group = self._device_refs.get(node)
+        if counter is None or set_group is None:
             return
+        group_color = counter.color()
+        if group_color:
+            set_group.setBackground(group_color)
 
-        new_status = {}
+    # ----------------------------------------------------------------
+    # Polling
 
-        for deviceId, entry, _ in status.iterall():
-            new_status[deviceId] = entry
-            sitem = self._device_refs.get(deviceId, None)
-            if sitem:
-                # nothing to do for init except update the status
-                symbol = None
-                color = None
-                context = None
-                if entry == "INIT":
-                    symbol, color = (STATUS_SYMBOL["INIT"])
-                else:
-                    typ, detail = entry.split(":", 1)
-                    if typ == "OK":
-                        symb = STATUS_SYMBOL.get(detail.upper(), ("?", "red"))
-                        symbol, color = symb
-                    elif typ == "ERR":
-                        symbol, color = STATUS_SYMBOL["ERROR"]
-                        context = detail
-                    elif typ == "DONE":
-                        symbol, color = STATUS_SYMBOL["DONE"]
-                        symbol += f" {detail}"  # is a state
-                    elif typ == "FAILED":
-                        symbol, color = STATUS_SYMBOL["ERROR"]
-                        state, context = detail.split(":", 1)
-                        context = context.split("exception=")[-1]
-                        symbol += f" {state}"
-
-                if symbol:
-                    sitem.setText(symbol)
-                    sitem.setBackground(color)
-                    if context is not None:
-                        sitem.setToolTip(context)
-                    else:
-                        sitem.setToolTip("status")
-
-        # now sort out the group status
-        col = find_column_index("status")
-        for i in range(self._item_model.rowCount(QModelIndex())):
-            group = self._item_model.item(i)
-            set_group = self._item_model.item(i, col)
-            # we go by color
-            colors = []
-            for j in range(group.rowCount()):
-                item = group.child(j, col)
-                colors.append(item.background())
-            group_color = None
-            for _, color in reversed(STATUS_SYMBOL.values()):
-                if color in colors:
-                    group_color = color
-                    break
-            if group_color:
-                set_group.setBackground(group_color)
-
-        # resize that status field is large enough
-        self._treeview.resizeColumnToContents(col)
-
-        # we keep track of status request so we only update changes
-        self._previous_status = new_status
+    def _start_polling(self):
+        self._polling = True
+        self._poll_interval = MIN_POLL_INTERVAL
+        self._schedule_poll()
+
+    def _stop_polling(self):
+        self._polling = False
+        self._timer.stop()
+
+    def _schedule_poll(self):
+        """Schedule the next status request while polling and visible"""
+        if self.widget is None or self._timer is None:
+            return
+        if self._polling and self.widget.isVisible():
+            self._timer.start(self._poll_interval)
+
+    def _visibility_changed(self, visible):
+        if not visible:
+            # pause polling while hidden
+            self._timer.stop()
+        elif self._polling:
+            self._poll_interval = MIN_POLL_INTERVAL
+            self._request_status()
 
     def _toggle_checkboxes_editable(self, toggle):
+        # enabling items does not change the selection
+        is_updating, self._is_updating = self._is_updating, True
+        try:
+            self._set_checkboxes_enabled(toggle)
+        finally:
+            self._is_updating = is_updating
+
+    def _set_checkboxes_enabled(self, toggle):
         for i in range(self._item_model.rowCount(QModelIndex())):
             group = self._item_model.item(i)
             fa_col = find_column_index("do_final_action")
@@ -468,9 +677,9 @@ class StateAwareComponentManager(BaseBindingController):
             self._toggle_overlay(False)
 
         if state == State.CHANGING:
-            self._timer.start()
+            self._start_polling()
         else:
-            self._timer.stop()
+            self._stop_polling()
         # request once to catch any updates outside the timer
         self._request_status()
 
@@ -567,6 +776,9 @@ class StateAwareComponentManager(BaseBindingController):
             item = QStandardItem("")
             group_items.append(item)
             self._device_refs[node] = item
+            self._group_items[node] = group_items[0]
+            self._group_counters[node] = GroupCounter()
+            group_items[0].setData(node, NODE_ROLE)
             # set colors depending on whether a State change will happen
             for item in group_items:
                 if behaviour == "KeepState":
@@ -593,7 +805,12 @@ class StateAwareComponentManager(BaseBindingController):
         # Since we are about to reset our model, we store the expanded state
         # of the widget for comfort
         self.save_expanded()
-        # Clear self._item_model before updating
+        # Clear self._item_model and the item index before updating
+        self._device_refs = {}
+        self._device_groups = {}
+        self._group_items = {}
+        self._group_counters = {}
+        self._device_colors = {}
         self._item_model.clear()
         self._item_model.setHorizontalHeaderLabels(LABEL_MAPPING.keys())
 
@@ -646,18 +863,31 @@ class StateAwareComponentManager(BaseBindingController):
         if self._is_updating:
             return
 
-        # status updates are ignored:
-        if item in self._device_refs.values():
+        # only check state changes are handled, status updates are ignored
+        if item.column() == 0:
+            which = "device"
+        elif item.column() == find_column_index("do_final_action"):
+            which = "do_final"
+        else:
             return
 
         try:
             self._is_editing = True
             self._is_updating = True
-            is_toplevel = item.parent() is None
-            if item.column() == 0:
-                self._evaluate_tristates(is_toplevel, which="device")
+            parent = item.parent()
+            if parent is None:
+                # a group is changed, all its children follow. A partial
+                # state is only derived from the children.
+                state = item.checkState()
+                if state == Qt.PartiallyChecked:
+                    return
+                group = self._item_model.item(item.row(), 0)
+                self._set_group_checked(group, which, state == Qt.Checked)
             else:
-                self._evaluate_tristates(is_toplevel, which="do_final")
+                node = parent.data(NODE_ROLE)
+                counter = self._group_counters.get(node)
+                self._count_check_state(item, which, counter)
+                self._update_group_check_state(node, which)
             self._selection_proxy.edit_value = self._build_value()
             send_property_changes([self._selection_proxy])
 
@@ -673,41 +903,48 @@ class StateAwareComponentManager(BaseBindingController):
 
         self._expanded = not self._expanded
 
-    def _evaluate_tristates(self, is_toplevel, which="device"):
-        """
-        Evaluates the tri-state level along the hierarchy.
-
-        :param is_toplevel: set to true if top-level elements are changed
-        """
-        # we need the checked devices, not the checked groups
-        # so we go to the second tree level
-        for i in range(self._item_model.rowCount(QModelIndex())):
-            group = self._item_model.item(i)
-            if which == "device":
-                set_group = group
-                col = 0
-            else:
-                col = find_column_index("do_final_action")
-                set_group = self._item_model.item(i, col)
+    def _check_column(self, which):
+        return 0 if which == "device" else find_column_index("do_final_action")
 
-            # if its a top-level change we evaluate all children, but
-            # leave the group untouched
-            if is_toplevel:
-                for j in range(group.rowCount()):
-                    item = group.child(j, col)
-                    item.setCheckState(set_group.checkState())
-            else:
-                # we set the group check-state to the child check-states
-                checked = []
-                for j in range(group.rowCount()):
-                    item = group.child(j, col)
-                    checked.append(item.checkState() == Qt.Checked)
-                if all(checked):
-                    set_group.setCheckState(Qt.Checked)
-                elif any(checked):
-                    set_group.setCheckState(Qt.PartiallyChecked)
-                else:
-                    set_group.setCheckState(Qt.Unchecked)
+    def _count_check_state(self, item, which, counter):
+        """Count the check state change of a device item for its group"""
+        checked = item.checkState() == Qt.Checked
+        if checked == bool(item.data(CHECKED_ROLE)):
+            return
+        item.setData(checked, CHECKED_ROLE)
+        if counter is not None:
+            counter.set_checked(which, checked)
+
+    def _set_group_checked(self, group, which, checked):
+        """Check or uncheck all children of a group"""
+        col = self._check_column(which)
+        state = Qt.Checked if checked else Qt.Unchecked
+        for j in range(group.rowCount()):
+            item = group.child(j, col)
+            if item is None:
+                continue
+            item.setCheckState(state)
+            item.setData(checked, CHECKED_ROLE)
+        node = group.data(NODE_ROLE)
+        counter = self._group_counters.get(node)
+        if counter is not None:
+            counter.set_all_checked(which, checked)
+        self._update_group_check_state(node, which)
+
+    def _update_group_check_state(self, node, which):
+        """Set the group check state from the counters of its children"""
+        group = self._group_items.get(node)
+        counter = self._group_counters.get(node)
+        if group is None or counter is None:
+            return
+        if which == "device":
+            set_group = group
+        else:
+            set_group = self._item_model.item(
+                group.row(), self._check_column(which))
+        state = counter.check_state(which)
+        if set_group.checkState() != state:
+            set_group.setCheckState(state)
 
     def _build_value(self):
         """
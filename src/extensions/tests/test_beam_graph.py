@@ -1,6 +1,6 @@
 import numpy as np
 
-from extensions.display_beam_graph import BeamGraph
+from extensions.display_beam_graph import BeamGraph, estimate_beam_moments
 from extensions.utils import reflect_angle
 from karabo.native import (
     Configurable, Double, EncodingType, Hash, Image, ImageData, Node, String,
@@ -136,6 +136,24 @@ class TestBeamGraph(GuiTestCase):
         self.assertEqual(crosshair.angle(), 180)  # reflected
         self.assertFalse(crosshair.isVisible())
 
+    def test_client_fit(self):
+        self.controller.model.client_fit = True
+        result = {"center": (120, 80), "widths": (40, 20), "angle": 30}
+        self.controller._fit_finished(result)
+
+        ellipse = self.controller._ellipse
+        self.assertEqual(ellipse.position, (120, 80))
+        self.assertEqual(ellipse.size, (40, 20))
+        self.assertEqual(ellipse.angle, 30)
+        self.assertTrue(ellipse.is_visible)
+
+        # Results arriving after disabling are discarded
+        self.controller.model.client_fit = False
+        self.controller._fit_finished({"center": (10, 10),
+                                       "widths": (5, 5),
+                                       "angle": 0})
+        self.assertEqual(ellipse.position, (120, 80))
+
     # ---------------------------------------------------------------------
     # Helpers
 
@@ -150,3 +168,25 @@ class TestBeamGraph(GuiTestCase):
     @property
     def widget(self):
         return self.controller.widget
+
+
+def test_estimate_beam_moments():
+    y, x = np.mgrid[0:400, 0:500] + 0.5
+    theta = np.deg2rad(30)
+    u = (x - 200) * np.cos(theta) + (y - 150) * np.sin(theta)
+    v = -(x - 200) * np.sin(theta) + (y - 150) * np.cos(theta)
+    image = 1000 * np.exp(-u ** 2 / (2 * 20 ** 2) - v ** 2 / (2 * 10 ** 2))
+
+    result = estimate_beam_moments(image, threshold=0.0)
+    np.testing.assert_allclose(result["center"], (200, 150))
+    # D4-sigma widths
+    np.testing.assert_allclose(result["widths"], (80, 40))
+    np.testing.assert_allclose(result["angle"], 30)
+
+    # Binning and thresholding keep the centroid and orientation
+    result = estimate_beam_moments(image, threshold=0.05, binning=2)
+    np.testing.assert_allclose(result["center"], (200, 150))
+    np.testing.assert_allclose(result["angle"], 30, atol=0.1)
+
+    assert estimate_beam_moments(np.zeros((10, 10))) is None
+    assert estimate_beam_moments(np.ones(10)) is None
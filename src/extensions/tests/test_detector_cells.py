@@ -3,7 +3,7 @@ from qtpy.QtCore import Qt
 
 from karabo.common.api import State
 from karabo.native import (
-    AccessMode, Configurable, Hash, NDArray, Node, String, UInt16,
+    AccessMode, Configurable, Hash, NDArray, Node, String, Timestamp, UInt16,
     VectorUInt16)
 from karabogui.testing import (
     GuiTestCase, get_class_property_proxy, set_proxy_hash)
@@ -191,6 +191,39 @@ class BaseTestCase:
             self.assertEqual(cell.pen(), CellStyle.UNUSED.pen)
             self.assertEqual(cell.brush(), CellStyle.UNUSED.brush)
 
+        def test_accumulation(self):
+            self.assertIsNone(self.widget.occupancy)
+            self.assertFalse(self.widget.heatmap.isVisible())
+
+            self.widget.set_accumulation('window', 2)
+            self.assertTrue(self.widget.heatmap.isVisible())
+            self.set_sample_data()
+            fraction = self.widget.occupancy_fraction
+            self.assertEqual(fraction[0], 0)
+            self.assertEqual(fraction[1], 1)
+            self.assertFalse(self.widget.heatmap.pixmap().isNull())
+
+            # A shutter update does not accumulate
+            set_proxy_hash(self.state_proxy, Hash('shutterState', 'CLOSED'))
+            self.assertEqual(self.widget.occupancy_fraction[1], 1)
+
+            # The window forgets the oldest trains
+            self.set_dark_data()
+            self.assertEqual(self.widget.occupancy_fraction[1], 0.5)
+            self.set_dark_data()
+            self.assertEqual(self.widget.occupancy_fraction[1], 0)
+
+            self.widget.set_accumulation('decay', 4)
+            self.set_sample_data()
+            self.set_dark_data()
+            fraction = self.widget.occupancy_fraction
+            self.assertAlmostEqual(fraction[1], 0.75 / 1.75)
+
+            # The accumulation is reset with the shape
+            self.widget.set_cells(40, 20)
+            self.assertIsNone(self.widget.occupancy_fraction)
+            self.assertEqual(len(self.widget.occupancy), 800)
+
         @property
         def model(self):
             return self.controller.model
@@ -213,6 +246,11 @@ class TestOldDetectorCells(BaseTestCase.DetectorCellsWidget):
 
         return nfrm, npulse_per_frame
 
+    def set_dark_data(self):
+        nfrm = 202
+        self.set_values(nFrame=nfrm,
+                        nPulsePerFrame=np.zeros(nfrm, dtype=np.uint16))
+
 
 class TestNewDetectorCells(BaseTestCase.DetectorCellsWidget):
 
@@ -230,3 +268,42 @@ class TestNewDetectorCells(BaseTestCase.DetectorCellsWidget):
                         nPulsePerFrame=ndarray_hsh)
 
         return nfrm, npulse_per_frame[self.controller._index]
+
+    def set_dark_data(self):
+        npulse_per_frame = np.zeros((5, 202), dtype=np.uint16)
+        self.set_values(nPulsePerFrame=get_ndarray_hash_from_data(
+            npulse_per_frame, Timestamp()))
+
+    def test_union(self):
+        num_pattern, nfrm = 3, 20
+        npulse_per_frame = np.zeros((num_pattern, nfrm), dtype=np.uint16)
+        npulse_per_frame[0, 1] = 1
+        npulse_per_frame[1, 5] = 2
+        self.set_values(
+            numberOfPatterns=num_pattern,
+            nPulsePerFrame=get_ndarray_hash_from_data(npulse_per_frame))
+
+        self.widget.button.setChecked(True)
+        expected = np.ones(nfrm, dtype=np.uint16)
+        expected[[1, 5]] = 2
+        np.testing.assert_array_equal(
+            self.widget.cell_style_codes, expected)
+        self.assertEqual(self.widget.nlit_legend.toPlainText(), "LIT:    2")
+
+        # Change a single pattern, the union is updated incrementally
+        npulse_per_frame[1, 5] = 0
+        npulse_per_frame[2, 7] = 1
+        self.set_values(
+            nPulsePerFrame=get_ndarray_hash_from_data(
+                npulse_per_frame, Timestamp()))
+        np.testing.assert_array_equal(
+            self.controller._lit_count, (npulse_per_frame != 0).sum(axis=0))
+        expected = np.ones(nfrm, dtype=np.uint16)
+        expected[[1, 7]] = 2
+        np.testing.assert_array_equal(
+            self.widget.cell_style_codes, expected)
+
+        # Toggle back to the selected pattern
+        self.widget.button.setChecked(False)
+        np.testing.assert_array_equal(
+            self.widget.cell_style_codes, npulse_per_frame[0] + 1)
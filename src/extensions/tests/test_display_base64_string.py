@@ -2,11 +2,13 @@ from base64 import b64encode
 from pathlib import Path
 
 import pytest
-from qtpy.QtCore import QPoint, QRectF, Qt
-from qtpy.QtGui import QPixmap
+from qtpy.QtCore import QBuffer, QIODevice, QPoint, QRectF, Qt
+from qtpy.QtGui import QImage, QPixmap
 from qtpy.QtTest import QTest
 
 from extensions.display_base64_string import DisplayBase64Image, MouseMode
+from extensions.tests.utils import wait_for_worker
+from extensions.utils import SYNC_DECODE_LIMIT
 from karabo.native import Configurable, String
 from karabogui import icons
 from karabogui.testing import get_class_property_proxy, set_proxy_value
@@ -67,6 +69,67 @@ def test_set_value(controller_widget):
     assert (pixmap_image == pixmap.toImage())
 
 
+def test_decode_in_background(controller_widget, gui_app):
+    proxy = controller_widget.proxy
+    image = QImage(*IMAGE_SIZE, QImage.Format_RGB32)
+    image.fill(Qt.red)
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    # Uncompressed to exceed the synchronous decoding limit
+    image.save(buffer, "BMP")
+    image_string = b64encode(bytes(buffer.data())).decode()
+    assert len(image_string) > SYNC_DECODE_LIMIT
+
+    set_proxy_value(proxy, "base64String",
+                    f"data:image/bmp;base64,{image_string}")
+    wait_for_worker(controller_widget._decoder, gui_app)
+    view = controller_widget.widget.view
+    # The image is decoded matching the viewport
+    pixmap = view.pixmap_item.pixmap()
+    target = controller_widget._target_size()
+    level_size = image.size().scaled(target, Qt.KeepAspectRatio).boundedTo(
+        image.size())
+    assert pixmap.size() == level_size
+    assert view.image_rect() == QRectF(image.rect())
+    assert pixmap.toImage().pixel(10, 10) == image.pixel(10, 10)
+
+    # Same content is not decoded again
+    digest = controller_widget._digest
+    set_proxy_value(proxy, "base64String",
+                    f"data:image/bmp;base64,{image_string}")
+    assert not controller_widget._decoder.busy
+    assert controller_widget._digest == digest
+
+
+def test_decode_zoomed_tile(controller_widget, gui_app):
+    proxy = controller_widget.proxy
+    image = QImage(2048, 2048, QImage.Format_RGB32)
+    image.fill(Qt.blue)
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "BMP")
+    image_string = b64encode(bytes(buffer.data())).decode()
+    set_proxy_value(proxy, "base64String",
+                    f"data:image/bmp;base64,{image_string}")
+    wait_for_worker(controller_widget._decoder, gui_app)
+
+    widget = controller_widget.widget
+    assert widget.view.pixmap_item.pixmap().width() < image.width()
+    assert widget.view.tile_item.pixmap().isNull()
+
+    # Zoom into a region, a tile is decoded and cached
+    widget.view.scene.setSceneRect(QRectF(1000, 1000, 512, 512))
+    widget.viewChanged.emit()
+    wait_for_worker(controller_widget._decoder, gui_app)
+    assert not widget.view.tile_item.pixmap().isNull()
+    assert len(controller_widget._tiles) == 1
+
+    # Zooming out hides the tile again
+    widget.zoom_out()
+    assert widget.view.tile_item.pixmap().isNull()
+    assert len(controller_widget._tiles) == 1
+
+
 def test_on_mouse_zoom(controller_widget):
     """Test the on_mouse_move method."""
 
@@ -1,7 +1,8 @@
-from time import sleep
+from time import sleep, time
 
 from extensions.display_live_data_indicator import (
-    THUMBS_DOWN, THUMBS_UP, LiveDataIndicator)
+    THUMBS_DOWN, THUMBS_UP, IndicatorWidget, LiveDataIndicator,
+    StalenessMonitor, get_svg_renderer)
 from extensions.models.api import LiveDataIndicatorModel
 from karabo.native import Configurable, Int32, Timestamp
 from karabogui.binding.api import DeviceProxy, PropertyProxy, build_binding
@@ -38,3 +39,50 @@ def test_icon_update(gui_app: gui_app, mocker):
     controller.value_update(proxy)
     assert mock_load.call_count == 1
     mock_load.assert_called_with(THUMBS_DOWN)
+
+
+class Indicator:
+    def __init__(self):
+        self.stale = 0
+
+    def data_stale(self):
+        self.stale += 1
+
+
+def test_staleness_monitor(gui_app: gui_app):
+    monitor = StalenessMonitor()
+    first, second, third = Indicator(), Indicator(), Indicator()
+
+    now = time()
+    monitor.schedule(first, now - 1)
+    monitor.schedule(second, now + 100)
+    monitor.schedule(third, now - 1)
+    # Moving a deadline does not add heap entries
+    for _ in range(10):
+        monitor.schedule(second, now + 200)
+    monitor.cancel(third)
+    assert len(monitor) == 2
+    assert len(monitor._heap) == 3
+    assert monitor._timer.isActive()
+
+    monitor._expire()
+    assert first.stale == 1
+    assert second.stale == 0
+    assert third.stale == 0
+    assert len(monitor) == 1
+    assert len(monitor._heap) == 1
+
+    # An earlier deadline is queued again
+    monitor.schedule(second, now - 1)
+    monitor._expire()
+    assert second.stale == 1
+    assert len(monitor) == 0
+    assert not monitor._timer.isActive()
+
+
+def test_shared_renderer(gui_app: gui_app):
+    first = IndicatorWidget(THUMBS_UP)
+    second = IndicatorWidget(THUMBS_DOWN)
+    second.load(THUMBS_UP)
+    assert first._renderer is second._renderer
+    assert get_svg_renderer(THUMBS_UP).isValid()
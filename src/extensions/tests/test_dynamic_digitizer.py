@@ -0,0 +1,69 @@
+import numpy as np
+
+from extensions.display_dynamic_digitizer import (
+    TraceAccumulator, get_threshold_crossings)
+
+
+def test_accumulation_mean():
+    traces = np.random.rand(25, 8)
+    accumulator = TraceAccumulator("mean", 4)
+    for trace in traces:
+        average, lower, upper = accumulator.add(trace)
+    np.testing.assert_allclose(average, traces[-4:].mean(axis=0))
+    assert lower is None and upper is None
+
+    # A new trace length restarts the accumulation
+    average, _, _ = accumulator.add(np.ones(3))
+    np.testing.assert_array_equal(average, np.ones(3))
+    assert accumulator.count == 1
+
+
+def test_accumulation_exponential():
+    accumulator = TraceAccumulator("exponential", 2)
+    accumulator.add(np.zeros(3))
+    average, _, _ = accumulator.add(np.full(3, 4.))
+    np.testing.assert_array_equal(average, [2., 2., 2.])
+
+
+def test_accumulation_exponential_nan():
+    accumulator = TraceAccumulator("exponential", 2)
+    accumulator.add([np.nan, 0., 0.])
+    average, _, _ = accumulator.add([4., np.nan, 4.])
+    np.testing.assert_array_equal(average, [4., 0., 2.])
+    average, _, _ = accumulator.add([0., 4., np.inf])
+    np.testing.assert_array_equal(average, [2., 2., 2.])
+
+
+def test_accumulation_envelope():
+    traces = np.random.rand(10, 8)
+    accumulator = TraceAccumulator("envelope", 4)
+    for trace in traces:
+        latest, lower, upper = accumulator.add(trace)
+    # Only the last traces are enveloped
+    np.testing.assert_array_equal(latest, traces[-1])
+    np.testing.assert_array_equal(lower, traces[-4:].min(axis=0))
+    np.testing.assert_array_equal(upper, traces[-4:].max(axis=0))
+
+    accumulator.clear()
+    _, lower, upper = accumulator.add(traces[0])
+    np.testing.assert_array_equal(lower, traces[0])
+
+
+def test_accumulation_envelope_window():
+    # Extrema leaving the window are replaced by those of the window
+    traces = np.array([[5., -5.], [1., 0.], [2., np.nan], [0., 1.]])
+    accumulator = TraceAccumulator("envelope", 2)
+    expected = [([5., -5.], [5., -5.]), ([1., -5.], [5., 0.]),
+                ([1., 0.], [2., 0.]), ([0., 1.], [2., 1.])]
+    for trace, (lower_exp, upper_exp) in zip(traces, expected):
+        _, lower, upper = accumulator.add(trace)
+        np.testing.assert_array_equal(lower, lower_exp)
+        np.testing.assert_array_equal(upper, upper_exp)
+
+
+def test_threshold_crossings():
+    x = np.arange(6.)
+    y = np.array([0., 2., 0., 3., 3., 0.])
+    crossings_x, crossings_y = get_threshold_crossings(x, y, 1.)
+    np.testing.assert_array_equal(crossings_x, [1., 3.])
+    np.testing.assert_array_equal(crossings_y, [2., 3.])
@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
 
-from extensions.display_dynamic_graph import DisplayDynamicGraph
+from extensions.display_dynamic_graph import (
+    DensityHistogram, DisplayDynamicGraph)
 from extensions.models.plots import DynamicGraphModel
 from karabo.native import AccessMode, Configurable, VectorDouble
 from karabogui.testing import get_class_property_proxy, set_proxy_value
@@ -26,12 +28,36 @@ def controller_widget(gui_app):
 
 def test_set_value(controller_widget):
     proxy = controller_widget.proxy
-    assert len(controller_widget.curves) == 10
-    curve = controller_widget.curves[0]
+    history = controller_widget._history
+    assert history.capacity == 9
+    curve = controller_widget._curve
     assert curve is not None
     value = [2, 4, 6]
     set_proxy_value(proxy, "prop", value)
     assert list(curve.yData) == value
+    assert len(history) == 0
+
+    # The previous traces move to the history item
+    for index in range(12):
+        set_proxy_value(proxy, "prop", [index, index + 1, index + 2])
+    assert list(curve.yData) == [11, 12, 13]
+    assert len(history) == 9
+    traces = history.traces()
+    np.testing.assert_array_equal(traces[0], [2, 3, 4])
+    np.testing.assert_array_equal(traces[-1], [10, 11, 12])
+    assert history.boundingRect().top() == 2
+    assert history.boundingRect().bottom() == 12
+
+    # A trace without finite samples is not added to the history
+    set_proxy_value(proxy, "prop", [np.nan, np.nan, np.nan])
+    set_proxy_value(proxy, "prop", [1, 2, 3])
+    assert len(history) == 9
+    assert history.boundingRect().top() == 3
+
+    # A different length restarts the history
+    set_proxy_value(proxy, "prop", [1, 2])
+    set_proxy_value(proxy, "prop", [1, 3])
+    assert len(history) == 1
 
 
 def test_actions(controller_widget, mocker):
@@ -47,12 +73,59 @@ def test_actions(controller_widget, mocker):
             break
     assert action is not None
     assert controller.model.number == 10
-    assert len(controller.curves) == 10
+    assert controller._history.capacity == 9
     dsym = 'extensions.display_dynamic_graph.QInputDialog'
     QInputDialog = mocker.patch(dsym)
     QInputDialog.getInt.return_value = 12, True
     action.trigger()
     assert controller.model.number == 12
-    assert len(controller.curves) == 12
+    assert controller._history.capacity == 11
 
     controller.destroy()
+
+
+def test_density_mode(controller_widget):
+    controller = controller_widget
+    proxy = controller.proxy
+    assert controller._density is None
+
+    controller._toggle_density(True)
+    assert controller.model.density
+    assert not controller._curve.isVisible()
+    assert not controller._history.isVisible()
+
+    set_proxy_value(proxy, "prop", [1.0, 2.0, 3.0])
+    set_proxy_value(proxy, "prop", [1.0, 2.0, 3.0])
+    image = controller._density_item.image
+    assert image.shape == (3, controller.model.y_bins)
+    assert image.sum() == pytest.approx(3 * (1 + controller.model.decay))
+    assert len(controller._history) == 0
+
+    controller._toggle_density(False)
+    assert controller._density is None
+    assert controller._curve.isVisible()
+
+
+def test_density_histogram():
+    histogram = DensityHistogram(y_bins=10, decay=0.5)
+    x = np.arange(5.0)
+    image = histogram.add(x, x)
+    assert image.shape == (5, 10)
+    np.testing.assert_array_equal(np.argwhere(image)[:, 0], np.arange(5))
+
+    image = histogram.add(x, x)
+    assert image.sum() == pytest.approx(7.5)
+
+    # A trace outside of the y range widens it and keeps the histogram
+    image = histogram.add(x, x + 100)
+    assert image.sum() == pytest.approx(8.75)
+    low, high = histogram._y_range
+    assert low < 0 and high > 104
+
+
+def test_density_histogram_small_amplitude():
+    histogram = DensityHistogram(y_bins=10)
+    x = np.arange(5.0)
+    image = histogram.add(x, x * 1e-3)
+    # The samples are spread over the rows
+    assert np.unique(np.argwhere(image)[:, 1]).size == 5
@@ -407,6 +407,33 @@ class TestTableVectorXYGraph(BaseTableVectorXYGraphTest):
         assert_array_equal(first.xData, [0, 1, 2, 3, 4])
         assert_array_equal(first.yData, [5, 6, 7, 8, 9])
 
+    def test_reconcile_items(self):
+        self.set_table(first=np.array([[0, 1, 2], [3, 4, 5]]),
+                       second=np.array([[6, 7], [8, 9]]))
+        first = self.controller._curves['first']
+        second = self.controller._curves['second']
+        pen = first.opts['pen']
+
+        # Unchanged labels keep their items, style and legend entry
+        self.set_table(first=np.array([[0, 1], [2, 3]]),
+                       third=np.array([[4, 5], [6, 7]]))
+        assert self.controller._curves['first'] is first
+        assert first.opts['pen'] is pen
+        assert_array_equal(first.yData, [2, 3])
+
+        plotItem = self.controller.widget.plotItem
+        assert second not in plotItem.listDataItems()
+        legends = [label.text for _, label in plotItem.legend.items]
+        assert legends == ['first', 'third']
+
+    def test_duplicated_labels(self):
+        table = [Hash('label', 'curve', 'x', np.arange(3), 'y', np.ones(3)),
+                 Hash('label', 'curve', 'x', np.arange(4), 'y', np.ones(4))]
+        set_proxy_value(self.prop_proxy, 'prop', table)
+        curves = self.controller._curves
+        assert list(curves) == ['curve', 'curve (Conflict)']
+        assert curves['curve (Conflict)'].name() == 'curve'
+
     def test_configure_data(self):
         self.set_table(first=np.array([[0, 1, 2, 3, 4],
                                        [5, 6, 7, 8, 9]]),
@@ -3,6 +3,9 @@ from enum import Enum
 from time import sleep
 from unittest import skip
 
+from qtpy.QtCore import QPointF
+from qtpy.QtWidgets import QGraphicsScene
+
 from karabo.native import (
     AccessMode, Configurable, Float, Hash, MetricPrefix, String, Unit,
     VectorHash)
@@ -10,6 +13,7 @@ from karabogui.testing import (
     GuiTestCase, get_class_property_proxy, set_proxy_hash)
 
 from ..display_networkx import NetworkX
+from ..models.api import NodePosition
 
 
 class ConnectionType(Enum):
@@ -149,6 +153,147 @@ class TestNetworkX(GuiTestCase):
             self.assertTrue(node_found)
             self.assertTrue(edge_found)
 
+    def test_incremental_update(self):
+        data = _create_values()
+        set_proxy_hash(self.proxy, Hash('nodes', data, ))
+        graph = self.controller.graphwidget
+        graph.freeze(True)
+        positions = {label: graph.nodes[label].pos()
+                     for label in graph.nodes}
+        items = {label: graph.nodes[label] for label in graph.nodes}
+
+        # Drop half of the connections, change states and add a node
+        rows = data[:500]
+        for row in rows[:10]:
+            row["status"] = ConnectionStatus.UNCLEAR.value
+        new_row = Hash()
+        for key in rows[1]:
+            new_row[key] = rows[1][key]
+        new_row["originNode"] = "NEW/DEVICE/1"
+        rows.append(new_row)
+        set_proxy_hash(self.proxy, Hash('nodes', rows, ))
+
+        remaining = set()
+        statuses = {}
+        for row in rows:
+            remaining.add(row["originNode"])
+            remaining.add(row["destinationNode"])
+            statuses[(row["originNode"], row["destinationNode"])] = (
+                row["status"])
+        self.assertEqual(set(graph.nodes), remaining)
+        num_edges = sum(len(dest) for dest in graph.edges.values())
+        self.assertEqual(num_edges, len(statuses))
+        for (source, dest), status in statuses.items():
+            self.assertEqual(graph.edges[source][dest].status, status)
+
+        # Surviving nodes are the same items at the same position
+        for label, node in graph.nodes.items():
+            if label == "NEW/DEVICE/1":
+                continue
+            self.assertIs(node, items[label])
+            self.assertEqual(node.pos(), positions[label])
+
+        # Only the new node is simulated
+        self.assertEqual(graph._moving, {graph.nodes["NEW/DEVICE/1"]})
+
+    def test_index_and_edge_layer(self):
+        data = _create_values()
+        set_proxy_hash(self.proxy, Hash('nodes', data, ))
+        graph = self.controller.graphwidget
+        scene = graph.scene()
+        # No index while simulating the layout
+        self.assertNotEqual(graph.timer_id, 0)
+        self.assertEqual(scene.itemIndexMethod(), QGraphicsScene.NoIndex)
+        graph.freeze(True)
+        self.assertEqual(graph.timer_id, 0)
+        self.assertEqual(scene.itemIndexMethod(),
+                         QGraphicsScene.BspTreeIndex)
+
+        # All edges are painted batched by status
+        layer = graph.edge_layer
+        layer.boundingRect()
+        statuses = {row["status"] for row in data}
+        self.assertTrue(set(layer._paths).issubset(statuses))
+        node = next(node for node in graph.nodes.values() if node.edge_list)
+        node.setPos(node.pos() + QPointF(100, 100))
+        self.assertIsNone(layer._paths)
+        layer.boundingRect()
+        self.assertIsNotNone(layer._paths)
+
+    def test_aggregation(self):
+        data = _create_values()
+        self.controller.on_aggregation("prefix")
+        self.assertEqual(self.controller.model.aggregation, "prefix")
+        set_proxy_hash(self.proxy, Hash('nodes', data, ))
+        graph = self.controller.graphwidget
+
+        devices = set()
+        for row in data:
+            devices.add(row["originNode"])
+            devices.add(row["destinationNode"])
+        aggregates = {f"FOO_BAR_FOO/{klass}/*"
+                      for klass in (MDL_CLASS, CAM_CLASS, DA_CLASS)}
+        self.assertEqual(set(graph.nodes), aggregates)
+        members = set()
+        for node in graph.nodes.values():
+            self.assertEqual(node.group, "aggregate")
+            members.update(node.members)
+        self.assertEqual(members, devices)
+        count = sum(edge.count for dest in graph.edges.values()
+                    for edge in dest.values())
+        self.assertEqual(count, len([row for row in data
+                                     if row["originNode"].split("/")[1]
+                                     != row["destinationNode"].split("/")[1]]))
+
+        # Expand a single aggregate, only its members are laid out
+        label = f"FOO_BAR_FOO/{CAM_CLASS}/*"
+        cam_members = set(graph.nodes[label].members)
+        self.controller.expand_aggregate(label)
+        self.assertNotIn(label, graph.nodes)
+        self.assertTrue(cam_members.issubset(graph.nodes))
+        self.assertEqual({node.label for node in graph._moving}, cam_members)
+
+        self.controller.on_collapse()
+        self.assertEqual(set(graph.nodes), aggregates)
+
+        self.controller.on_aggregation("none")
+        self.assertEqual(set(graph.nodes), devices)
+
+    def test_save_positions_batched(self):
+        model = self.controller.model
+        self.controller.save_node_positions({"A/B/C": [1.0, 2.0]})
+        self.controller.save_node_positions({"A/B/D": [3.0, 4.0]})
+        self.assertEqual(model.nodePositions, [])
+        self.assertTrue(self.controller._save_timer.isActive())
+
+        self.controller._save_timer.stop()
+        self.controller._save_positions()
+        positions = {p.device_id: (p.x, p.y) for p in model.nodePositions}
+        self.assertEqual(positions, {"A/B/C": (1.0, 2.0),
+                                     "A/B/D": (3.0, 4.0)})
+
+        # Unchanged positions do not modify the model
+        saved = model.nodePositions
+        self.controller.save_node_positions({"A/B/C": [1.0, 2.0]})
+        self.controller._save_positions()
+        self.assertIs(model.nodePositions, saved)
+
+    def test_save_positions_pruned(self):
+        model = self.controller.model
+        data = _create_values()
+        set_proxy_hash(self.proxy, Hash("nodes", data))
+        device_id = data[0]["originNode"]
+        model.nodePositions = [
+            NodePosition(device_id=device_id, x=1.0, y=2.0),
+            NodePosition(device_id="GONE/DEVICE/1", x=3.0, y=4.0)]
+
+        self.controller.save_node_positions({device_id: [5.0, 6.0]})
+        self.controller._save_timer.stop()
+        self.controller._save_positions()
+        positions = {p.device_id: (p.x, p.y) for p in model.nodePositions}
+        self.assertEqual(positions[device_id], (5.0, 6.0))
+        self.assertNotIn("GONE/DEVICE/1", positions)
+
     @skip(reason="Test fails sporadically. Redmine ticket #133166")
     def test_filters(self):
         data = _create_values()
@@ -2,7 +2,8 @@ import numpy as np
 from numpy.testing import assert_array_equal
 
 from extensions.peak_integration_graph import (
-    NUM_PEAKS, DisplayPeakIntegrationGraph)
+    NUM_PEAKS, DisplayPeakIntegrationGraph, get_peak_integrals,
+    get_window_sums)
 from extensions.utils import get_ndarray_hash_from_data
 from karabo.native import (
     Configurable, Hash, NDArray, Node, UInt16, VectorInt32, VectorUInt32)
@@ -152,3 +153,40 @@ class TestPeakIntegrationGraph(GuiTestCase):
         peak_x, peak_y = controller._peak_item.getData()
         assert_array_equal(peak_x, DEFAULT_VALUES['peakPositions'])
         assert_array_equal(peak_y, trace[DEFAULT_VALUES['peakPositions']])
+
+        # Check the integrals, the peaks sit on a slope of 2 per sample
+        assert_array_equal(controller._integrals, [2] + [9] * 9)
+        trend = controller._trend.view()
+        assert_array_equal(trend, [[2, 9]])
+
+        set_proxy_hash(self.trace_proxy,
+                       Hash('trace', get_ndarray_hash_from_data(trace * 2)))
+        trend = controller._trend.view()
+        assert_array_equal(trend, [[2, 9], [4, 18]])
+
+        controller._show_trend(True)
+        x, y = controller._trend_items[1].getData()
+        assert_array_equal(x, [0, 1])
+        assert_array_equal(y, [9, 18])
+
+        controller._reset_trend()
+        assert len(controller._trend) == 0
+
+
+def test_window_sums():
+    trace = np.arange(10, dtype=np.uint16)
+    starts = np.array([0, 2, 8, 12, 5])
+    stops = np.array([4, 6, 12, 14, 3])
+    # Overlapping, clipped, outside and empty windows
+    assert_array_equal(get_window_sums(trace, starts, stops),
+                       [6, 14, 17, 0, 0])
+
+
+def test_peak_integrals():
+    trace = np.ones(20)
+    trace[10] = 5
+    integrals = get_peak_integrals(trace, [10, 15], [-1, 1], [-4, -2])
+    assert_array_equal(integrals, [4, 0])
+    # Without a baseline the windows are summed
+    integrals = get_peak_integrals(trace, [10, 15], [-1, 1], [])
+    assert_array_equal(integrals, [7, 3])
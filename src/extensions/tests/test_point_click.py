@@ -1,3 +1,5 @@
+from qtpy.QtCore import QThreadPool
+
 from extensions.point_and_click import PointAndClick
 from karabo.native import (
     AccessMode, Configurable, Float, Hash, Node, VectorChar, VectorFloat)
@@ -42,3 +44,16 @@ class TestWidgetNode(GuiTestCase):
         self.assertEqual(self.controller.widget.image.pixel(1, 1), 0xff000000)
         self.assertEqual(self.controller.widget.crosses,
                          [(1, 4), (2, 5), (3, 6)])
+
+    def test_large_image(self):
+        # A large uncompressed image is decoded in the background
+        width = height = 400
+        header = f"P5 {width} {height} 255 ".encode()
+        image = header + bytes([128]) * (width * height)
+        set_proxy_hash(self.proxy, Hash('node.image', image,
+                                        'node.x', [], 'node.y', []))
+        while self.controller._decoder.busy:
+            QThreadPool.globalInstance().waitForDone()
+            self.process_qt_events()
+        self.assertEqual(self.controller.widget.image.width(), width)
+        self.assertEqual(self.controller.widget.image.height(), height)
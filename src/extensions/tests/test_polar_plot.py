@@ -43,3 +43,22 @@ def test_polar_plot(gui_app: gui_app):
                                                     "radius", radius)))
     # length of data has been changed
     assert len(controller._scatter_plot.points()) == num_points
+    assert len(controller._text_items) == num_points
+    x, y = controller._radial_lines.getData()
+    assert len(x) == 2 * num_points
+
+    # Fewer angles reuse the labels and hide the unused ones
+    num_points = 5
+    theta = np.arange(num_points)
+    radius = np.random.random(num_points)
+    set_proxy_hash(proxy, Hash("polarization", Hash("theta", theta,
+                                                    "radius", radius)))
+    assert len(controller._scatter_plot.points()) == num_points
+    assert len(controller._text_items) == 15
+    visible = [item.isVisible() for item in controller._text_items]
+    assert sum(visible) == num_points
+    x, y = controller._radial_lines.getData()
+    assert len(x) == 2 * num_points
+    max_radius = controller.model.max_ellipses_radius
+    np.testing.assert_allclose(np.hypot(x[1::2], y[1::2]), max_radius)
+    np.testing.assert_array_equal(x[::2], 0)
@@ -1,13 +1,17 @@
-from functools import reduce
+from unittest import mock
 
 import numpy as np
+from qtpy.QtCore import QPointF
 
-from karabo.native import AccessMode, Configurable, Hash, Node, VectorBool
+from karabo.native import (
+    AccessMode, Configurable, Hash, Node, Timestamp, VectorBool)
 from karabogui.testing import (
     GuiTestCase, get_class_property_proxy, set_proxy_hash)
 
 from ..display_pulse_info import (
-    BRUSH_EMPTY, BRUSH_FEL, PEN_DET, PEN_EMPTY, PulseIdMap, PulsePattern)
+    BLUE, DET_CODE, FEL_CODE, MATRIX_SCALE, OFFSET_H, OFFSET_V, PPL_CODE, SIDE,
+    STRIDE_H, STRIDE_V, YELLOW, DynamicPulseIdMap, PulseHistory, PulseIdMap,
+    PulsePattern, decode_pulse_pattern)
 
 
 class PINode(Configurable):
@@ -59,10 +63,9 @@ class TestWidgetNode(GuiTestCase):
         np.testing.assert_array_equal(self.controller.widget.det, det)
 
     def test_colors(self):
-        fel, ppl = self.controller.widget.pulses[0]
-        self.assertEqual(fel.pen(), PEN_EMPTY)
-        self.assertEqual(fel.brush(), BRUSH_EMPTY)
-        self.assertEqual(ppl.isVisible(), False)
+        pulses = self.controller.widget.pulses
+        self.assertEqual(len(pulses.childItems()), 0)
+        np.testing.assert_array_equal(pulses.codes, 0)
 
         self.proxy.value.fel.value = np.ones(2700, dtype=np.bool_)
         self.proxy.value.ppl.value = np.ones(2700, dtype=np.bool_)
@@ -70,10 +73,111 @@ class TestWidgetNode(GuiTestCase):
 
         self.controller.value_update(self.proxy)
 
-        fel, ppl = self.controller.widget.pulses[0]
-        self.assertEqual(fel.pen(), PEN_DET)
-        self.assertEqual(fel.brush(), BRUSH_FEL)
-        self.assertEqual(ppl.isVisible(), True)
+        np.testing.assert_array_equal(
+            pulses.codes, FEL_CODE | PPL_CODE | DET_CODE)
+        # The cells are rendered with the DET border and the PPL dot
+        image = pulses.image
+        center = SIDE * MATRIX_SCALE // 2
+        self.assertEqual(image.pixel(0, 0), BLUE.rgba())
+        self.assertEqual(image.pixel(center, center), BLUE.rgba())
+        self.assertEqual(image.pixel(4, 4), YELLOW.rgba())
+
+    def test_tooltip(self):
+        fel = np.zeros(2700, dtype=np.bool_)
+        fel[101] = True
+        set_proxy_hash(self.proxy, Hash('node.fel', fel))
+
+        pulses = self.controller.widget.pulses
+        pos = QPointF(OFFSET_H + STRIDE_H + 1, OFFSET_V + STRIDE_V + 1)
+        self.assertEqual(pulses.pulse_at(pos), 101)
+        self.assertIsNone(pulses.pulse_at(QPointF(0, 0)))
+        self.assertEqual(self.controller.widget.pulse_tooltip(101),
+                         'Pulse 101\nFEL: True\nPPL: False\nDET: False')
+
+    def test_history(self):
+        widget = self.controller.widget
+        self.assertIsNone(widget.history)
+        self.assertFalse(widget.waterfall.isVisible())
+
+        widget.show_history(True)
+        self.assertTrue(widget.waterfall.isVisible())
+        fel = np.zeros(2700, dtype=np.bool_)
+        fel[:2] = True
+        set_proxy_hash(self.proxy, Hash('node.fel', fel))
+        fel[1] = False
+        set_proxy_hash(self.proxy, Hash('node.fel', fel))
+
+        self.assertEqual(widget.history.filled, 2)
+        np.testing.assert_array_equal(
+            widget.history.fill_rates()[0, :3], [1, 0.5, 0])
+        self.assertFalse(widget.waterfall.pixmap().isNull())
+        self.assertIn('FEL 50.0%', widget.pulse_tooltip(1))
+
+        widget.show_history(False)
+        self.assertIsNone(widget.history)
+
+
+def test_pulse_history():
+    history = PulseHistory(size=3, num_pulses=5)
+    for pulse in range(5):
+        codes = np.zeros(5, dtype=np.uint8)
+        codes[pulse] = FEL_CODE | DET_CODE
+        history.add(codes)
+
+    # Only the last three trains are kept
+    assert history.filled == 3
+    np.testing.assert_array_equal(history.counts[0], [0, 0, 1, 1, 1])
+    np.testing.assert_array_equal(history.counts[1], 0)
+    np.testing.assert_array_equal(history.counts[2], [0, 0, 1, 1, 1])
+    np.testing.assert_allclose(history.fill_rates()[0, 4], 1 / 3)
+
+    latest = history.latest(2)
+    assert latest.shape == (2, 5)
+    assert latest[0, 4] == FEL_CODE | DET_CODE
+    assert latest[1, 3] == FEL_CODE | DET_CODE
+
+    history.clear()
+    assert history.filled == 0
+    assert history.latest(2).shape == (0, 5)
+
+
+class TestDynamicWidgetNode(GuiTestCase):
+    def setUp(self):
+        super().setUp()
+
+        schema = Object.getClassSchema()
+        self.proxy = get_class_property_proxy(schema, 'node')
+        self.controller = DynamicPulseIdMap(proxy=self.proxy)
+        self.controller.create(None)
+
+    def tearDown(self):
+        self.controller.destroy()
+        assert self.controller.widget is None
+
+    def test_matrix(self):
+        widget = self.controller.widget
+        fel = np.zeros(2700, dtype=np.bool_)
+        fel[FEL] = True
+        ppl = np.zeros(2700, dtype=np.bool_)
+        ppl[PPL] = True
+        set_proxy_hash(self.proxy, Hash('node.fel', fel, 'node.ppl', ppl,
+                                        'node.det', ppl))
+        pulses = widget.pulses
+        self.assertEqual(pulses.grid.shape, (31, 40))
+        self.assertEqual(pulses.codes[FEL[0]],
+                         FEL_CODE | PPL_CODE | DET_CODE)
+        self.assertEqual(pulses.codes[PPL[1]], PPL_CODE | DET_CODE)
+        self.assertEqual(widget.pulse_tooltip(PPL[1]),
+                         f'Pulse {PPL[1]}\nPPL: #2\nDET: #2')
+        self.assertEqual(widget.fel_legend.toPlainText(), f"FEL: {FEL.size}")
+
+        # A shifted grid of the same shape keeps the painted item
+        shifted = np.roll(fel, 40)
+        set_proxy_hash(self.proxy, Hash('node.fel', shifted,
+                                        'node.ppl', np.roll(ppl, 40),
+                                        'node.det', np.roll(ppl, 40)))
+        self.assertIs(widget.pulses, pulses)
+        self.assertEqual(pulses.grid.min(), 1200)
 
 
 # -----------------------------------------------------------------------------
@@ -96,48 +200,44 @@ def test_pulse_pattern():
         nonlocal grid_calls
         grid_calls += 1
 
-    diff_calls = 0
+    update_calls = 0
 
-    def diff_change():
-        nonlocal diff_calls
-        diff_calls += 1
+    def pattern_update():
+        nonlocal update_calls
+        update_calls += 1
 
     # Setup pattern controller and mocks
     pattern = PulsePattern()
     pattern.on_trait_change(grid_change, 'grid')
-    pattern.on_trait_change(diff_change, 'diff')
+    pattern.on_trait_change(pattern_update, 'pattern_updated')
 
     # --- First update: valid pulses
-    grid_calls, diff_calls = 0, 0
+    grid_calls, update_calls = 0, 0
     proxy = _create_proxy(fel=FEL, ppl=PPL, det=DET)
     pattern.set_node(proxy.value)
 
     grid = pattern.grid
     assert grid.shape == (31, 40)
     assert (grid.min(), grid.max()) == (1160, 2399)
-    np.testing.assert_array_equal(pattern.diff,
-                                  reduce(np.union1d, (FEL, PPL, DET)))
     assert grid_calls == 1
-    assert diff_calls == 1
+    assert update_calls == 1
+    np.testing.assert_array_equal(pattern.fel_index, FEL)
+    np.testing.assert_array_equal(pattern.ppl_index, PPL)
+    np.testing.assert_array_equal(pattern.det_index, DET)
 
     # --- Second update: valid pulses, but duplicate of the previous call
-    grid_calls, diff_calls = 0, 0
+    grid_calls, update_calls = 0, 0
     proxy = _create_proxy(fel=FEL, ppl=PPL, det=DET)
     pattern.set_node(proxy.value)
 
     grid = pattern.grid
     assert grid.shape == (31, 40)
     assert (grid.min(), grid.max()) == (1160, 2399)
-    np.testing.assert_array_equal(pattern.diff,
-                                  reduce(np.union1d, (FEL, PPL, DET)))
     assert grid_calls == 0  # changes are not called
-    assert diff_calls == 0
+    assert update_calls == 0
 
     # --- Third update: valid pulses, but everything is offseted by +1
-    grid_calls, diff_calls = 0, 0
-    prev_fel, prev_ppl, prev_det = (pattern.fel_index,
-                                    pattern.ppl_index,
-                                    pattern.det_index)
+    grid_calls, update_calls = 0, 0
     offset = 1
     proxy = _create_proxy(fel=FEL + offset, ppl=PPL + offset, det=DET + offset)
     pattern.set_node(proxy.value)
@@ -145,18 +245,12 @@ def test_pulse_pattern():
     grid = pattern.grid
     assert grid.shape == (31, 40)
     assert (grid.min(), grid.max()) == (1160, 2399)
-    previous_index = reduce(np.union1d, (prev_fel, prev_ppl, prev_det))
-    current_index = reduce(np.union1d, (FEL, PPL, DET)) + offset
-    changes = np.sort(np.hstack((previous_index, current_index)))
-    np.testing.assert_array_equal(pattern.diff, changes)
+    np.testing.assert_array_equal(pattern.fel_index, FEL + offset)
     assert grid_calls == 0
-    assert diff_calls == 1
+    assert update_calls == 1
 
     # --- Fourth update: valid pulses, but everything is offseted by -4
-    grid_calls, diff_calls = 0, 0
-    prev_fel, prev_ppl, prev_det = (pattern.fel_index,
-                                    pattern.ppl_index,
-                                    pattern.det_index)
+    grid_calls, update_calls = 0, 0
     offset = -4
     proxy = _create_proxy(fel=FEL + offset, ppl=PPL + offset, det=DET + offset)
     pattern.set_node(proxy.value)
@@ -164,12 +258,65 @@ def test_pulse_pattern():
     grid = pattern.grid
     assert grid.shape == (31, 40)
     assert (grid.min(), grid.max()) == (1160, 2399)
-    previous_index = reduce(np.union1d, (prev_fel, prev_ppl, prev_det))
-    current_index = reduce(np.union1d, (FEL, PPL, DET)) + offset
-    changes = np.sort(np.hstack((previous_index, current_index)))
-    np.testing.assert_array_equal(pattern.diff, changes)
+    np.testing.assert_array_equal(pattern.det_index, DET + offset)
     assert grid_calls == 0
-    assert diff_calls == 1
+    assert update_calls == 1
+
+
+def test_pulse_pattern_detector():
+    # The detector pattern is read from its own property
+    det = np.array([1300, 1400, 1500])
+    proxy = _create_proxy(fel=FEL, ppl=PPL, det=det)
+
+    decoded = decode_pulse_pattern(proxy.value)
+    assert decoded.shape == (2700,)
+    np.testing.assert_array_equal(np.flatnonzero(decoded["fel"]), FEL)
+    np.testing.assert_array_equal(np.flatnonzero(decoded["ppl"]), PPL)
+    np.testing.assert_array_equal(np.flatnonzero(decoded["det"]), det)
+
+    pattern = PulsePattern()
+    pattern.set_node(proxy.value)
+    np.testing.assert_array_equal(pattern.fel_index, FEL)
+    np.testing.assert_array_equal(pattern.det_index, det)
+
+
+def test_pulse_pattern_grid_cache():
+    pattern = PulsePattern()
+    pattern.set_node(_create_proxy(fel=FEL, ppl=PPL, det=DET).value)
+    specs = pattern.grid_specs
+    pattern.set_node(_create_proxy(fel=FEL + 1, ppl=PPL + 1,
+                                   det=DET + 1).value)
+    assert len(pattern._grid_cache) == 2
+
+    # A repeated pattern uses the cached grid
+    with mock.patch.object(PulsePattern, "_calc_grid_specs") as calc:
+        pattern.set_node(_create_proxy(fel=FEL, ppl=PPL, det=DET).value)
+        calc.assert_not_called()
+    assert pattern.grid_specs == specs
+    assert len(pattern._grid_cache) == 2
+
+
+def test_pulse_pattern_new_train():
+    proxy = _create_proxy(fel=FEL, ppl=PPL, det=DET)
+    node = proxy.value
+    for name in ("fel", "ppl", "det"):
+        getattr(node, name).timestamp = Timestamp("2009-04-20T10:32:22")
+
+    pattern = PulsePattern()
+    assert pattern.set_node(node)
+    # The same train is not reported again
+    assert not pattern.set_node(node)
+
+    # A new train with the same pattern is reported
+    node.fel.timestamp = Timestamp("2009-04-20T10:32:23")
+    assert pattern.set_node(node)
+
+
+def test_pulse_pattern_single_pulse():
+    pattern = PulsePattern()
+    pattern.set_node(_create_proxy(fel=[12], ppl=[], det=[]).value)
+    assert pattern.grid_specs == (0, 20, 10)
+    np.testing.assert_array_equal(pattern.fel_index, [12])
 
 
 def _create_proxy(fel=None, ppl=None, det=None):
@@ -1,4 +1,12 @@
-from extensions.stateaware_component_manager import StateAwareComponentManager
+from unittest import mock
+
+from qtpy.QtCore import Qt
+from qtpy.QtWidgets import QAction
+
+from extensions.stateaware_component_manager import (
+    MAX_POLL_INTERVAL, MIN_POLL_INTERVAL, SELECT_ALL_LABEL,
+    SELECT_INVERT_LABEL, STATUS_SYMBOL, GroupCounter,
+    StateAwareComponentManager, find_column_index, get_status_symbol)
 from karabo.native import Configurable, Hash, Node, VectorString
 from karabogui.testing import GuiTestCase, get_property_proxy, set_proxy_hash
 
@@ -13,6 +21,25 @@ class Object(Configurable):
     selectionList = Node(SACNode)
 
 
+FOO = ('FooDevice:UNKNOWN:undefined:undefined:UNKNOWN:'
+       'undefined:UNKNOWN:False')
+BAR = ('BarDevice:NORMAL:undefined:undefined:NORMAL:'
+       'undefined:NORMAL:False')
+
+
+def device_list_reply(node, *device_ids):
+    devices = [{"deviceId": device_id, "changes": 0}
+               for device_id in device_ids]
+    return {"payload": {"node": node, "entry": {"devices": devices}}}
+
+
+def status_reply(revision=None, **status):
+    payload = Hash("status", Hash(status))
+    if revision is not None:
+        payload["revision"] = revision
+    return Hash("payload", payload)
+
+
 class TestWidgetNode(GuiTestCase):
     def setUp(self):
         super(TestWidgetNode, self).setUp()
@@ -40,3 +67,162 @@ class TestWidgetNode(GuiTestCase):
 
         self.assertEqual(model.data(model.index(0, 0)), "FooDevice")
         self.assertEqual(model.data(model.index(1, 0)), "BarDevice")
+
+    def test_status_updates(self):
+        controller = self.controller
+        set_proxy_hash(self.proxy, Hash('selectionList.groups', [FOO]))
+        model = controller._item_model
+        group_item = model.item(0)
+        controller.on_device_list(
+            group_item, "remote", Qt.Unchecked, True, True,
+            device_list_reply(FOO, "A", "B"))
+        assert controller._device_groups == {"A": FOO, "B": FOO}
+
+        controller.on_status(True, status_reply(A="OK:done", B="INIT"))
+        status_a = controller._device_refs["A"]
+        assert status_a.text() == STATUS_SYMBOL["DONE"][0]
+        group_status = controller._device_refs[FOO]
+        assert group_status.background() == STATUS_SYMBOL["DONE"][1]
+        assert controller._poll_interval == MIN_POLL_INTERVAL
+
+        # Unchanged replies back off the polling
+        for _ in range(10):
+            controller.on_status(True, status_reply(A="OK:done", B="INIT"))
+        assert controller._poll_interval == MAX_POLL_INTERVAL
+
+        # Only changed devices are reported
+        controller.on_status(True, status_reply(B="ERR:failure"))
+        status_b = controller._device_refs["B"]
+        assert status_b.text() == STATUS_SYMBOL["ERROR"][0]
+        assert status_b.toolTip() == "failure"
+        assert status_a.text() == STATUS_SYMBOL["DONE"][0]
+        assert group_status.background() == STATUS_SYMBOL["ERROR"][1]
+        assert controller._poll_interval == MIN_POLL_INTERVAL
+
+        # An unchanged revision skips the reply
+        controller.on_status(True, status_reply(revision=1, A="INIT"))
+        assert status_a.text() == STATUS_SYMBOL["INIT"][0]
+        controller.on_status(True, status_reply(revision=1, A="OK:done"))
+        assert status_a.text() == STATUS_SYMBOL["INIT"][0]
+
+        # A rebuilt tree shows the known status
+        set_proxy_hash(self.proxy, Hash('selectionList.groups', [FOO, BAR]))
+        controller.on_device_list(
+            model.item(0), "remote", Qt.Unchecked, True, True,
+            device_list_reply(FOO, "A", "B"))
+        status_b = controller._device_refs["B"]
+        assert status_b.text() == STATUS_SYMBOL["ERROR"][0]
+
+    def test_device_list_reapplied(self):
+        controller = self.controller
+        set_proxy_hash(self.proxy, Hash('selectionList.groups', [FOO]))
+        old_group = controller._item_model.item(0)
+
+        # A reply for a group of a previous value update is dropped
+        set_proxy_hash(self.proxy, Hash('selectionList.groups', [FOO, BAR]))
+        controller.on_device_list(
+            old_group, "remote", Qt.Unchecked, True, True,
+            device_list_reply(FOO, "A", "B"))
+        assert controller._group_counters[FOO].size == 0
+        assert controller._device_groups == {}
+
+        # A re-applied device list replaces the devices of the group
+        group = controller._item_model.item(0)
+        controller.on_device_list(
+            group, "remote", Qt.Unchecked, True, True,
+            device_list_reply(FOO, "A", "B"))
+        controller.on_device_list(
+            group, "remote", Qt.Unchecked, True, True,
+            device_list_reply(FOO, "C"))
+        assert controller._group_counters[FOO].size == 1
+        assert group.rowCount() == 1
+        assert controller._device_groups == {"C": FOO}
+
+    def test_check_states(self):
+        controller = self.controller
+        set_proxy_hash(self.proxy, Hash('selectionList.groups', [FOO]))
+        model = controller._item_model
+        group = model.item(0)
+        controller.on_device_list(
+            group, "remote", Qt.Unchecked, True, True,
+            device_list_reply(FOO, "A", "B", "C"))
+        counter = controller._group_counters[FOO]
+        assert counter.size == 3
+        assert group.checkState() == Qt.Unchecked
+
+        # A device changes the group by its counter
+        group.child(1).setCheckState(Qt.Checked)
+        assert counter.checked["device"] == 1
+        assert group.checkState() == Qt.PartiallyChecked
+
+        # A group changes all its devices
+        group.setCheckState(Qt.Checked)
+        assert counter.checked["device"] == 3
+        assert all(group.child(row).checkState() == Qt.Checked
+                   for row in range(3))
+
+        col = find_column_index("do_final_action")
+        group.child(0, col).setCheckState(Qt.Checked)
+        assert counter.checked["do_final"] == 1
+        assert model.item(0, col).checkState() == Qt.PartiallyChecked
+
+        # The tool bar changes the selection at once
+        controller._select_devices(SELECT_INVERT_LABEL)
+        assert counter.checked["device"] == 0
+        assert group.checkState() == Qt.Unchecked
+        controller._select_devices(SELECT_ALL_LABEL)
+        assert counter.checked["device"] == 3
+        assert group.checkState() == Qt.Checked
+
+        # A locked selection is not sent and stays locked
+        controller._is_updating = True
+        with mock.patch.object(controller, "_send_selection") as send:
+            controller.tool_bar_action(QAction(SELECT_INVERT_LABEL))
+            send.assert_not_called()
+        assert controller._is_updating
+
+    def test_polling(self):
+        controller = self.controller
+        controller._start_polling()
+        # Polling pauses while hidden
+        assert not controller._timer.isActive()
+
+        controller.widget.show()
+        controller.on_status(True, status_reply(A="INIT"))
+        assert controller._timer.isActive()
+
+        controller.widget.hide()
+        assert not controller._timer.isActive()
+
+        controller.widget.show()
+        controller._stop_polling()
+        assert not controller._timer.isActive()
+
+
+def test_status_symbol():
+    assert get_status_symbol("INIT") == (*STATUS_SYMBOL["INIT"], None)
+    symbol, _, context = get_status_symbol(
+        "FAILED:ON:reason exception=broken")
+    assert symbol == f"{STATUS_SYMBOL['ERROR'][0]} ON"
+    assert context == "broken"
+
+
+def test_group_counter():
+    counter = GroupCounter()
+    counter.add(True, False)
+    counter.add(False, False)
+    assert counter.check_state("device") == Qt.PartiallyChecked
+    assert counter.check_state("do_final") == Qt.Unchecked
+    counter.set_checked("device", True)
+    assert counter.check_state("device") == Qt.Checked
+    counter.set_all_checked("device", False)
+    assert counter.check_state("device") == Qt.Unchecked
+
+    # The most important status color wins
+    assert counter.color() is None
+    done, error = STATUS_SYMBOL["DONE"][1], STATUS_SYMBOL["ERROR"][1]
+    counter.set_color(None, done)
+    counter.set_color(None, error)
+    assert counter.color() == error
+    counter.set_color(error, done)
+    assert counter.color() == done
@@ -34,7 +34,7 @@ class TestTriggerSliceGraph(GuiTestCase):
     def test_empty(self):
         np.testing.assert_array_equal(
             self.controller._curve_item.getData(), [None, None])
-        assert self.controller._trigger_regions == []
+        assert len(self.controller._trigger_item) == 0
 
     def test_value_update(self):
         starts = np.arange(0, 200, 4, dtype=int)
@@ -56,7 +56,27 @@ class TestTriggerSliceGraph(GuiTestCase):
             self.controller._curve_item.getData(),
             [np.arange(data.size), data])
 
-        assert len(self.controller._trigger_regions) == starts.size
-        for start, stop, region in zip(starts, stops,
-                                       self.controller._trigger_regions):
-            assert region.getRegion() == (start, stop)
+        item = self.controller._trigger_item
+        assert len(item) == starts.size
+        np.testing.assert_array_equal(item.starts, starts)
+        np.testing.assert_array_equal(item.stops, stops)
+        np.testing.assert_array_equal(item.codes[9:12], [0, 1, 1])
+        np.testing.assert_array_equal(item.codes[14:17], [1, 3, 3])
+        np.testing.assert_array_equal(item.codes[19:22], [3, 2, 2])
+
+        # Hit-testing of the region under the cursor
+        assert item.region_at(41.5) == 10
+        assert item.region_at(43.5) is None
+        assert item.region_tooltip(16) == "Trigger 16: 64 - 67 (both)"
+
+        # Fewer triggers reuse the item
+        set_proxy_hash(
+            self.proxy,
+            Hash("schema",
+                 Hash("start", starts[:5],
+                      "stop", stops[:5],
+                      "fel", fel[:5],
+                      "ppl", ppl[:5],
+                      "data", data)))
+        assert self.controller._trigger_item is item
+        assert len(item) == 5
@@ -6,7 +6,8 @@ from karabo.native import (
 from karabogui.testing import (
     GuiTestCase, get_class_property_proxy, set_proxy_hash, set_proxy_value)
 
-from ..display_uncertainty_graph import UncertaintyGraph
+from ..display_uncertainty_graph import (
+    MAX_BAND_BINS, UncertaintyGraph, get_band_envelope)
 from ..utils import get_ndarray_hash_from_data
 
 SIZE = 10
@@ -118,9 +119,49 @@ class TestUncertaintyGraph(GuiTestCase):
         assert_array_equal(band.curves, [[X, MEAN-UNCERTAINTY],
                                          [X, MEAN+UNCERTAINTY]])
 
+    def test_long_uncertainty_band(self):
+        self.controller.visualize_additional_property(self.vector_unc_proxy)
+        size = 100000
+        x = np.arange(size, dtype=np.float64)
+        mean = np.sin(x / 1000)
+        set_proxy_value(self.x_proxy, 'x', x)
+        set_proxy_hash(self.vector_unc_proxy,
+                       Hash("vector.mean", mean,
+                            "vector.uncertainty", np.full(size, 0.5)))
+
+        band = self.controller._unc_band
+        # The band path is reduced to the screen resolution
+        assert band.path().elementCount() <= 4 * MAX_BAND_BINS + 4
+        assert band.dataBounds(0) == (0, size - 1)
+        low, high = band.dataBounds(1)
+        assert low < -1.4 and high > 1.4
+
     # ---------------------------------------------------------------------
     # Helpers
 
     @property
     def widget(self):
         return self.controller.widget
+
+
+def test_band_envelope():
+    x = np.arange(10.)
+    low = np.arange(10.)
+    high = low + 1
+    x_env, low_env, high_env = get_band_envelope(x, low, high, num_bins=3)
+    assert_array_equal(x_env, [1, 4, 7])
+    assert_array_equal(low_env, [0, 3, 6])
+    assert_array_equal(high_env, [3, 6, 10])
+
+    # Short bands are kept
+    x_env, low_env, high_env = get_band_envelope(x, low, high)
+    assert_array_equal(x_env, x)
+
+    # Only the view range and the neighbouring samples are considered
+    x_env, _, _ = get_band_envelope(x, low, high, x_range=(2.5, 5.5))
+    assert_array_equal(x_env, [2, 3, 4, 5, 6])
+
+    # Non finite values are ignored
+    low[0] = np.nan
+    _, low_env, _ = get_band_envelope(x, low, high, num_bins=3)
+    assert_array_equal(low_env, [1, 3, 6])
@@ -1,6 +1,8 @@
+import numpy as np
 import pytest
 
 from extensions import utils
+from extensions.tests.utils import wait_for_worker
 
 
 def test_check_gui_compatibility(mocker):
@@ -25,3 +27,57 @@ def test_gui_version_compatible(mocker):
     assert utils.gui_version_compatible(2, 15)
 
     assert not utils.gui_version_compatible(50, 12)
+
+
+def test_latest_wins_worker(gui_app):
+    results = []
+    worker = utils.LatestWinsWorker(lambda value: value * 2)
+    worker.resultReady.connect(results.append)
+    worker.submit(1)
+    worker.submit(2)
+    worker.submit(3)
+    wait_for_worker(worker, gui_app)
+    # The first request is running, only the latest pending one is kept
+    assert results == [2, 6]
+
+    worker.submit(5)
+    worker.cancel()
+    wait_for_worker(worker, gui_app)
+    assert results == [2, 6]
+
+
+def test_content_digest():
+    digest = utils.get_content_digest(b"image")
+    assert digest == utils.get_content_digest("image")
+    assert digest != utils.get_content_digest(b"other")
+
+
+def test_ring_buffer():
+    buffer = utils.RingBuffer(3, shape=(2,))
+    assert len(buffer) == 0
+    assert buffer.view().shape == (0, 2)
+
+    evicted = [buffer.append((value, -value)) for value in range(5)]
+    assert evicted[:3] == [None, None, None]
+    np.testing.assert_array_equal(evicted[3], (0, 0))
+    np.testing.assert_array_equal(evicted[4], (1, -1))
+
+    view = buffer.view()
+    assert buffer.full
+    assert view.base is not None
+    np.testing.assert_array_equal(view[:, 0], [2, 3, 4])
+
+    buffer.clear()
+    assert len(buffer) == 0
+
+
+def test_rolling_statistics():
+    buffer = utils.RingBuffer(5)
+    statistics = utils.RollingStatistics(buffer)
+    values = np.random.default_rng(1).normal(100, 3, size=23)
+    for index, value in enumerate(values):
+        statistics.append(value)
+        window = values[max(index - 4, 0):index + 1]
+        np.testing.assert_array_equal(buffer.view(), window)
+        assert statistics.mean == pytest.approx(window.mean())
+        assert statistics.std == pytest.approx(window.std())
@@ -1,6 +1,6 @@
 import numpy as np
 
-from extensions.display_xas_graph import DisplayXasGraph
+from extensions.display_xas_graph import DisplayXasGraph, bin_samples
 from karabo.native import Configurable, Hash, Node, VectorDouble
 from karabogui.testing import (
     GuiTestCase, get_class_property_proxy, set_proxy_hash)
@@ -11,6 +11,8 @@ class DataNode(Configurable):
     absorption = VectorDouble()
     intensity = VectorDouble()
     counts = VectorDouble()
+    rawEnergy = VectorDouble()
+    rawIntensity = VectorDouble()
 
 
 class ChannelNode(Configurable):
@@ -50,3 +52,50 @@ class TestXasGraph(GuiTestCase):
             act_x, act_y = plot.getData()
             np.testing.assert_array_equal(act_x, values['bins'])
             np.testing.assert_array_equal(act_y, exp_y)
+
+    def test_raw_samples(self):
+        energy = np.array([0.1, 0.2, 0.9, 2.5, 2.6])
+        intensity = np.array([1.0, 3.0, 5.0, 2.0, 4.0])
+        set_proxy_hash(self.proxy, Hash('data', Hash(
+            'rawEnergy', energy, 'rawIntensity', intensity)))
+
+        controller = self.controller
+        x, y = controller.intensity_plot.getData()
+        np.testing.assert_array_equal(x, [0.5, 2.5])
+        np.testing.assert_allclose(y, [3.0, 3.0])
+        x, y = controller.std_plot.getData()
+        np.testing.assert_allclose(y, [np.std([1, 3, 5]), 1.0])
+        x, y = controller.counts_plot.getData()
+        np.testing.assert_array_equal(y, [3, 2])
+
+        # Rebinning uses the cached samples
+        controller.model.bin_width = 0.5
+        controller._rebin()
+        x, y = controller.counts_plot.getData()
+        np.testing.assert_array_equal(x, [0.25, 0.75, 2.75])
+        np.testing.assert_array_equal(y, [2, 1, 2])
+
+
+def test_bin_samples():
+    energy = np.array([-1.5, -0.2, 3.0, np.nan])
+    intensity = np.array([1.0, 3.0, 5.0, 7.0])
+    centers, mean, std, counts = bin_samples(energy, intensity, 1.0)
+    np.testing.assert_array_equal(centers, [-1.5, -0.5, 3.5])
+    np.testing.assert_allclose(mean, [1.0, 3.0, 5.0])
+    np.testing.assert_allclose(std, [0.0, 0.0, 0.0])
+    np.testing.assert_array_equal(counts, [1, 1, 1])
+
+    # Large samples are binned at once
+    energy = np.random.uniform(7000, 7100, 1000000)
+    intensity = np.random.random(energy.size)
+    centers, mean, std, counts = bin_samples(energy, intensity, 0.5)
+    assert centers.size == 200
+    assert counts.sum() == energy.size
+    selection = (energy >= 7000) & (energy < 7000.5)
+    np.testing.assert_allclose(mean[0], intensity[selection].mean())
+    np.testing.assert_allclose(std[0], intensity[selection].std())
+
+    # No samples or no width
+    for args in (([], [], 1.0), (energy, intensity, 0.0)):
+        centers, _, _, counts = bin_samples(*args)
+        assert centers.size == 0 and counts.size == 0
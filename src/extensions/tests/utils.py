@@ -0,0 +1,8 @@
+"""Shared helpers for the widget tests"""
+from qtpy.QtCore import QThreadPool
+
+
+def wait_for_worker(worker, app):
+    while worker.busy:
+        QThreadPool.globalInstance().waitForDone()
+        app.processEvents()
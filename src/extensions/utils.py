@@ -1,8 +1,9 @@
+import hashlib
 from collections import namedtuple
 
 import numpy as np
 import pyqtgraph as pg
-from qtpy.QtCore import Qt, Slot
+from qtpy.QtCore import QObject, QRunnable, Qt, QThreadPool, Signal, Slot
 from qtpy.QtGui import QPalette
 from qtpy.QtWidgets import (
     QComboBox, QDialog, QHBoxLayout, QLineEdit, QStyledItemDelegate,
@@ -21,6 +22,9 @@ except ImportError:
 
 VERSION = namedtuple("VERSION", ["major", "minor"])
 
+# Payloads smaller than this are decoded directly on the GUI thread
+SYNC_DECODE_LIMIT = 64 * 1024
+
 
 def get_array_data(binding, default=None):
     """Retrieve the array and timestamp data from a property proxy belonging
@@ -117,6 +121,13 @@ def guess_path(proxy, *, klass, output=False, excluded=tuple()):
     return ''
 
 
+def get_content_digest(data):
+    """Return a short digest to detect changes of large payloads"""
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
 def rotate_points(points, origin, angle):
     x_norm, y_norm = np.subtract(points, origin)
     sin, cos = np.sin(angle), np.cos(angle)
@@ -187,6 +198,188 @@ def add_twinx(plotItem, data_item=None, y_label=None):
     return viewBox
 
 
+# -----------------------------------------------------------------------------
+# Background worker
+
+
+class _WorkerSignals(QObject):
+    finished = Signal(object, object)
+
+
+class _WorkerJob(QRunnable):
+
+    def __init__(self, func, args, generation, signals):
+        super().__init__()
+        self.func = func
+        self.args = args
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.func(*self.args)
+        except Exception:
+            result = None
+        self.signals.finished.emit(self.generation, result)
+
+
+class LatestWinsWorker(QObject):
+    """Run a function off the GUI thread with latest-wins semantics
+
+    At most one job is running at a time. Requests submitted while a job is
+    running are not queued, only the most recent one is kept and started
+    once the running job has finished. The result is delivered on the GUI
+    thread with the `resultReady` signal, a result of `None` is not emitted.
+    """
+    resultReady = Signal(object)
+
+    def __init__(self, func, parent=None):
+        super().__init__(parent)
+        self._func = func
+        self._pending = None
+        self._running = False
+        self._generation = 0
+        # Owned by python and referenced by the running job
+        self._signals = _WorkerSignals()
+        self._signals.finished.connect(self._on_finished)
+
+    @property
+    def busy(self):
+        return self._running or self._pending is not None
+
+    def submit(self, *args):
+        """Request to run the function with `args` in the background"""
+        if self._running:
+            self._pending = args
+            return
+        self._start(args)
+
+    def cancel(self):
+        """Drop the pending request and discard the running job result"""
+        self._pending = None
+        self._generation += 1
+
+    def _start(self, args):
+        self._running = True
+        job = _WorkerJob(self._func, args, self._generation, self._signals)
+        QThreadPool.globalInstance().start(job)
+
+    @Slot(object, object)
+    def _on_finished(self, generation, result):
+        self._running = False
+        if self._pending is not None:
+            args, self._pending = self._pending, None
+            self._start(args)
+        if generation == self._generation and result is not None:
+            self.resultReady.emit(result)
+
+
+# -----------------------------------------------------------------------------
+# Ring buffer
+
+
+class RingBuffer:
+    """A preallocated ring buffer of numpy values
+
+    Every value is stored twice, so that the values in order of arrival are
+    always a contiguous slice of the storage and `view` does not copy.
+
+    :param capacity: the maximum number of values
+    :param shape: the shape of a single value
+    """
+
+    def __init__(self, capacity, shape=(), dtype=np.float64):
+        self.capacity = max(int(capacity), 1)
+        self._data = np.zeros((2 * self.capacity,) + tuple(shape),
+                              dtype=dtype)
+        self._index = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def full(self):
+        return self._size == self.capacity
+
+    def append(self, value):
+        """Append a value and return the evicted oldest value or None"""
+        index = self._index
+        evicted = self._data[index].copy() if self.full else None
+        self._data[index] = value
+        self._data[index + self.capacity] = value
+        self._index = (index + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return evicted
+
+    def view(self):
+        """Return the values from the oldest to the newest without copy"""
+        stop = self._index + self.capacity
+        return self._data[stop - self._size:stop]
+
+    def clear(self):
+        self._index = 0
+        self._size = 0
+
+
+class RollingStatistics:
+    """The running mean and standard deviation of a window of values
+
+    Values are added and removed with the Welford update, the cost does not
+    depend on the window size. The accumulated rounding error is removed by
+    recomputing the moments of the window every `capacity` updates.
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.clear()
+
+    def clear(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+
+    @property
+    def std(self):
+        if not self.count:
+            return 0.0
+        return np.sqrt(np.maximum(self._m2, 0) / self.count)
+
+    def append(self, value):
+        """Append the value to the buffer and update the moments"""
+        evicted = self.buffer.append(value)
+        if evicted is not None:
+            self._remove(evicted)
+        self._add(np.asarray(value, dtype=np.float64))
+
+        self._updates += 1
+        if self._updates >= self.buffer.capacity:
+            self._recompute()
+
+    def _add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean = self.mean + delta / self.count
+        self._m2 = self._m2 + delta * (value - self.mean)
+
+    def _remove(self, value):
+        if self.count <= 1:
+            self.clear()
+            return
+        self.count -= 1
+        previous = self.mean
+        self.mean = previous - (value - previous) / self.count
+        self._m2 = self._m2 - (value - self.mean) * (value - previous)
+
+    def _recompute(self):
+        values = self.buffer.view()
+        self.count = len(values)
+        self.mean = values.mean(axis=0)
+        self._m2 = ((values - self.mean) ** 2).sum(axis=0)
+        self._updates = 0
+
+
 class CompatibilityError(RuntimeError):
     pass
 